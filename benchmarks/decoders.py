@@ -0,0 +1,43 @@
+"""
+JSON backends on the same recorded synthetic feed: decoding alone, and decoding plus building the dataclasses. msgspec
+decodes the feed into typed structs in the same pass (see decoders.feed_decoder), the others into dicts.
+
+    python benchmarks/decoders.py
+"""
+import json
+import statistics
+import time
+
+from feed import synthetic_feed
+from src.pyvatsim import VatsimEndpoints, VatsimLiveAPI
+from src.pyvatsim.decoders import available_backends, feed_decoder
+
+N_PILOTS = 20000
+RUNS = 5
+
+
+def timed(f):
+    samples = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        f()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    body = json.dumps(synthetic_feed(n_pilots=N_PILOTS, n_controllers=1000, n_prefiles=2000)).encode()
+    print("feed: %d pilots, %.1f MB" % (N_PILOTS, len(body) / 2 ** 20))
+    for backend in available_backends():
+        decode = feed_decoder(backend)
+
+        def parse():
+            # A new API each run, so nothing is reused from an earlier snapshot
+            api = VatsimLiveAPI(VatsimEndpoints("http://127.0.0.1/status.json"), DATA_TTL=3600, json_backend=backend)
+            api._cache_conn_data(api._decode_feed(body))
+
+        print("%-8s decode %8.1f ms   decode and parse %8.1f ms" % (backend, timed(lambda: decode(body)), timed(parse)))
+
+
+if __name__ == "__main__":
+    main()
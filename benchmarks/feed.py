@@ -0,0 +1,119 @@
+"""
+Synthetic VATSIM feeds for the benchmarks, plus a throwaway local HTTP server that serves them as if it were the
+real network
+"""
+import json
+import os
+import random
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Benchmarks import the package the same way the tests do
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+AIRPORTS = ["EGLL", "KJFK", "KSFO", "EDDF", "LFPG", "RJTT", "YSSY", "OMDB", "VHHH", "CYYZ", "EHAM", "LEMD"]
+HUBS = [(51.5, -0.5), (40.6, -73.8), (37.6, -122.4), (50.0, 8.6), (49.0, 2.5), (35.5, 139.8), (-33.9, 151.2),
+        (25.3, 55.4), (22.3, 113.9), (43.7, -79.6), (52.3, 4.8), (40.5, -3.6)]
+SERVERS = ["USA-EAST", "USA-WEST", "CANADA", "UK", "GERMANY"]
+
+
+def synthetic_feed(n_pilots: int = 2000, n_controllers: int = 200, n_prefiles: int = 200, seed: int = 1,
+                   clustered: bool = False) -> dict:
+    # With clustered, pilots are packed within a few degrees of a dozen hubs, like traffic at a big event
+    rnd = random.Random(seed)
+
+    def position():
+        if not clustered:
+            return rnd.uniform(-60, 70), rnd.uniform(-180, 180)
+        lat, lon = rnd.choice(HUBS)
+        return lat + rnd.gauss(0, 1.5), (lon + rnd.gauss(0, 2.5) + 180) % 360 - 180
+
+    def flight_plan(i):
+        dep, arr = rnd.sample(AIRPORTS, 2)
+        return {
+            "flight_rules": "I", "aircraft": "A320/M-SDE3FGHIRWY/LB1", "aircraft_faa": "A320/L", "aircraft_short": "A320",
+            "departure": dep, "arrival": arr, "alternate": rnd.choice(AIRPORTS), "cruise_tas": "450", "altitude": "35000",
+            "deptime": "1300", "enroute_time": "0351", "fuel_time": "0527", "remarks": "PBN/A1B1 /V/",
+            "route": "DANGI1C DANGI DCT TELEM N895 IKOSI/N0453F370 N895 SAGOD DCT OKIKO OKIKO1A",
+            "revision_id": rnd.randint(1, 5), "assigned_transponder": "%04d" % rnd.randint(0, 7777)
+        }
+
+    pilots = [dict(zip(("latitude", "longitude"), position()), **{
+        "cid": 1000000 + i, "name": "Pilot %d" % i, "callsign": "SYN%d" % i, "server": rnd.choice(SERVERS),
+        "pilot_rating": 0, "military_rating": 0, "altitude": rnd.randint(0, 41000),
+        "groundspeed": rnd.randint(0, 520), "transponder": "%04d" % rnd.randint(0, 7777), "heading": rnd.randint(0, 359),
+        "qnh_i_hg": 29.92, "qnh_mb": 1013, "flight_plan": flight_plan(i) if rnd.random() < 0.9 else None,
+        "logon_time": "2023-04-11T11:45:21.4513207Z", "last_updated": "2023-04-11T16:13:42.5134797Z"
+    }) for i in range(n_pilots)]
+
+    controllers = [{
+        "cid": 2000000 + i, "name": "Controller %d" % i, "callsign": "%s_%d_TWR" % (rnd.choice(AIRPORTS), i),
+        "frequency": "118.%03d" % rnd.randint(0, 975), "facility": 4, "rating": 3, "server": rnd.choice(SERVERS),
+        "visual_range": 50, "text_atis": ["Tower"],
+        "last_updated": "2023-04-11T16:13:21.8151445Z", "logon_time": "2023-04-11T10:58:47.4890896Z"
+    } for i in range(n_controllers)]
+
+    prefiles = [{
+        "cid": 3000000 + i, "name": "Prefile %d" % i, "callsign": "PRE%d" % i, "flight_plan": flight_plan(i),
+        "last_updated": "2023-04-11T13:16:47.6318459Z"
+    } for i in range(n_prefiles)]
+
+    return {
+        "general": {
+            "version": 3, "reload": 1, "update": "20230411161343", "update_timestamp": "2023-04-11T16:13:43.9537663Z",
+            "connected_clients": n_pilots + n_controllers, "unique_users": n_pilots + n_controllers
+        },
+        "pilots": pilots,
+        "controllers": controllers,
+        "atis": [],
+        "servers": [{
+            "ident": s, "hostname_or_ip": "127.0.0.1", "location": s, "name": s, "clients_connection_allowed": 1,
+            "client_connections_allowed": True, "is_sweatbox": False
+        } for s in SERVERS],
+        "prefiles": prefiles,
+        "facilities": [{"id": i, "short": s, "long": s} for i, s in enumerate(["OBS", "FSS", "DEL", "GND", "TWR", "APP", "CTR"])],
+        "ratings": [{"id": i, "short": "R%d" % i, "long": "Rating %d" % i} for i in range(-1, 13)],
+        "pilot_ratings": [{"id": 0, "short_name": "NEW", "long_name": "Basic Member"}],
+        "military_ratings": [{"id": 0, "short_name": "M0", "long_name": "No Military Rating"}]
+    }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = self.server.routes.get(self.path.split("?")[0])
+        if body is None:
+            self.send_response(404)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class FeedServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, feed: dict) -> None:
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.url = "http://127.0.0.1:%d" % self.server_address[1]
+        self.routes = {
+            "/data.json": json.dumps(feed).encode(),
+            "/servers.json": json.dumps(feed["servers"]).encode(),
+            "/metar.php": b"EGLL 111550Z AUTO 27014KT 9999 OVC040 12/06 Q1014\n",
+            "/status.json": json.dumps({
+                "data": {"v3": [self.url + "/data.json"], "transceivers": [self.url + "/data.json"],
+                         "servers": [self.url + "/servers.json"], "servers_sweatbox": [self.url + "/servers.json"]},
+                "user": [self.url + "/user.php"],
+                "metar": [self.url + "/metar.php"]
+            }).encode()
+        }
+        threading.Thread(target=self.serve_forever, args=(0.01,), daemon=True).start()
+
+    @property
+    def status_url(self) -> str:
+        return self.url + "/status.json"
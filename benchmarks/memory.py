@@ -0,0 +1,52 @@
+"""
+Memory held by a parsed snapshot of a large synthetic feed, with and without the intern table, measured with
+tracemalloc after two snapshots (so plans carried over from the first one are counted too).
+
+    python benchmarks/memory.py
+"""
+import gc
+import json
+import tracemalloc
+
+from feed import synthetic_feed
+from src.pyvatsim import VatsimEndpoints, VatsimLiveAPI
+
+N_PILOTS = 20000
+
+
+class NoInterning(VatsimLiveAPI):
+    INTERN_TABLE_SIZE = 0
+
+
+def snapshots():
+    feed = synthetic_feed(n_pilots=N_PILOTS, n_controllers=1000, n_prefiles=2000)
+    text = json.dumps(feed)
+    feed["general"]["update_timestamp"] = "2023-04-11T16:13:58.1234567Z"
+    for p in feed["pilots"][::10]:
+        if p["flight_plan"] is not None:
+            p["flight_plan"]["revision_id"] += 1
+    return text, json.dumps(feed)
+
+
+def measure(cls, texts):
+    gc.collect()
+    tracemalloc.start()
+    api = cls(VatsimEndpoints("http://127.0.0.1/status.json"), DATA_TTL=3600) # tracemalloc makes parsing slow
+    for text in texts:
+        api._cache_conn_data(json.loads(text)) # each snapshot is decoded fresh, like a download
+    gc.collect()
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return api, held
+
+
+def main():
+    texts = snapshots()
+    for label, cls in (("without interning", NoInterning), ("with interning", VatsimLiveAPI)):
+        api, held = measure(cls, texts)
+        print("%-20s %8.1f MB held" % (label, held / 2 ** 20))
+        del api
+
+
+if __name__ == "__main__":
+    main()
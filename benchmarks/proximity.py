@@ -0,0 +1,64 @@
+"""
+Proximity pairs and conflict projection over 20k clustered synthetic pilots, against a brute force scan of a sample
+(which is quadratic, so it is only run on a fraction and extrapolated).
+
+    python benchmarks/proximity.py
+"""
+import time
+from datetime import timedelta
+
+from feed import FeedServer, synthetic_feed
+from src.pyvatsim import VatsimEndpoints, VatsimLiveAPI, ProximityEngine
+from src.pyvatsim.geo import distance_nm
+
+N_PILOTS = 20000
+BRUTE_FORCE_SAMPLE = 2000
+
+
+def timed(label, f):
+    start = time.perf_counter()
+    result = f()
+    print("%-44s %8.1f ms" % (label, (time.perf_counter() - start) * 1000))
+    return result
+
+
+def brute_force(pilots, horizontal_nm, vertical_ft):
+    items = [p for p in pilots if p.groundspeed >= 40]
+    return [
+        (a.cid, b.cid) for i, a in enumerate(items) for b in items[i + 1:]
+        if abs(a.altitude - b.altitude) <= vertical_ft and distance_nm(a.latitude, a.longitude, b.latitude, b.longitude) <= horizontal_nm
+    ]
+
+
+def main():
+    feed = synthetic_feed(n_pilots=N_PILOTS, clustered=True)
+    server = FeedServer(feed)
+    api = VatsimLiveAPI(VatsimEndpoints(server.status_url))
+    pilots = timed("fetch and parse %d pilots" % N_PILOTS, api.pilots)
+
+    engine = ProximityEngine(5, 1000)
+    timed("build spatial hash", lambda: engine.update(pilots))
+    pairs = timed("pairs within 5 nm / 1000 ft", lambda: engine.pairs(5, 1000))
+    print("%-44s %8d" % ("  pairs found", len(pairs)))
+
+    # A new snapshot where a tenth of the pilots have moved a little
+    moved = dict(pilots)
+    for cid in list(moved)[::10]:
+        p = moved[cid]
+        moved[cid] = type(p)(**dict(vars(p), latitude=p.latitude + 0.01))
+    timed("incremental update (10% moved)", lambda: engine.update(moved))
+
+    conflicts = timed("conflicts, 2 min lookahead (incl. hash)", lambda: api.conflicts(5, 1000, timedelta(minutes=2)))
+    print("%-44s %8d" % ("  conflicts found", len(conflicts)))
+
+    sample = list(pilots.values())[:BRUTE_FORCE_SAMPLE]
+    start = time.perf_counter()
+    brute_force(sample, 5, 1000)
+    elapsed = time.perf_counter() - start
+    print("%-44s %8.1f ms" % ("brute force, %d pilots" % BRUTE_FORCE_SAMPLE, elapsed * 1000))
+    print("%-44s %8.1f ms" % ("  extrapolated to %d" % N_PILOTS, elapsed * 1000 * (N_PILOTS / BRUTE_FORCE_SAMPLE) ** 2))
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Cold start: how long `import pyvatsim` takes, and how long a fresh process takes to answer its first query, with and
+without a cached status.json on disk. Each measurement runs in a new interpreter.
+
+    python benchmarks/startup.py
+"""
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from feed import FeedServer, synthetic_feed
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+RUNS = 10
+
+FIRST_QUERY = """
+import sys
+from src.pyvatsim import VatsimEndpoints, VatsimLiveAPI
+api = VatsimLiveAPI(VatsimEndpoints(sys.argv[1], status_cache_path=sys.argv[2] or None))
+assert api.pilot(callsign="SYN1") is not None
+"""
+
+
+def timed(args):
+    samples = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, *args], cwd=ROOT, check=True)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    server = FeedServer(synthetic_feed(n_pilots=200, n_controllers=20, n_prefiles=20))
+    baseline = timed(["-c", "pass"])
+    print("interpreter start                  %7.1f ms" % baseline)
+    print("import pyvatsim                    %+7.1f ms" % (timed(["-c", "import src.pyvatsim"]) - baseline))
+    print("import pyvatsim + requests         %+7.1f ms" % (timed(["-c", "import src.pyvatsim, requests"]) - baseline))
+
+    print("first query                        %+7.1f ms" % (timed(["-c", FIRST_QUERY, server.status_url, ""]) - baseline))
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "status.json")
+        subprocess.run([sys.executable, "-c", FIRST_QUERY, server.status_url, path], cwd=ROOT, check=True)
+        print("first query, status.json on disk   %+7.1f ms" % (timed(["-c", FIRST_QUERY, server.status_url, path]) - baseline))
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
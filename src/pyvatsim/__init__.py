@@ -1 +1,43 @@
-from .liveapi import UpdateMode, Facility, Server, Rating, PilotRating, Flightplan, ActivePilot, PrefiledPilot, Controller, Metar, ATIS, VatsimEndpoints, VatsimLiveAPI
+from .liveapi import UpdateMode, Facility, Server, Rating, PilotRating, Flightplan, ActivePilot, PrefiledPilot, Controller, Metar, ATIS, FlightplanSource, FlightplanView, EndpointMirrors, VatsimEndpoints, VatsimLiveAPI
+from .utils import Airport, Boundary, Fir, VatspyAirports, VatspyBoundaries
+
+# Everything else is only imported the first time it's used, to keep `import pyvatsim` fast
+_LAZY = {
+    'FlightPhase'        : '.metrics',
+    'FlightMetrics'      : '.metrics',
+    'Query'              : '.query',
+    'RouteToken'         : '.routes',
+    'RouteTokenType'     : '.routes',
+    'tokenize_route'     : '.routes',
+    'SnapshotPublisher'  : '.shared',
+    'SharedSnapshotAPI'  : '.shared',
+    'TrafficStats'       : '.stats',
+    'DensityGrid'        : '.stats',
+    'HistoryStore'       : '.history',
+    'PilotRecord'        : '.history',
+    'ProximityEngine'    : '.proximity',
+    'ProximityPair'      : '.proximity',
+    'Conflict'           : '.proximity',
+    'TrackModel'         : '.interpolation',
+    'CoverageMap'        : '.coverage',
+    'Member'             : '.members',
+    'MemberCache'        : '.members',
+    'MemberLookup'       : '.members',
+    'FlightCategory'     : '.weather',
+    'Weather'            : '.weather',
+    'MetarStore'         : '.weather',
+    'SharedCacheStats'   : '.registry',
+}
+
+
+def __getattr__(name):
+    if name not in _LAZY:
+        raise AttributeError('module %r has no attribute %r' % (__name__, name))
+    import importlib
+    value = getattr(importlib.import_module(_LAZY[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY))
@@ -0,0 +1,132 @@
+from __future__ import annotations # Required for type annotations to use forward reference
+from collections import defaultdict
+from collections.abc import Mapping
+from dataclasses import dataclass
+from math import ceil, cos, floor, radians
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Optional
+
+from .geo import distance_nm
+
+if TYPE_CHECKING:
+    from .liveapi import ActivePilot, Controller
+    from .utils import Boundary, VatspyAirports, VatspyBoundaries
+
+
+# Constants
+GRID_DEG = 1.0 # size of the index cells regions are registered in
+CIRCLE_FACILITIES = ('DEL', 'GND', 'TWR', 'APP') # positioned at their airport, covering a circle of visual_range
+BOUNDARY_FACILITIES = ('CTR', 'FSS') # covering their FIR boundary
+
+
+@dataclass(frozen=True)
+class CoverageRegion:
+    controller: Controller
+    latitude: None | float # circle centre, for airport controllers
+    longitude: None | float
+    radius: None | float # nm
+    boundary: None | Boundary # for enroute controllers
+
+    def contains(self, latitude: float, longitude: float) -> bool:
+        if self.boundary is not None:
+            return self.boundary.contains(latitude, longitude)
+        return distance_nm(self.latitude, self.longitude, latitude, longitude) <= self.radius
+
+
+def _cells_for_circle(latitude, longitude, radius):
+    dlat = radius / 60
+    dlon = radius / (60 * max(cos(radians(latitude)), 0.01))
+    return _cells_for_bbox(longitude - dlon, latitude - dlat, longitude + dlon, latitude + dlat)
+
+
+def _cells_for_bbox(min_lon, min_lat, max_lon, max_lat):
+    # Longitudes are wrapped, so boxes over the antimeridian (including the shifted ones of Boundary) land in the
+    # right cells
+    lon_cells = int(360 / GRID_DEG)
+    cols = range(floor(min_lon / GRID_DEG), ceil(max_lon / GRID_DEG) + 1)
+    rows = range(floor(max(min_lat, -90) / GRID_DEG), ceil(min(max_lat, 90) / GRID_DEG) + 1)
+    return [(row, (col + lon_cells // 2) % lon_cells - lon_cells // 2) for row in rows for col in cols]
+
+
+def _airport_for(prefix, airports):
+    # Controller callsigns start with the airport's ICAO code, or its FAA code in the US (SFO_TWR for KSFO)
+    a = airports.get(prefix)
+    if a is None and len(prefix) == 3:
+        a = airports.get('K' + prefix)
+    return a
+
+
+def _boundary_for(parts, airports, boundaries):
+    # Sector callsigns like EDGG_B_CTR may have their own FIR entry, otherwise fall back to the FIR prefix alone
+    candidates = ['_'.join(parts[:2]), parts[0]] if len(parts) > 2 else [parts[0]]
+    for prefix in candidates:
+        fir = airports.fir(prefix) if airports is not None else None
+        b = boundaries.get(fir.boundary if fir is not None else prefix)
+        if b is not None:
+            return b
+    return None
+
+
+class CoverageMap:
+    # Which online controllers cover which pilots, for one snapshot. Controllers are turned into regions (circles around
+    # their airport, or FIR polygons) and registered in a coarse lat/lon grid, so each pilot is only tested against the
+    # handful of regions that overlap its cell
+
+    def __init__(self, pilots: Mapping[int, ActivePilot], controllers: Mapping[int, Controller],
+                 airports: Optional[VatspyAirports] = None, boundaries: Optional[VatspyBoundaries] = None) -> None:
+        self.regions = []
+        unresolved = []
+        grid = defaultdict(list)
+
+        for c in controllers.values():
+            region = self._region_for(c, airports, boundaries)
+            if region is None:
+                unresolved.append(c)
+                continue
+            self.regions.append(region)
+            if region.boundary is not None:
+                cells = _cells_for_bbox(*region.boundary.bbox)
+            else:
+                cells = _cells_for_circle(region.latitude, region.longitude, region.radius)
+            for cell in cells:
+                grid[cell].append(region)
+
+        # Covering controllers are listed top-down, as a pilot would call them: airport positions in facility order
+        # (DEL, GND, TWR, APP), then enroute
+        def rank(region):
+            return region.boundary is not None, region.controller.facility.id
+
+        assignments = {}
+        uncovered = []
+        for cid, p in pilots.items():
+            cell = (floor(p.latitude / GRID_DEG), floor(p.longitude / GRID_DEG))
+            covering = sorted((r for r in grid.get(cell, ()) if r.contains(p.latitude, p.longitude)), key=rank)
+            if covering:
+                assignments[cid] = tuple(r.controller for r in covering)
+            else:
+                uncovered.append(cid)
+
+        self.assignments = MappingProxyType(assignments)
+        self.uncovered = tuple(uncovered)
+        self.unresolved_controllers = tuple(unresolved)
+
+    @staticmethod
+    def _region_for(controller, airports, boundaries):
+        if controller.facility is None or controller.facility.short not in CIRCLE_FACILITIES + BOUNDARY_FACILITIES:
+            return None
+        parts = controller.callsign.split('_')
+
+        if controller.facility.short in BOUNDARY_FACILITIES:
+            b = _boundary_for(parts, airports, boundaries) if boundaries is not None else None
+            return CoverageRegion(controller, None, None, None, b) if b is not None else None
+
+        a = _airport_for(parts[0], airports) if airports is not None else None
+        if a is None or not controller.visual_range:
+            return None
+        return CoverageRegion(controller, a.latitude, a.longitude, controller.visual_range, None)
+
+    def covering(self, cid: int) -> tuple[Controller, ...]:
+        return self.assignments.get(cid, ())
+
+    def covered_by(self, controller_cid: int) -> list[int]:
+        return [cid for cid, controllers in self.assignments.items() if any(c.cid == controller_cid for c in controllers)]
@@ -0,0 +1,91 @@
+from __future__ import annotations # Required for type annotations to use forward reference
+import json
+from typing import Any, Callable, Optional
+
+
+# JSON backends by name, fastest first. Each loader returns a function that takes a response body (bytes or str) and
+# returns plain dicts and lists, so the rest of the parsing is the same whichever one is used
+def _msgspec():
+    import msgspec
+
+    return msgspec.json.Decoder().decode
+
+
+def _orjson():
+    import orjson
+
+    return orjson.loads
+
+
+def _stdlib():
+    return json.loads
+
+
+BACKENDS = {
+    'msgspec' : _msgspec,
+    'orjson'  : _orjson,
+    'json'    : _stdlib
+}
+
+
+class TypedFeed(dict):
+    # A decoded network data feed whose records are structs rather than dicts, see feed_structs. VatsimLiveAPI builds
+    # its dataclasses from these with from_typed instead of from_api_json
+    pass
+
+
+def _msgspec_feed():
+    import msgspec
+    from .feed_structs import FeedStruct
+
+    decode = msgspec.json.Decoder(FeedStruct).decode
+    fields = FeedStruct.__struct_fields__
+
+    def decode_feed(body):
+        feed = decode(body)
+        return TypedFeed((name, getattr(feed, name)) for name in fields)
+    return decode_feed
+
+
+# Backends that can decode the network data feed straight into typed records, in one pass. The others decode it to
+# dicts like any other payload
+FEED_BACKENDS = {
+    'msgspec' : _msgspec_feed
+}
+
+
+def available_backends() -> list[str]:
+    names = []
+    for name, loader in BACKENDS.items():
+        try:
+            loader()
+        except ImportError:
+            continue
+        names.append(name)
+    return names
+
+
+# The fastest installed backend, found once rather than by trying the imports again for every API instance
+DEFAULT_BACKEND = available_backends()[0]
+
+
+def _resolve(backend):
+    if backend is None:
+        return DEFAULT_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError('unknown JSON backend %r, expected one of %s' % (backend, ', '.join(BACKENDS)))
+    return backend
+
+
+def json_decoder(backend: Optional[str] = None) -> Callable[[bytes | str], Any]:
+    # The named backend, or the fastest installed one when backend is None. Asking for a backend that isn't installed
+    # raises the ImportError rather than quietly falling back
+    return BACKENDS[_resolve(backend)]()
+
+
+def feed_decoder(backend: Optional[str] = None) -> Callable[[bytes | str], dict]:
+    # Like json_decoder, but for the network data feed: a TypedFeed where the backend can decode into structs
+    backend = _resolve(backend)
+    if backend in FEED_BACKENDS:
+        return FEED_BACKENDS[backend]()
+    return BACKENDS[backend]()
@@ -0,0 +1,69 @@
+from __future__ import annotations # Required for type annotations to use forward reference
+from datetime import datetime
+from typing import Optional
+
+import msgspec
+
+
+# The v3 network data feed's records as msgspec structs, so the decoder builds them (timestamps included) in the same
+# pass that reads the JSON, and the from_typed constructors only have to join them to the lookup tables. Only imported
+# by the msgspec backend, see decoders.feed_decoder. Small lookup tables and flight plans are left as dicts: there are
+# only a few of the former, and the latter are only parsed when a new revision is filed
+
+class PilotStruct(msgspec.Struct, kw_only=True):
+    cid: int
+    name: str
+    callsign: str
+    server: str
+    pilot_rating: int
+    military_rating: int
+    latitude: float
+    longitude: float
+    altitude: int
+    groundspeed: int
+    transponder: str
+    heading: int
+    qnh_i_hg: float
+    qnh_mb: int
+    flight_plan: Optional[dict] = None
+    logon_time: datetime
+    last_updated: datetime
+
+
+class PrefileStruct(msgspec.Struct, kw_only=True):
+    cid: int
+    name: str
+    callsign: str
+    flight_plan: Optional[dict] = None
+    last_updated: datetime
+
+
+class ControllerStruct(msgspec.Struct, kw_only=True):
+    cid: int
+    name: str
+    callsign: str
+    frequency: str
+    facility: int
+    rating: int
+    server: str
+    visual_range: int
+    text_atis: Optional[list[str]] = None
+    last_updated: datetime
+    logon_time: datetime
+
+
+class AtisStruct(ControllerStruct, kw_only=True):
+    atis_code: Optional[str] = None
+
+
+class FeedStruct(msgspec.Struct):
+    general: dict
+    pilots: list[PilotStruct]
+    controllers: list[ControllerStruct]
+    atis: list[AtisStruct]
+    servers: list[dict]
+    prefiles: list[PrefileStruct]
+    facilities: list[dict]
+    ratings: list[dict]
+    pilot_ratings: list[dict]
+    military_ratings: list[dict]
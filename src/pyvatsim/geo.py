@@ -0,0 +1,40 @@
+from math import asin, atan2, cos, degrees, radians, sin, sqrt
+
+# Constants
+EARTH_RADIUS_NM = 3440.065
+FEET_PER_NM = 6076.12
+
+
+def distance_nm(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    # Great-circle distance using the haversine formula
+    phi1, phi2 = radians(lat1), radians(lat2)
+    a = sin((phi2 - phi1) / 2) ** 2 + cos(phi1) * cos(phi2) * sin(radians(lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_NM * asin(min(1.0, sqrt(a)))
+
+
+def distances_nm(lat1s: list[float], lon1s: list[float], lat2s: list[float], lon2s: list[float]) -> list[float]:
+    # Batch version of distance_nm over parallel sequences. Function lookups are bound locally so the whole batch runs
+    # as a single comprehension, which is several times quicker than calling distance_nm in a loop
+    _sin, _cos, _asin, _sqrt, _rad, r2 = sin, cos, asin, sqrt, radians, 2 * EARTH_RADIUS_NM
+    return [
+        r2 * _asin(min(1.0, _sqrt(_sin((_rad(b1) - _rad(a1)) / 2) ** 2 + _cos(_rad(a1)) * _cos(_rad(b1)) * _sin(_rad(b2 - a2) / 2) ** 2)))
+        for a1, a2, b1, b2 in zip(lat1s, lon1s, lat2s, lon2s)
+    ]
+
+
+def bearing_deg(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    # Initial true bearing from the first point to the second, 0-360
+    phi1, phi2 = radians(lat1), radians(lat2)
+    dlon = radians(lon2 - lon1)
+    x = sin(dlon) * cos(phi2)
+    y = cos(phi1) * sin(phi2) - sin(phi1) * cos(phi2) * cos(dlon)
+    return (degrees(atan2(x, y)) + 360) % 360
+
+
+def destination(lat: float, lon: float, bearing: float, distance: float) -> tuple[float, float]:
+    # Point reached travelling distance (nm) from lat/lon along the given true bearing
+    phi1, lambda1, theta = radians(lat), radians(lon), radians(bearing)
+    delta = distance / EARTH_RADIUS_NM
+    phi2 = asin(sin(phi1) * cos(delta) + cos(phi1) * sin(delta) * cos(theta))
+    lambda2 = lambda1 + atan2(sin(theta) * sin(delta) * cos(phi1), cos(delta) - sin(phi1) * sin(phi2))
+    return degrees(phi2), (degrees(lambda2) + 540) % 360 - 180
@@ -0,0 +1,174 @@
+from __future__ import annotations # Required for type annotations to use forward reference
+import sqlite3
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Iterator, Optional
+
+if TYPE_CHECKING:
+    from .liveapi import ActivePilot, VatsimLiveAPI
+
+
+# Columns written for every pilot row, after the snapshot time. A pilot's row is only written when one of these changes,
+# so a pilot's state at any time is its latest row at or before that time
+COLUMNS = ('cid', 'callsign', 'connected', 'latitude', 'longitude', 'altitude', 'groundspeed', 'heading', 'transponder',
+           'qnh_mb', 'server', 'departure', 'arrival', 'aircraft_short', 'revision_id')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    ts REAL PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS pilots (
+    ts REAL NOT NULL,
+    cid INTEGER NOT NULL,
+    callsign TEXT NOT NULL,
+    connected INTEGER NOT NULL,
+    latitude REAL,
+    longitude REAL,
+    altitude INTEGER,
+    groundspeed INTEGER,
+    heading INTEGER,
+    transponder TEXT,
+    qnh_mb INTEGER,
+    server TEXT,
+    departure TEXT,
+    arrival TEXT,
+    aircraft_short TEXT,
+    revision_id INTEGER
+);
+CREATE INDEX IF NOT EXISTS pilots_ts ON pilots (ts);
+CREATE INDEX IF NOT EXISTS pilots_cid_ts ON pilots (cid, ts);
+CREATE INDEX IF NOT EXISTS pilots_callsign_ts ON pilots (callsign, ts);
+"""
+
+
+@dataclass(frozen=True)
+class PilotRecord:
+    time: datetime
+    cid: int
+    callsign: str
+    connected: bool # False marks the snapshot where the pilot disconnected; all other fields are then None
+    latitude: None | float
+    longitude: None | float
+    altitude: None | int
+    groundspeed: None | int
+    heading: None | int
+    transponder: None | str
+    qnh_mb: None | int
+    server: None | str
+    departure: None | str
+    arrival: None | str
+    aircraft_short: None | str
+    revision_id: None | int
+
+    @classmethod
+    def from_row(cls, row: tuple) -> PilotRecord:
+        ts, cid, callsign, connected, *rest = row
+        return cls(datetime.fromtimestamp(ts, timezone.utc), cid, callsign, bool(connected), *rest)
+
+
+def _pilot_row(p: ActivePilot) -> tuple:
+    fp = p.flight_plan
+    return (p.cid, p.callsign, 1, p.latitude, p.longitude, p.altitude, p.groundspeed, p.heading, p.transponder, p.qnh_mb,
+            p.server.ident if p.server is not None else None,
+            fp.departure if fp is not None else None,
+            fp.arrival if fp is not None else None,
+            fp.aircraft_short if fp is not None else None,
+            fp.revision_id if fp is not None else None)
+
+
+class HistoryStore:
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL') # lets other processes read while we write
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._last_rows = None # cid -> last row written for every connected pilot, loaded on first write
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def _load_last_rows(self):
+        # Pick up where an earlier process left off, so a restart doesn't rewrite every pilot. Called with self._lock held
+        cursor = self._conn.execute(
+            'SELECT %s FROM pilots p WHERE ts = (SELECT MAX(ts) FROM pilots WHERE cid = p.cid)' % ', '.join(COLUMNS))
+        return {row[0]: row for row in cursor if row[2]}
+
+    def write(self, api: VatsimLiveAPI) -> int:
+        # Snapshot sink, see VatsimLiveAPI.add_snapshot_sink. Returns the number of pilot rows written
+        from .liveapi import UpdateMode
+
+        ts = api._server_last_updated.timestamp()
+        pilots = api.pilots(update_mode=UpdateMode.NOUPDATE) or {}
+
+        with self._lock:
+            if self._last_rows is None:
+                self._last_rows = self._load_last_rows()
+            last_rows = self._last_rows
+
+            changed = []
+            current = {}
+            for cid, p in pilots.items():
+                row = _pilot_row(p)
+                current[cid] = row
+                if last_rows.get(cid) != row:
+                    changed.append((ts,) + row)
+            for cid, row in last_rows.items():
+                if cid not in current:
+                    changed.append((ts, cid, row[1], 0) + (None,) * (len(COLUMNS) - 3))
+
+            # One transaction and one executemany per snapshot
+            with self._conn:
+                cursor = self._conn.execute('INSERT OR IGNORE INTO snapshots (ts) VALUES (?)', (ts,))
+                if cursor.rowcount == 0:
+                    return 0 # already stored, e.g. by an earlier run
+                self._conn.executemany('INSERT INTO pilots (ts, %s) VALUES (%s)' % (', '.join(COLUMNS), ', '.join('?' * (len(COLUMNS) + 1))),
+                                       changed)
+            self._last_rows = current
+            return len(changed)
+
+    @staticmethod
+    def _range(start, end):
+        clauses, params = [], []
+        if start is not None:
+            clauses.append('ts >= ?')
+            params.append(start.timestamp())
+        if end is not None:
+            clauses.append('ts < ?')
+            params.append(end.timestamp())
+        return clauses, params
+
+    def _iter_rows(self, sql, params, batch_size):
+        # Rows are pulled from SQLite a batch at a time, so a long range never has to fit in memory. The connection is
+        # shared with the snapshot sink's writes, so every call into it holds the lock, but consumers run without it
+        with self._lock:
+            cursor = self._conn.execute(sql, params)
+        try:
+            while True:
+                with self._lock:
+                    rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    return
+                yield from rows
+        finally:
+            with self._lock:
+                cursor.close()
+
+    def pilot_records(self, start: Optional[datetime] = None, end: Optional[datetime] = None, cid: Optional[int] = None,
+                      callsign: Optional[str] = None, batch_size: int = 1000) -> Iterator[PilotRecord]:
+        clauses, params = self._range(start, end)
+        if cid is not None:
+            clauses.append('cid = ?')
+            params.append(cid)
+        if callsign is not None:
+            clauses.append('callsign = ?')
+            params.append(callsign)
+        sql = 'SELECT ts, %s FROM pilots%s ORDER BY ts' % (', '.join(COLUMNS), ' WHERE ' + ' AND '.join(clauses) if clauses else '')
+        return (PilotRecord.from_row(row) for row in self._iter_rows(sql, params, batch_size))
+
+    def snapshot_times(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> Iterator[datetime]:
+        clauses, params = self._range(start, end)
+        sql = 'SELECT ts FROM snapshots%s ORDER BY ts' % (' WHERE ' + ' AND '.join(clauses) if clauses else '')
+        return (datetime.fromtimestamp(row[0], timezone.utc) for row in self._iter_rows(sql, params, 1000))
@@ -0,0 +1,104 @@
+from __future__ import annotations # Required for type annotations to use forward reference
+from collections.abc import Iterable, Mapping
+from datetime import datetime, timedelta
+from math import asin, atan2, cos, degrees, radians, sin
+from typing import TYPE_CHECKING, Optional
+
+from .geo import EARTH_RADIUS_NM, bearing_deg, destination, distance_nm
+
+if TYPE_CHECKING:
+    from .liveapi import ActivePilot
+
+
+# Constants
+HISTORY_WEIGHT = 0.5 # how far the course and speed are pulled from the reported values toward the observed track
+MAX_HISTORY_GAP = 120 # s, older previous positions aren't used for blending
+MIN_TRACK_DISTANCE = 0.05 # nm, pilots that moved less than this between updates don't have a usable observed track
+
+
+def _blend_course(heading, track, weight):
+    # Weighted mean of two angles, going the short way round
+    h, t = radians(heading), radians(track)
+    return (degrees(atan2((1 - weight) * sin(h) + weight * sin(t), (1 - weight) * cos(h) + weight * cos(t))) + 360) % 360
+
+
+class TrackModel:
+    # Dead-reckoning model for one snapshot. Everything that doesn't depend on the requested time is worked out once
+    # here, in parallel columns, so a prediction for the whole snapshot is a single comprehension over those columns.
+    #
+    # Each pilot is moved from its reported position along a course at a speed. Those are the reported heading and
+    # groundspeed, pulled toward the track and speed actually flown since the previous snapshot when we have one; the
+    # heading in the feed doesn't include wind drift, the observed track does
+
+    def __init__(self, pilots: Mapping[int, ActivePilot], previous: Optional[TrackModel] = None,
+                 history_weight: float = HISTORY_WEIGHT) -> None:
+        self.cids = []
+        self.latitudes = []
+        self.longitudes = []
+        self.times = [] # epoch seconds of each pilot's last_updated
+        self.courses = []
+        self.speeds = [] # nm/s
+        self._rows = {}
+
+        for cid, p in pilots.items():
+            t0 = p.last_updated.timestamp()
+            course, speed = p.heading, p.groundspeed
+
+            prev = previous.position_of(cid) if previous is not None else None
+            if prev is not None and speed > 0 and 0 < t0 - prev[2] <= MAX_HISTORY_GAP:
+                flown = distance_nm(prev[0], prev[1], p.latitude, p.longitude)
+                if flown >= MIN_TRACK_DISTANCE:
+                    course = _blend_course(course, bearing_deg(prev[0], prev[1], p.latitude, p.longitude), history_weight)
+                    speed = (1 - history_weight) * speed + history_weight * flown / (t0 - prev[2]) * 3600
+
+            self._rows[cid] = len(self.cids)
+            self.cids.append(cid)
+            self.latitudes.append(p.latitude)
+            self.longitudes.append(p.longitude)
+            self.times.append(t0)
+            self.courses.append(course)
+            self.speeds.append(speed / 3600)
+
+        # Per-pilot terms of the destination formula (see geo.destination) that don't depend on the distance travelled
+        self._terms = [
+            (radians(lon), sin(radians(lat)), cos(radians(lat)), cos(radians(lat)) * cos(radians(c)), sin(radians(c)) * cos(radians(lat)))
+            for lat, lon, c in zip(self.latitudes, self.longitudes, self.courses)
+        ]
+
+    def position_of(self, cid: int) -> None | tuple[float, float, float]:
+        # Reported (latitude, longitude, epoch seconds) for a pilot
+        row = self._rows.get(cid)
+        if row is None:
+            return None
+        return self.latitudes[row], self.longitudes[row], self.times[row]
+
+    def predict(self, at: datetime, cids: Optional[Iterable[int]] = None,
+                max_extrapolation: timedelta = timedelta(seconds=60)) -> dict[int, tuple[float, float]]:
+        # Positions at the given time, for every pilot or only the given cids. Pilots are never moved more than
+        # max_extrapolation past (or before) their last update, so a pilot whose updates stop doesn't fly off
+        t = at.timestamp()
+        limit = max_extrapolation.total_seconds()
+        rows = range(len(self.cids)) if cids is None else [self._rows[c] for c in cids if c in self._rows]
+
+        times, speeds, terms = self.times, self.speeds, self._terms
+        _sin, _cos, _asin, _atan2, _deg, r = sin, cos, asin, atan2, degrees, EARTH_RADIUS_NM
+        positions = []
+        for i in rows:
+            delta = speeds[i] * max(-limit, min(limit, t - times[i])) / r
+            lam, sin_phi, cos_phi, cos_phi_cos_c, sin_c_cos_phi = terms[i]
+            sin_d, cos_d = _sin(delta), _cos(delta)
+            sin_phi2 = sin_phi * cos_d + cos_phi_cos_c * sin_d
+            lam2 = lam + _atan2(sin_c_cos_phi * sin_d, cos_d - sin_phi * sin_phi2)
+            positions.append((_deg(_asin(sin_phi2)), (_deg(lam2) + 540) % 360 - 180))
+        return dict(zip((self.cids[i] for i in rows), positions))
+
+    def predict_one(self, cid: int, at: datetime, max_extrapolation: timedelta = timedelta(seconds=60)) -> None | tuple[float, float]:
+        row = self._rows.get(cid)
+        if row is None:
+            return None
+        limit = max_extrapolation.total_seconds()
+        elapsed = max(-limit, min(limit, at.timestamp() - self.times[row]))
+        return destination(self.latitudes[row], self.longitudes[row], self.courses[row], self.speeds[row] * elapsed)
+
+    def __len__(self) -> int:
+        return len(self.cids)
@@ -1,11 +1,38 @@
 from __future__ import annotations # Required for type annotations to use forward reference
-import requests
+import json
+import logging
+import os
 from datetime import datetime, timedelta, timezone
 from urllib.parse import urlencode
 import re
+import threading
+from collections import OrderedDict
+from collections.abc import Iterable, Mapping
+import time
 from dataclasses import dataclass
 from enum import Enum
-from typing import Optional
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Any, Callable, Iterator, Optional
+
+from .utils import VatspyAirports, VatspyBoundaries
+
+# Anything not needed to construct the API is imported where it's used, so importing pyvatsim stays cheap
+if TYPE_CHECKING:
+    import requests
+    from .coverage import CoverageMap
+    from .feed_structs import AtisStruct, ControllerStruct, PilotStruct, PrefileStruct
+    from .interpolation import TrackModel
+    from .members import Member, MemberLookup
+    from .registry import SharedCacheStats
+    from .metrics import FlightMetrics
+    from .proximity import Conflict, ProximityPair
+    from .query import Query
+    from .routes import RouteToken
+    from .stats import TrafficStats
+    from .weather import MetarStore, Weather
+
+
+logger = logging.getLogger(__name__)
 
 
 # Constants
@@ -45,9 +72,10 @@ class PilotRating(NameTable):
 
     @classmethod
     def from_api_json(cls, json_dict: dict, api: Optional[VatsimLiveAPI] = None) -> PilotRating:
-        json_dict['short'] = json_dict['short_name']
-        json_dict['long'] = json_dict['long_name']
-        return cls(**json_dict)
+        args = dict(json_dict)
+        args['short'] = args['short_name']
+        args['long'] = args['long_name']
+        return cls(**args)
 
 @dataclass
 class MilitaryRating(PilotRating):
@@ -66,12 +94,12 @@ class Server:
 
     @classmethod
     def from_api_json(cls, json_dict: dict, api: Optional[VatsimLiveAPI] = None) -> Server:
-        args = json_dict
+        args = dict(json_dict) # copy, so the raw feed we cache stays untouched
         args['clients_connection_allowed'] = bool(args['clients_connection_allowed'])
         return cls(**args)
 
 
-@dataclass
+@dataclass(frozen=True)
 class Flightplan:
     flight_rules: str
     aircraft: str
@@ -90,13 +118,20 @@ class Flightplan:
     revision_id: int
     assigned_transponder: str
 
+    # Fields that thousands of plans share a handful of values of
+    INTERNED = ('flight_rules', 'aircraft', 'aircraft_faa', 'aircraft_short', 'departure', 'arrival', 'alternate', 'route',
+                'assigned_transponder')
+
     @classmethod
     def from_api_json(cls, json_dict: dict, api: Optional[VatsimLiveAPI] = None) -> Flightplan:
 
         if json_dict is None:
             return None
 
-        args = json_dict
+        args = dict(json_dict)
+        if api is not None:
+            for k in cls.INTERNED:
+                args[k] = api._intern(args[k])
 
         # Vatsim API returns strings for some numeric values, so cast them
         args['cruise_tas'] = int(args['cruise_tas'])
@@ -140,6 +175,12 @@ class Flightplan:
 
         return cls(**args)
 
+    @property
+    def route_tokens(self) -> tuple[RouteToken, ...]:
+        from .routes import tokenize_route
+
+        return tokenize_route(self.route, self.revision_id)
+
 @dataclass
 class PrefiledPilot:
     cid: int
@@ -150,11 +191,16 @@ class PrefiledPilot:
 
     @classmethod
     def from_api_json(cls, json_dict: dict, api: VatsimLiveAPI) -> PrefiledPilot:
-        args = json_dict
-        args['flight_plan'] = Flightplan.from_api_json(args['flight_plan'], api)
+        args = dict(json_dict)
+        args['flight_plan'] = api._parse_flight_plan(args['cid'], args['callsign'], args['flight_plan'])
         args['last_updated'] = VatsimLiveAPI.parse_timestampstr(args['last_updated'])
         return cls(**args)
 
+    @classmethod
+    def from_typed(cls, record: PrefileStruct, api: VatsimLiveAPI) -> PrefiledPilot:
+        return cls(record.cid, record.name, record.callsign, api._parse_flight_plan(record.cid, record.callsign, record.flight_plan),
+                   record.last_updated)
+
 
 @dataclass
 class ActivePilot:
@@ -178,16 +224,27 @@ class ActivePilot:
 
     @classmethod
     def from_api_json(cls, json_dict: dict, api: VatsimLiveAPI) -> ActivePilot:
-        args = json_dict
+        args = dict(json_dict)
+        args['transponder'] = api._intern(args['transponder'])
         args['pilot_rating'] = api.pilot_rating(args['pilot_rating'])
         args['server'] = api.server(args['server'])
-        args['flight_plan'] = Flightplan.from_api_json(args['flight_plan'], api)
+        args['flight_plan'] = api._parse_flight_plan(args['cid'], args['callsign'], args['flight_plan'])
         args['logon_time'] = VatsimLiveAPI.parse_timestampstr(args['logon_time'])
         args['last_updated'] = VatsimLiveAPI.parse_timestampstr(args['last_updated'])
+        return cls(**args)
 
-        # add a field for time online? Maybe as post_init on class itself
+    @classmethod
+    def from_typed(cls, record: PilotStruct, api: VatsimLiveAPI) -> ActivePilot:
+        # Same as from_api_json, for a record the decoder has already typed (timestamps included), so only the joins
+        # are left to do
+        return cls(record.cid, record.name, record.callsign, api.server(record.server), api.pilot_rating(record.pilot_rating),
+                   record.military_rating, record.latitude, record.longitude, record.altitude, record.groundspeed,
+                   api._intern(record.transponder), record.heading, record.qnh_i_hg, record.qnh_mb,
+                   api._parse_flight_plan(record.cid, record.callsign, record.flight_plan), record.logon_time, record.last_updated)
 
-        return cls(**args)
+    @property
+    def time_online(self) -> timedelta:
+        return datetime.now(timezone.utc) - self.logon_time
 
 
 @dataclass
@@ -235,9 +292,10 @@ class Controller:
 
     @classmethod
     def from_api_json(cls, json_dict: dict, api: VatsimLiveAPI) -> Controller:
-        args = json_dict
+        args = dict(json_dict)
+        args['frequency'] = api._intern(args['frequency'])
         if args['text_atis'] is not None:
-            args['text_atis'] = '\n'.join(args['text_atis'])
+            args['text_atis'] = api._intern('\n'.join(args['text_atis']))
         args['logon_time'] = VatsimLiveAPI.parse_timestampstr(args['logon_time'])
         args['last_updated'] = VatsimLiveAPI.parse_timestampstr(args['last_updated'])
         args['facility'] = api.facility(args['facility'])
@@ -245,6 +303,13 @@ class Controller:
         args['server'] = api.server(args['server'])
         return cls(**args)
 
+    @classmethod
+    def from_typed(cls, record: ControllerStruct, api: VatsimLiveAPI) -> Controller:
+        text_atis = api._intern('\n'.join(record.text_atis)) if record.text_atis is not None else None
+        return cls(record.cid, record.name, record.callsign, api._intern(record.frequency), api.facility(record.facility),
+                   api.controller_rating(record.rating), api.server(record.server), record.visual_range, text_atis,
+                   record.last_updated, record.logon_time)
+
 
 @dataclass
 class ATIS(Controller):
@@ -252,9 +317,10 @@ class ATIS(Controller):
 
     @classmethod
     def from_api_json(cls, json_dict: dict, api: VatsimLiveAPI) -> ATIS:
-        args = json_dict
+        args = dict(json_dict)
+        args['frequency'] = api._intern(args['frequency'])
         if args['text_atis'] is not None:
-            args['text_atis'] = ' '.join(args['text_atis'])
+            args['text_atis'] = api._intern(' '.join(args['text_atis']))
         args['logon_time'] = VatsimLiveAPI.parse_timestampstr(args['logon_time'])
         args['last_updated'] = VatsimLiveAPI.parse_timestampstr(args['last_updated'])
         args['facility'] = api.facility(args['facility'])
@@ -262,6 +328,80 @@ class ATIS(Controller):
         args['server'] = api.server(args['server'])
         return cls(**args)
 
+    @classmethod
+    def from_typed(cls, record: AtisStruct, api: VatsimLiveAPI) -> ATIS:
+        text_atis = api._intern(' '.join(record.text_atis)) if record.text_atis is not None else None
+        return cls(record.cid, record.name, record.callsign, api._intern(record.frequency), api.facility(record.facility),
+                   api.controller_rating(record.rating), api.server(record.server), record.visual_range, text_atis,
+                   record.last_updated, record.logon_time, record.atis_code)
+
+
+class FlightplanSource(Enum):
+    ALL = 0
+    ACTIVE = 1
+    PREFILED = 2
+
+
+class FlightplanView(Mapping):
+
+    def __init__(self, pilots: Optional[dict[int, ActivePilot]] = None, prefiles: Optional[dict[int, PrefiledPilot]] = None) -> None:
+        # callsign -> (cid, flight plan, is prefiled). Prefiles go in first so that if a callsign is both prefiled and
+        # connected, the active pilot's plan wins
+        entries = {}
+        for records, prefiled in ((prefiles, True), (pilots, False)):
+            if records is None:
+                continue
+            for cid, p in records.items():
+                if p.flight_plan is not None:
+                    entries[p.callsign] = (cid, p.flight_plan, prefiled)
+
+        self._plans = {}
+        self._cids = {}
+        self._callsigns = {}
+        self._prefiled = set()
+        self._departures = {}
+        self._arrivals = {}
+        self._alternates = {}
+        for callsign, (cid, fp, prefiled) in entries.items():
+            self._plans[callsign] = fp
+            self._cids[callsign] = cid
+            self._callsigns[cid] = callsign
+            if prefiled:
+                self._prefiled.add(callsign)
+            self._departures.setdefault(fp.departure, []).append(callsign)
+            self._arrivals.setdefault(fp.arrival, []).append(callsign)
+            self._alternates.setdefault(fp.alternate, []).append(callsign)
+
+    def __getitem__(self, callsign: str) -> Flightplan:
+        return self._plans[callsign]
+
+    def __iter__(self):
+        return iter(self._plans)
+
+    def __len__(self) -> int:
+        return len(self._plans)
+
+    def by_cid(self, cid: int) -> None | Flightplan:
+        return self._plans[self._callsigns[cid]] if cid in self._callsigns else None
+
+    def cid(self, callsign: str) -> None | int:
+        return self._cids.get(callsign)
+
+    def is_prefiled(self, callsign: str) -> bool:
+        return callsign in self._prefiled
+
+    def _from_index(self, index, icao):
+        return {c: self._plans[c] for c in index.get(icao, ())}
+
+    def departures(self, icao: str) -> dict[str, Flightplan]:
+        return self._from_index(self._departures, icao)
+
+    def arrivals(self, icao: str) -> dict[str, Flightplan]:
+        return self._from_index(self._arrivals, icao)
+
+    def alternates(self, icao: str) -> dict[str, Flightplan]:
+        return self._from_index(self._alternates, icao)
+
 
 class TTLCache:
     def __init__(self, ttl):
@@ -280,77 +420,438 @@ class TTLCache:
         # TODO - should probably add logic checks for stale data here, maybe throw error if attempting to get cached data older than TTL
         return self._cache[key] if key in self._cache else None
 
-    def cache(self, val, key='_ALL'):
+    def cache(self, val, key='_ALL', updated: Optional[datetime] = None):
         self._cache[key] = val
-        self._last_update_time[key] = datetime.now(timezone.utc)
+        self._last_update_time[key] = datetime.now(timezone.utc) if updated is None else updated
+
+
+class InternTable:
+    # Hands out one shared copy of each string value, so the thousands of records in a snapshot that carry the same
+    # aircraft type or airport point at the same object, and comparing two of them is an identity check. Values are
+    # kept for as long as the latest snapshot uses them, and at most max_size of them, so the table can't grow
+    # without bound on a long-running process
+
+    def __init__(self, max_size: int = 50000) -> None:
+        self.max_size = max_size
+        self._previous = {}
+        self._current = {}
+
+    def __call__(self, value):
+        if not isinstance(value, str):
+            return value
+        shared = self._current.get(value)
+        if shared is not None:
+            return shared
+        shared = self._previous.get(value, value)
+        if len(self._current) < self.max_size:
+            self._current[shared] = shared
+        return shared
+
+    def rotate(self) -> None:
+        # Called once a snapshot has been parsed; anything it didn't use is dropped after the next one
+        self._previous = self._current
+        self._current = {}
+
+    def __len__(self) -> int:
+        return len(self._current)
+
+
+class EndpointMirrors:
+
+    def __init__(self, urls: list[str], smoothing: float = 0.3, cooldown: int = 30) -> None:
+        self.urls = list(urls)
+        self.smoothing = smoothing
+        self.cooldown = cooldown
+        self._latency = {url: None for url in self.urls}
+        self._down_until = {url: None for url in self.urls}
+        self._lock = threading.Lock()
+
+    def is_healthy(self, url: str) -> bool:
+        down_until = self._down_until.get(url)
+        return down_until is None or datetime.now(timezone.utc) >= down_until
+
+    def latency(self, url: str) -> None | float:
+        return self._latency.get(url)
+
+    def ordered(self) -> list[str]:
+        # Healthy mirrors first, fastest first. Mirrors we haven't timed yet sort as if they were instant so that each
+        # one gets measured once; mirrors marked down are kept at the end as a last resort
+        def sort_key(url):
+            latency = self._latency[url]
+            return (not self.is_healthy(url), 0 if latency is None else latency)
+        with self._lock:
+            return sorted(self.urls, key=sort_key)
+
+    @property
+    def fastest(self) -> str:
+        return self.ordered()[0]
+
+    def record_success(self, url: str, elapsed: float) -> None:
+        with self._lock:
+            previous = self._latency[url]
+            self._latency[url] = elapsed if previous is None else (1 - self.smoothing) * previous + self.smoothing * elapsed
+            self._down_until[url] = None
+
+    def record_failure(self, url: str) -> None:
+        with self._lock:
+            self._down_until[url] = datetime.now(timezone.utc) + timedelta(seconds=self.cooldown)
+
+    def merge(self, urls: list[str]) -> EndpointMirrors:
+        # Build a new mirror set for a re-read status.json, carrying over what we've learned about mirrors that are kept
+        m = EndpointMirrors(urls, self.smoothing, self.cooldown)
+        for url in m.urls:
+            if url in self._latency:
+                m._latency[url] = self._latency[url]
+                m._down_until[url] = self._down_until[url]
+        return m
+
+
+# 4xx statuses that are about the mirror (it timed us out or is rate limiting us) rather than about what we asked for
+MIRROR_CLIENT_ERRORS = (408, 429)
+
+
+def _is_client_error(e):
+    # True if every mirror would give the same answer, so there's no point failing over
+    response = getattr(e, 'response', None)
+    return response is not None and 400 <= response.status_code < 500 and response.status_code not in MIRROR_CLIENT_ERRORS
 
 
 class VatsimEndpoints:
 
-    def __init__(self, status_url: str = STATUS_JSON_URL) -> None:
+    # Maps our source names to where the mirror lists live in status.json
+    STATUS_KEYS = {
+        'data'             : ('data', 'v3'),
+        'transceivers'     : ('data', 'transceivers'),
+        'servers'          : ('data', 'servers'),
+        'servers_sweatbox' : ('data', 'servers_sweatbox'),
+        'user'             : ('user',),
+        'metar'            : ('metar',)
+    }
+    ETAG_CACHE_SIZE = 64 # URLs whose last response is kept for conditional requests, least recently used dropped first
+
+    def __init__(self, status_url: str = STATUS_JSON_URL, timeout: float = 10, hedge_after: Optional[float] = None, STATUS_TTL: int = 3600,
+                 status_cache_path: Optional[str] = None) -> None:
+        self.status_json_url = status_url
+        self.timeout = timeout
+        self.hedge_after = hedge_after
+        self.status_cache_path = status_cache_path
+        self.mirrors = {}
+        self._overrides = set() # sources whose URL was set by hand, and so aren't replaced by status.json
+        self._status_cache = TTLCache(STATUS_TTL)
+        self._etag_cache = OrderedDict() # full url -> last response that carried an ETag, for conditional requests
+        self._etag_lock = threading.Lock()
+        self._status_lock = threading.Lock()
+        # status.json is only read on the first fetch (or URL lookup), so constructing endpoints never blocks
+
+    def _apply_status(self, j, updated=None):
+        mirrors = {}
+        for source, path in VatsimEndpoints.STATUS_KEYS.items():
+            if source in self._overrides:
+                mirrors[source] = self.mirrors[source]
+                continue
+            urls = j
+            for k in path:
+                urls = urls[k]
+            mirrors[source] = self.mirrors[source].merge(urls) if source in self.mirrors else EndpointMirrors(urls)
+        self.mirrors = mirrors
+        self._status_cache.cache(j, updated=updated)
+
+    def _read_status_file(self):
+        # Returns (status, fetched at) from the on-disk copy, or None if there isn't a usable one for our status URL
+        try:
+            with open(self.status_cache_path) as f:
+                cached = json.load(f)
+        except (OSError, ValueError) as e:
+            return None
+        if not isinstance(cached, dict) or cached.get('url') != self.status_json_url:
+            return None
+        return cached['status'], datetime.fromtimestamp(cached['fetched'], timezone.utc)
 
+    def _write_status_file(self, j):
+        # Write next to the target and rename over it, so a concurrent reader never sees half a file
+        directory = os.path.dirname(os.path.abspath(self.status_cache_path))
+        tmp_path = os.path.join(directory, '.%s.%d.tmp' % (os.path.basename(self.status_cache_path), os.getpid()))
         try:
-            r = requests.get(status_url)
-        except Exception as e:
-            raise
+            os.makedirs(directory, exist_ok=True)
+            with open(tmp_path, 'w') as f:
+                json.dump({'url': self.status_json_url, 'fetched': time.time(), 'status': j}, f)
+            os.replace(tmp_path, self.status_cache_path)
+        except OSError as e:
+            # The disk copy is only an optimization
+            pass
+
+    def reload_status(self) -> None:
+        import requests
 
+        r = requests.get(self.status_json_url, timeout=self.timeout)
         j = r.json()
-        self.status_json_url = status_url
-        self.data_json_url = j['data']['v3'][0]
-        self.transceivers_json_url = j['data']['transceivers'][0]
-        self.servers_json_url = j['data']['servers'][0]
-        self.servers_sweatbox_json_url = j['data']['servers_sweatbox'][0]
-        self.user_php_url = j['user'][0]
-        self.metar_php_url = j['metar'][0]
+        self._apply_status(j)
+        if self.status_cache_path is not None:
+            self._write_status_file(j)
+
+    def _reload_status_if_needed(self):
+        if not self._status_cache.is_stale():
+            return
+        with self._status_lock:
+            if not self._status_cache.is_stale():
+                return
+            # A fresh enough copy on disk saves the request entirely, which matters for short-lived processes
+            on_disk = self._read_status_file() if self.status_cache_path is not None and len(self.mirrors) == 0 else None
+            if on_disk is not None:
+                status, fetched = on_disk
+                if (datetime.now(timezone.utc) - fetched).total_seconds() <= self._status_cache.ttl:
+                    self._apply_status(status, updated=fetched)
+                    return
+            try:
+                self.reload_status()
+            except Exception as e:
+                # Keep serving from the mirrors we already know about (or a stale disk copy), and try again on the
+                # next fetch
+                if len(self.mirrors) == 0 and on_disk is not None:
+                    self._apply_status(on_disk[0], updated=on_disk[1])
+                elif len(self.mirrors) == 0:
+                    raise
+
+    def url(self, source: str) -> str:
+        return self.mirrors_for(source).fastest
+
+    def mirrors_for(self, source: str) -> EndpointMirrors:
+        if source not in self._overrides:
+            self._reload_status_if_needed()
+        return self.mirrors[source]
+
+    def _set_url(self, source, url):
+        self._overrides.add(source)
+        self.mirrors[source] = EndpointMirrors([url])
+
+    data_json_url = property(lambda self: self.url('data'), lambda self, v: self._set_url('data', v))
+    transceivers_json_url = property(lambda self: self.url('transceivers'), lambda self, v: self._set_url('transceivers', v))
+    servers_json_url = property(lambda self: self.url('servers'), lambda self, v: self._set_url('servers', v))
+    servers_sweatbox_json_url = property(lambda self: self.url('servers_sweatbox'), lambda self, v: self._set_url('servers_sweatbox', v))
+    user_php_url = property(lambda self: self.url('user'), lambda self, v: self._set_url('user', v))
+    metar_php_url = property(lambda self: self.url('metar'), lambda self, v: self._set_url('metar', v))
+
+    def _timed_get(self, mirrors, url, query):
+        import requests
+
+        full_url = url if query is None else url + '?' + urlencode(query)
+        # If we've seen an ETag for this URL, ask the server to reply 304 Not Modified instead of resending the body
+        with self._etag_lock:
+            cached = self._etag_cache.get(full_url)
+            if cached is not None:
+                self._etag_cache.move_to_end(full_url)
+        headers = {'If-None-Match': cached.headers['ETag']} if cached is not None else {}
+        start = time.perf_counter()
+        try:
+            r = requests.get(full_url, timeout=self.timeout, headers=headers)
+            r.raise_for_status()
+        except requests.RequestException as e:
+            # A 4xx like 404 is about what we asked for (e.g. an unknown cid), not about the mirror, so it isn't marked down
+            if not _is_client_error(e):
+                mirrors.record_failure(url)
+            raise
+        mirrors.record_success(url, time.perf_counter() - start)
+
+        if r.status_code == 304 and cached is not None:
+            return cached
+        if 'ETag' in r.headers:
+            with self._etag_lock:
+                self._etag_cache[full_url] = r
+                self._etag_cache.move_to_end(full_url)
+                if len(self._etag_cache) > self.ETAG_CACHE_SIZE:
+                    self._etag_cache.popitem(last=False)
+        return r
+
+    def get(self, source: str, query: Optional[dict] = None) -> requests.Response:
+        import requests
+
+        mirrors = self.mirrors_for(source)
+        candidates = mirrors.ordered()
+
+        if self.hedge_after is not None and len(candidates) > 1:
+            return self._hedged_get(mirrors, candidates, query)
+
+        if len(candidates) == 0:
+            raise ValueError('no mirrors known for %r' % source)
+
+        # Try mirrors in latency order, failing over to the next one on a timeout or server error
+        error = None
+        for url in candidates:
+            try:
+                return self._timed_get(mirrors, url, query)
+            except requests.RequestException as e:
+                if _is_client_error(e):
+                    raise # every mirror would answer the same
+                error = e
+        raise error
+
+    def _hedged_get(self, mirrors, candidates, query):
+        # Start with the fastest mirror. If it hasn't answered within hedge_after seconds (or it fails), also ask the next
+        # one, and so on. The first successful response wins; the losers are left to finish in the background
+        from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, as_completed, wait
+
+        executor = ThreadPoolExecutor(max_workers=len(candidates))
+        pending = set()
+        error = None
+        try:
+            for url in candidates:
+                pending.add(executor.submit(self._timed_get, mirrors, url, query))
+                done, pending = wait(pending, timeout=self.hedge_after, return_when=FIRST_COMPLETED)
+                for f in done:
+                    if f.exception() is None:
+                        return f.result()
+                    error = f.exception()
+                    if _is_client_error(error):
+                        raise error
+            # Every mirror has been asked, so wait for whatever is still outstanding
+            for f in as_completed(pending):
+                if f.exception() is None:
+                    return f.result()
+                error = f.exception()
+                if _is_client_error(error):
+                    raise error
+            raise error
+        finally:
+            executor.shutdown(wait=False)
+
+
+# Connection data tables, in the order they are parsed
+CONNDATA_TABLES = ('facilities', 'ratings', 'pilot_ratings', 'military_ratings', 'servers', 'pilots', 'prefiles', 'controllers', 'atis')
 
 
 class VatsimLiveAPI:
+    INTERN_TABLE_SIZE = 50000 # distinct strings shared between records, see InternTable
+    METAR_HISTORY = 12 # decoded reports kept per station, see MetarStore
 
-    def __init__(self, vatsim_endpoints: VatsimEndpoints = None, DATA_TTL: int = 15, METAR_TTL: int = 60) -> None:
+    def __init__(self, vatsim_endpoints: VatsimEndpoints = None, DATA_TTL: int = 15, METAR_TTL: int = 60, SERVERS_TTL: int = 300,
+                 airports: Optional[VatspyAirports] = None, heatmap_cell_deg: Optional[float] = None,
+                 boundaries: Optional[VatspyBoundaries] = None, json_backend: Optional[str] = None,
+                 member_cache_path: Optional[str] = None, share_caches: bool = False) -> None:
         if vatsim_endpoints is None:
             self.vatsim_endpoints = VatsimEndpoints()
         else:
             assert isinstance(vatsim_endpoints, VatsimEndpoints)
             self.vatsim_endpoints = vatsim_endpoints
 
+        self._init_options(airports, heatmap_cell_deg, boundaries, json_backend, member_cache_path, share_caches)
+        self._init_caches(DATA_TTL, METAR_TTL, SERVERS_TTL)
+
+    def _init_options(self, airports, heatmap_cell_deg, boundaries, json_backend, member_cache_path, share_caches):
+        # Everything but the endpoints and caches, shared with subclasses that set those up their own way
+        from .decoders import feed_decoder, json_decoder
+
+        self.airports = airports
+        self.boundaries = boundaries
+        self.heatmap_cell_deg = heatmap_cell_deg
+        self._decode = json_decoder(json_backend) # msgspec or orjson when installed, see decoders.BACKENDS
+        self._decode_feed = feed_decoder(json_backend) # typed records with msgspec, see decoders.FEED_BACKENDS
+        self.member_cache_path = member_cache_path
+        self._member_lookup = None
+        self.share_caches = share_caches # see registry.SharedCache
+
+    def _init_caches(self, DATA_TTL, METAR_TTL, SERVERS_TTL):
         self._metar_cache = TTLCache(METAR_TTL)
         self._conndata_cache  = TTLCache(DATA_TTL)
+        self._servers_cache = TTLCache(SERVERS_TTL)
         self._server_last_updated = None
 
-    def _fetch_metars(self, fields):
+        # Values derived from the connection data (metrics, indexes, ...) are built on first use and kept until the next
+        # server-side update. The previous snapshot's values are kept too, for anything that needs a trend
+        self._snapshot_derived = {}
+        self._previous_snapshot_derived = {}
+        self._query_plans = {}
+
+        # Parsed flight plans from the last snapshot, keyed by (cid, callsign, revision_id)
+        self._flight_plans = {}
+        self._next_flight_plans = {}
+        self._intern = InternTable(self.INTERN_TABLE_SIZE)
+
+        self._snapshot_sinks = []
+        self._sinks_notified = None # server timestamp of the last snapshot the sinks were called for
+
+        # Decoded weather, built from whichever metars mapping was last fed to it
+        self._metar_store = None
+        self._metar_store_source = None
+
+        # Proximity engines by cell size and altitude band, each with the snapshot time it was last updated for
+        self._proximity_engines = {}
+
+    def _fetch_metar_text(self, fields):
         if isinstance(fields, str):
             field_str = fields
         else:
             field_str = ','.join(fields)
-        url = self.vatsim_endpoints.metar_php_url + '?' + urlencode({'id': field_str})
-        try:
-            r = requests.get(url)
-        except Exception as e:
-            raise
+        return self.vatsim_endpoints.get('metar', {'id': field_str}).text
+
+    def _parse_metars(self, text):
+        # Reports whose text hasn't changed since the last refresh are reused as they are
+        previous = self._metar_cache.get_cached() or {}
         metars = {}
-        for row in r.text.splitlines():
-            metar = Metar.from_raw_text(row)
+        for row in text.splitlines():
+            metar = previous.get(row.split(' ', 1)[0])
+            if metar is None or metar.raw_text != row:
+                metar = Metar.from_raw_text(row)
             metars[metar.field] = metar
-
-        return metars
-
-    def _fetch_and_cache_conn_data(self):
-        try:
-            r = requests.get(self.vatsim_endpoints.data_json_url)
-        except Exception as e:
-            raise
-
-        json = r.json()
-
+        return MappingProxyType(metars)
+
+    def _attach_metars(self, metars, fetched=None):
+        self._metar_cache.cache(metars, updated=fetched)
+        # Decode new reports now, so history isn't lost when nobody asks for the weather between two refreshes
+        self._updated_metar_store()
+
+    def _updated_metar_store(self):
+        metars = self._metar_cache.get_cached()
+        if self._metar_store is None:
+            from .weather import MetarStore
+            self._metar_store = MetarStore(self.METAR_HISTORY)
+        if metars is not None and metars is not self._metar_store_source:
+            self._metar_store.update(metars)
+            self._metar_store_source = metars
+        return self._metar_store
+
+    def _fetch_conn_data(self):
+        return self._decode_feed(self.vatsim_endpoints.get('data').content)
+
+    def _fetch_servers(self, source):
+        return self._decode(self.vatsim_endpoints.get(source).content)
+
+    def _parse_servers(self, json):
+        result = {}
+        for i in json:
+            s = Server.from_api_json(i, self)
+            result[s.ident] = s
+        return MappingProxyType(result)
+
+    def _fetch_and_cache_conn_data(self, force=False):
+        self._store('data', self._download('data', force))
+
+    def _parse_conn_data(self, json):
+        # Parses into this instance, and returns the tables so other instances sharing the download can attach them.
+        # Sinks are left to _attach_conn_data: with shared caches this runs under the download's lock, and a sink that
+        # reads from another instance sharing it would wait on that lock forever
+        self._cache_conn_data(json, notify=False)
+        return self._server_last_updated, {name: self._conndata_cache.get_cached(name) for name in ('_ALL',) + CONNDATA_TABLES}
+
+    def _attach_conn_data(self, snapshot, fetched=None):
+        server_update_dt, tables = snapshot
+        if self._server_last_updated != server_update_dt: # otherwise already ours, either parsed here or attached before
+            self._begin_snapshot(server_update_dt)
+            for name, table in tables.items():
+                self._conndata_cache.cache(table, name, updated=fetched)
+        if self._sinks_notified != server_update_dt:
+            self._notify_snapshot_sinks()
+
+    def _cache_conn_data(self, json, notify=True):
         # Before we do anything, check the timestamp for the last server-side update. If the server-side data hasn't updated, 
         # we don't need to parse everything (even though the data might be "stale" according to our TTL)
         server_update_dt = self.parse_timestampstr(json['general']['update_timestamp'])
         if self._server_last_updated == server_update_dt:
             return # Don't cache anything here as we don't want to reset our internal TTL
 
-        # If we have new server-side data, update timestamp and cache raw result with '_ALL' special key
-        self._server_last_updated = server_update_dt
-        self._conndata_cache.cache(json)
+        # If we have new server-side data, update timestamp and cache the feed header with '_ALL' special key. The raw
+        # records aren't kept, they would pin a second copy of every string the parsed tables hold
+        self._begin_snapshot(server_update_dt)
+        self._conndata_cache.cache(json['general'])
 
         # Fetch configs map the json dict to
         #   1. class method that takes the json dict and returns an instance of the class
@@ -370,13 +871,71 @@ class VatsimLiveAPI:
             'atis'             : (ATIS.from_api_json,             'callsign')
         }
 
+        # Traffic counts are gathered while we parse, so they cost no extra pass over the data
+        from .stats import TrafficStatsBuilder
+        stats = TrafficStatsBuilder(self.airports, self.heatmap_cell_deg)
+
+        # Feeds decoded into structs (see decoders.TypedFeed) only need the joins done, by each class's from_typed
+        from .decoders import TypedFeed
+        if isinstance(json, TypedFeed):
+            fetch_configs.update({
+                'pilots'      : (ActivePilot.from_typed,   'cid'),
+                'prefiles'    : (PrefiledPilot.from_typed, 'cid'),
+                'controllers' : (Controller.from_typed,    'cid'),
+                'atis'        : (ATIS.from_typed,          'callsign')
+            })
+
         # Iterate over fetch configs to parse json into objects and cache
+        self._next_flight_plans = {}
         for name, (constructor, key) in fetch_configs.items():
             result = {}
+            add = stats.adders.get(name)
             for i in json[name]:
                 j = constructor(i, self)
                 result[getattr(j, key)] = j
-            self._conndata_cache.cache(result, name)
+                if add is not None:
+                    add(j)
+            self._conndata_cache.cache(MappingProxyType(result), name)
+        self._snapshot_derived['traffic_stats'] = stats.build()
+
+        # Only plans seen in this snapshot are kept, which drops clients that have disconnected and superseded revisions
+        self._flight_plans = self._next_flight_plans
+        self._next_flight_plans = {}
+        self._intern.rotate()
+        if notify:
+            self._notify_snapshot_sinks()
+
+    def add_snapshot_sink(self, sink: Callable[[VatsimLiveAPI], Any]) -> None:
+        # sink(api) is called once for every new server-side snapshot, after it has been parsed
+        self._snapshot_sinks.append(sink)
+
+    def _notify_snapshot_sinks(self):
+        # A failing sink is reported and skipped; it mustn't keep the others or the getter that fetched the data from
+        # seeing the snapshot
+        self._sinks_notified = self._server_last_updated
+        for sink in self._snapshot_sinks:
+            try:
+                sink(self)
+            except Exception as e:
+                logger.exception('Snapshot sink %r failed', sink)
+
+    def _parse_flight_plan(self, cid, callsign, json_dict):
+        # A plan only changes when a new revision is filed, so reuse what we parsed for the same revision last time,
+        # including when a prefile has since become an active pilot. Note this also keeps the deptime date from when the
+        # revision was first seen, rather than moving it to today
+        if json_dict is None:
+            return None
+        key = (cid, callsign, json_dict['revision_id'])
+        fp = self._flight_plans.get(key)
+        if fp is None:
+            fp = self._next_flight_plans.get(key) or Flightplan.from_api_json(json_dict, self)
+        self._next_flight_plans[key] = fp
+        return fp
+
+    def _begin_snapshot(self, server_update_dt):
+        self._server_last_updated = server_update_dt
+        self._previous_snapshot_derived = self._snapshot_derived
+        self._snapshot_derived = {}
 
     @staticmethod
     def parse_timestampstr(timestr: str) -> datetime:
@@ -408,26 +967,115 @@ class VatsimLiveAPI:
                 return
             case UpdateMode.NORMAL:
                 if self._metar_cache.is_stale(key):
-                    new_metars = self._fetch_metars('all')
-                    self._metar_cache.cache(new_metars)
+                    self._store('metar', self._download('metar'))
             case UpdateMode.FORCE:
-                new_metars = self._fetch_metars('all')
-                self._metar_cache.cache(new_metars)
+                self._store('metar', self._download('metar', force=True))
 
-    def metars(self, fields: Optional[str | list[str]] = None, update_mode: UpdateMode = UpdateMode.NORMAL) -> None | dict[str, Metar]:
+    def metars(self, fields: Optional[str | list[str]] = None, update_mode: UpdateMode = UpdateMode.NORMAL) -> None | Mapping[str, Metar]:
         self._update_metars_if_needed(update_mode=update_mode)
         if fields is None:
             return self._metar_cache.get_cached()
         else:
             # TODO -- can probably be smarter about not requesting all metars from API, but for now this works
-            r = {k: v for k, v in self._metar_cache.get_cached().items() if k in VatsimLiveAPI.wrap_if_single(fields)}
-            return r if len(r.keys()) > 0 else None
+            cached = self._metar_cache.get_cached()
+            r = {f: cached[f] for f in VatsimLiveAPI.wrap_if_single(fields) if f in cached}
+            return MappingProxyType(r) if len(r.keys()) > 0 else None
 
     def metar(self, field: str, update_mode: UpdateMode = UpdateMode.NORMAL) -> None | Metar:
         self._update_metars_if_needed(update_mode=update_mode) # could only request 1 filed instead of all
         cached = self._metar_cache.get_cached()
         return cached[field] if field in cached else None
 
+    def weather(self, fields: Optional[str | list[str]] = None, update_mode: UpdateMode = UpdateMode.NORMAL) -> None | Mapping[str, Weather]:
+        # Latest decoded report (flight category, wind, visibility, ceiling, QNH) per station
+        self._update_metars_if_needed(update_mode=update_mode)
+        latest = self._updated_metar_store().latest
+        if fields is None:
+            return latest if len(latest) > 0 else None
+        r = {f: latest[f] for f in VatsimLiveAPI.wrap_if_single(fields) if f in latest}
+        return MappingProxyType(r) if len(r.keys()) > 0 else None
+
+    def metar_history(self, field: str, update_mode: UpdateMode = UpdateMode.NORMAL) -> tuple[Weather, ...]:
+        # Up to METAR_HISTORY decoded reports for a station, oldest first
+        self._update_metars_if_needed(update_mode=update_mode)
+        return self._updated_metar_store().history(field)
+
+    def _update_servers_if_needed(self, key, update_mode=UpdateMode.NORMAL):
+        match update_mode:
+            case UpdateMode.NOUPDATE:
+                return
+            case UpdateMode.NORMAL:
+                if self._servers_cache.is_stale(key):
+                    self._store(key, self._download(key))
+            case UpdateMode.FORCE:
+                self._store(key, self._download(key, force=True))
+
+    def _sources(self):
+        # Each source maps to
+        #   1. the cache (and key) whose TTL decides whether the source is due
+        #   2. a function that only downloads the raw payload
+        #   3. a function that parses the payload into what is cached
+        #   4. a function that caches the parsed value, given when it was downloaded (None for now)
+        return {
+            'data'     : (self._conndata_cache, '_ALL',     self._fetch_conn_data,
+                          self._parse_conn_data, self._attach_conn_data),
+            'servers'  : (self._servers_cache,  'servers',  lambda: self._fetch_servers('servers'),
+                          self._parse_servers, lambda s, fetched=None: self._servers_cache.cache(s, 'servers', updated=fetched)),
+            'sweatbox' : (self._servers_cache,  'sweatbox', lambda: self._fetch_servers('servers_sweatbox'),
+                          self._parse_servers, lambda s, fetched=None: self._servers_cache.cache(s, 'sweatbox', updated=fetched)),
+            'metar'    : (self._metar_cache,    '_ALL',     lambda: self._fetch_metar_text('all'),
+                          self._parse_metars, self._attach_metars)
+        }
+
+    def _download(self, name, force=False):
+        # With a shared cache, downloads go through it: a recent enough download made by another instance (recent by
+        # our own TTL) is reused, and while one is in flight everyone else waits for it instead of starting their own
+        cache, _, fetch, _, _ = self._sources()[name]
+        if not self.share_caches:
+            return fetch()
+        from .registry import shared_cache
+        return shared_cache(self.vatsim_endpoints).fetch(name, 0 if force else cache.ttl, fetch, id(self))
+
+    def _store(self, name, payload):
+        _, _, _, parse, attach = self._sources()[name]
+        if not self.share_caches:
+            attach(parse(payload))
+        else:
+            attach(payload.parsed(parse, id(self)), payload.fetched)
+
+    def shared_cache_stats(self) -> None | SharedCacheStats:
+        # Downloads made and avoided by every instance sharing this one's cache, None if caches aren't shared
+        if not self.share_caches:
+            return None
+        from .registry import shared_cache
+        return shared_cache(self.vatsim_endpoints).stats()
+
+    def refresh(self, update_mode: UpdateMode = UpdateMode.NORMAL) -> None:
+        # Downloads run concurrently so a full refresh costs roughly the slowest single request. Parsing happens
+        # afterwards, in order, and only if every download succeeded, so all caches move to the new snapshot together
+        sources = self._sources()
+
+        match update_mode:
+            case UpdateMode.NOUPDATE:
+                return
+            case UpdateMode.NORMAL:
+                due = [k for k, v in sources.items() if v[0].is_stale(v[1])]
+            case UpdateMode.FORCE:
+                due = list(sources)
+
+        if len(due) == 0:
+            return
+
+        from concurrent.futures import ThreadPoolExecutor
+
+        force = update_mode == UpdateMode.FORCE
+        with ThreadPoolExecutor(max_workers=len(due)) as executor:
+            futures = {name: executor.submit(self._download, name, force) for name in due}
+            payloads = {name: f.result() for name, f in futures.items()}
+
+        for name in due:
+            self._store(name, payloads[name])
+
     def _update_conndata_if_needed(self, key='_ALL', update_mode=UpdateMode.NORMAL):
         match update_mode:
             case UpdateMode.NOUPDATE:
@@ -436,40 +1084,52 @@ class VatsimLiveAPI:
                 if self._conndata_cache.is_stale(key):
                     self._fetch_and_cache_conn_data()
             case UpdateMode.FORCE:
-                self._fetch_and_cache_conn_data()
+                self._fetch_and_cache_conn_data(force=True)
 
     def _return_whole(self, cache_key, update_mode):
         self._update_conndata_if_needed(update_mode=update_mode)
         return self._conndata_cache.get_cached(cache_key)
 
-    def _return_filtered(self, cache_key, filter_func, update_mode):
-        self._update_conndata_if_needed(update_mode=update_mode)
-        r = {}
-        for k, v in self._conndata_cache.get_cached(cache_key).items():
-            if filter_func(v):
-                r[k] = v
-        return r if len(r.keys()) > 0 else None
+    # Connection data tables keyed by cid, where a cid filter can be answered with direct lookups
+    CID_KEYED = ('pilots', 'prefiles', 'controllers')
 
-    def _return_list_filtered_cid_or_callsign(self, cache_key, cids=None, callsigns=None, update_mode=UpdateMode.NORMAL):
+    def _iter_filtered_cid_or_callsign(self, cache_key, cids=None, callsigns=None, update_mode=UpdateMode.NORMAL):
+        # Yields (key, value) pairs lazily straight from the cached snapshot, so callers can stop as soon as they have
+        # what they need and nothing is copied
+        self._update_conndata_if_needed(update_mode=update_mode)
+        records = self._conndata_cache.get_cached(cache_key)
+        if records is None:
+            return
         if cids is not None:
-            def filter(v):
-                return getattr(v, 'cid') in VatsimLiveAPI.wrap_if_single(cids)
-            return self._return_filtered(cache_key, filter, update_mode)
+            wanted = dict.fromkeys(VatsimLiveAPI.wrap_if_single(cids))
+            if cache_key in VatsimLiveAPI.CID_KEYED:
+                for cid in wanted:
+                    if cid in records:
+                        yield cid, records[cid]
+            else:
+                for k, v in records.items():
+                    if v.cid in wanted:
+                        yield k, v
         elif callsigns is not None:
-            def filter(v):
-                return any([re.search(i, getattr(v, 'callsign')) for i in VatsimLiveAPI.wrap_if_single(callsigns)])
-            return self._return_filtered(cache_key, filter, update_mode)
+            patterns = [re.compile(i) for i in VatsimLiveAPI.wrap_if_single(callsigns)]
+            for k, v in records.items():
+                if any(p.search(v.callsign) for p in patterns):
+                    yield k, v
         else:
+            yield from records.items()
+
+    def _return_list_filtered_cid_or_callsign(self, cache_key, cids=None, callsigns=None, update_mode=UpdateMode.NORMAL):
+        if cids is None and callsigns is None:
             return self._return_whole(cache_key, update_mode)
+        r = dict(self._iter_filtered_cid_or_callsign(cache_key, cids, callsigns, update_mode))
+        return MappingProxyType(r) if len(r.keys()) > 0 else None
 
     def _return_single_filtered_cid_or_callsign(self, cache_key, cid=None, callsign=None, update_mode=UpdateMode.NORMAL):
         if cid is not None:
             return self._return_single_exact_match(cache_key, cid, update_mode)
         elif callsign is not None:
-            def filter(v):
-                return getattr(v, 'callsign') == callsign
-            f = self._return_filtered(cache_key, filter, update_mode)
-            return f[list(f.keys())[0]] if f is not None else None
+            self._update_conndata_if_needed(update_mode=update_mode)
+            return next((v for v in self._conndata_cache.get_cached(cache_key).values() if v.callsign == callsign), None)
         else:
             return None
 
@@ -478,54 +1138,203 @@ class VatsimLiveAPI:
         r = self._conndata_cache.get_cached(cache_key)
         return r[val_key] if val_key in r else None
 
+    def _per_snapshot(self, name, build, update_mode=UpdateMode.NORMAL):
+        self._update_conndata_if_needed(update_mode=update_mode)
+        if name not in self._snapshot_derived:
+            self._snapshot_derived[name] = build()
+        return self._snapshot_derived[name]
+
+    def _build_flight_metrics(self):
+        from .metrics import compute_flight_metrics
+
+        return MappingProxyType(compute_flight_metrics(self._conndata_cache.get_cached('pilots'), self._server_last_updated,
+                                                       self.airports, self._previous_snapshot_derived.get('flight_metrics')))
+
+    def _build_track_model(self):
+        from .interpolation import TrackModel
+
+        return TrackModel(self._conndata_cache.get_cached('pilots') or {}, self._previous_snapshot_derived.get('track_model'))
+
+    def _build_coverage(self):
+        from .coverage import CoverageMap
+
+        c = self._conndata_cache
+        return CoverageMap(c.get_cached('pilots') or {}, c.get_cached('controllers') or {}, self.airports, self.boundaries)
+
+    def _build_traffic_stats(self):
+        # Only needed when the snapshot wasn't parsed here, otherwise the stats were gathered during parsing
+        from .stats import compute_traffic_stats
+
+        c = self._conndata_cache
+        return compute_traffic_stats(c.get_cached('pilots'), c.get_cached('prefiles'), c.get_cached('controllers'),
+                                     self.airports, self.heatmap_cell_deg)
+
+    # How many proximity engines (one per cell size) to keep between snapshots
+    PROXIMITY_ENGINES = 4
+
+    def _updated_proximity_engine(self, cell_nm, band_ft):
+        # Engines are kept across snapshots so each update only has to move the pilots that changed cell
+        from .proximity import ProximityEngine
+
+        engine, updated = self._proximity_engines.pop((cell_nm, band_ft), (None, None))
+        if engine is None:
+            engine = ProximityEngine(cell_nm, band_ft)
+        if updated != self._server_last_updated:
+            engine.update(self._conndata_cache.get_cached('pilots') or {})
+        self._proximity_engines[(cell_nm, band_ft)] = (engine, self._server_last_updated)
+        while len(self._proximity_engines) > VatsimLiveAPI.PROXIMITY_ENGINES:
+            del self._proximity_engines[next(iter(self._proximity_engines))]
+        return engine
+
     def pilot(self, cid: Optional[int] = None, callsign: Optional[str] = None, update_mode: UpdateMode = UpdateMode.NORMAL) -> None | ActivePilot:
         return self._return_single_filtered_cid_or_callsign('pilots', cid, callsign, update_mode)
 
-    def pilots(self, cids: Optional[int | list[int]] = None, callsigns: Optional[str | list[str]] = None, update_mode: UpdateMode = UpdateMode.NORMAL) -> None | dict[int, ActivePilot]:
+    def pilots(self, cids: Optional[int | list[int]] = None, callsigns: Optional[str | list[str]] = None, update_mode: UpdateMode = UpdateMode.NORMAL) -> None | Mapping[int, ActivePilot]:
         return self._return_list_filtered_cid_or_callsign('pilots', cids, callsigns, update_mode)
 
     def prefiled_pilot(self, cid: Optional[int] = None, callsign: Optional[str] = None, update_mode: UpdateMode = UpdateMode.NORMAL) -> None | PrefiledPilot:
         return self._return_single_filtered_cid_or_callsign('prefiles', cid, callsign, update_mode)
 
-    def prefiled_pilots(self, cids: Optional[int | list[int]] = None, callsigns: Optional[str | list[str]] = None, update_mode: UpdateMode = UpdateMode.NORMAL) -> None | dict[int, PrefiledPilot]:
+    def prefiled_pilots(self, cids: Optional[int | list[int]] = None, callsigns: Optional[str | list[str]] = None, update_mode: UpdateMode = UpdateMode.NORMAL) -> None | Mapping[int, PrefiledPilot]:
         return self._return_list_filtered_cid_or_callsign('prefiles', cids, callsigns, update_mode)
 
     def controller(self, cid: Optional[int] = None, callsign: Optional[str] = None, update_mode: UpdateMode = UpdateMode.NORMAL) -> None | Controller:
         return self._return_single_filtered_cid_or_callsign('controllers', cid, callsign, update_mode)
 
-    def controllers(self, cids: Optional[int | list[int]] = None, callsigns: Optional[str | list[str]] = None, update_mode: UpdateMode = UpdateMode.NORMAL) -> None | dict[int, Controller]:
+    def controllers(self, cids: Optional[int | list[int]] = None, callsigns: Optional[str | list[str]] = None, update_mode: UpdateMode = UpdateMode.NORMAL) -> None | Mapping[int, Controller]:
         return self._return_list_filtered_cid_or_callsign('controllers', cids, callsigns, update_mode)
 
     def atis(self, callsign: Optional[str] = None, update_mode: UpdateMode = UpdateMode.NORMAL) -> None | ATIS:
         return self._return_single_exact_match('atis', callsign, update_mode)
 
-    def atises(self, cids: Optional[int | list[int]] = None, callsigns: Optional[str | list[str]] = None, update_mode: UpdateMode = UpdateMode.NORMAL) -> None | dict[str, ATIS]:
+    def atises(self, cids: Optional[int | list[int]] = None, callsigns: Optional[str | list[str]] = None, update_mode: UpdateMode = UpdateMode.NORMAL) -> None | Mapping[str, ATIS]:
         return self._return_list_filtered_cid_or_callsign('atis', cids, callsigns, update_mode)
 
-    def pilot_ratings(self, update_mode: UpdateMode = UpdateMode.NORMAL) -> None | dict[int, PilotRating]:
+    def iter_pilots(self, cids: Optional[int | list[int]] = None, callsigns: Optional[str | list[str]] = None, update_mode: UpdateMode = UpdateMode.NORMAL) -> Iterator[ActivePilot]:
+        return (v for _, v in self._iter_filtered_cid_or_callsign('pilots', cids, callsigns, update_mode))
+
+    def iter_prefiled_pilots(self, cids: Optional[int | list[int]] = None, callsigns: Optional[str | list[str]] = None, update_mode: UpdateMode = UpdateMode.NORMAL) -> Iterator[PrefiledPilot]:
+        return (v for _, v in self._iter_filtered_cid_or_callsign('prefiles', cids, callsigns, update_mode))
+
+    def iter_controllers(self, cids: Optional[int | list[int]] = None, callsigns: Optional[str | list[str]] = None, update_mode: UpdateMode = UpdateMode.NORMAL) -> Iterator[Controller]:
+        return (v for _, v in self._iter_filtered_cid_or_callsign('controllers', cids, callsigns, update_mode))
+
+    def iter_atises(self, cids: Optional[int | list[int]] = None, callsigns: Optional[str | list[str]] = None, update_mode: UpdateMode = UpdateMode.NORMAL) -> Iterator[ATIS]:
+        return (v for _, v in self._iter_filtered_cid_or_callsign('atis', cids, callsigns, update_mode))
+
+    def pilot_ratings(self, update_mode: UpdateMode = UpdateMode.NORMAL) -> None | Mapping[int, PilotRating]:
         return self._return_whole('pilot_ratings', update_mode)
 
     def pilot_rating(self, id: int, update_mode: UpdateMode = UpdateMode.NORMAL) -> None | PilotRating:
         return self._return_single_exact_match('pilot_ratings', id, update_mode)
 
-    def facilities(self, update_mode: UpdateMode = UpdateMode.NORMAL) -> None | dict[int, Facility]:
+    def facilities(self, update_mode: UpdateMode = UpdateMode.NORMAL) -> None | Mapping[int, Facility]:
         return self._return_whole('facilities', update_mode)
 
     def facility(self, id: int, update_mode: UpdateMode = UpdateMode.NORMAL) -> None | Facility:
         return self._return_single_exact_match('facilities', id, update_mode)
 
-    def controller_ratings(self, update_mode: UpdateMode = UpdateMode.NORMAL) -> None | dict[int, Rating]:
+    def controller_ratings(self, update_mode: UpdateMode = UpdateMode.NORMAL) -> None | Mapping[int, Rating]:
         return self._return_whole('ratings', update_mode)
 
     def controller_rating(self, id: int, update_mode: UpdateMode = UpdateMode.NORMAL) -> None | Rating:
         return self._return_single_exact_match('ratings', id, update_mode)
 
-    def servers(self, update_mode: UpdateMode = UpdateMode.NORMAL) -> None | dict[str, Server]:
+    def servers(self, update_mode: UpdateMode = UpdateMode.NORMAL) -> None | Mapping[str, Server]:
         return self._return_whole('servers', update_mode)
 
     def server(self, ident_str: str, update_mode: UpdateMode = UpdateMode.NORMAL) -> None | Server:
         return self._return_single_exact_match('servers', ident_str, update_mode)
 
-    # TODO: function that can return all, only active or only prefiled flightplans
-    # def flight_plans(self):
-    #     pass
+    def member_lookup(self) -> MemberLookup:
+        # Created on first use, with its cache in member_cache_path (in memory if not set). Snapshot readers have no
+        # endpoints of their own, so theirs fetch misses from the default ones
+        if self._member_lookup is None:
+            from .members import MemberCache, MemberLookup
+            endpoints = self.vatsim_endpoints if self.vatsim_endpoints is not None else VatsimEndpoints()
+            self._member_lookup = MemberLookup(endpoints, MemberCache(self.member_cache_path or ':memory:'))
+        return self._member_lookup
+
+    def members(self, cids: int | Iterable[int]) -> Mapping[int, None | Member]:
+        # Member details from the user endpoint for any number of cids, None for unknown ones
+        return MappingProxyType(self.member_lookup().members(VatsimLiveAPI.wrap_if_single(cids)))
+
+    def member(self, cid: int) -> None | Member:
+        return self.member_lookup().members([cid])[cid]
+
+    def query(self, source: str, update_mode: UpdateMode = UpdateMode.NORMAL) -> Query:
+        from .query import Query
+        return Query(self, source, update_mode=update_mode)
+
+    def flight_metrics(self, cids: Optional[int | list[int]] = None, update_mode: UpdateMode = UpdateMode.NORMAL) -> None | Mapping[int, FlightMetrics]:
+        m = self._per_snapshot('flight_metrics', self._build_flight_metrics, update_mode)
+        if cids is None:
+            return m if len(m) > 0 else None
+        r = {cid: m[cid] for cid in VatsimLiveAPI.wrap_if_single(cids) if cid in m}
+        return MappingProxyType(r) if len(r.keys()) > 0 else None
+
+    def flight_metric(self, cid: int, update_mode: UpdateMode = UpdateMode.NORMAL) -> None | FlightMetrics:
+        return self._per_snapshot('flight_metrics', self._build_flight_metrics, update_mode).get(cid)
+
+    def network_servers(self, update_mode: UpdateMode = UpdateMode.NORMAL) -> None | Mapping[str, Server]:
+        self._update_servers_if_needed('servers', update_mode)
+        return self._servers_cache.get_cached('servers')
+
+    def sweatbox_servers(self, update_mode: UpdateMode = UpdateMode.NORMAL) -> None | Mapping[str, Server]:
+        self._update_servers_if_needed('sweatbox', update_mode)
+        return self._servers_cache.get_cached('sweatbox')
+
+    def sweatbox_server(self, ident_str: str, update_mode: UpdateMode = UpdateMode.NORMAL) -> None | Server:
+        s = self.sweatbox_servers(update_mode)
+        return s[ident_str] if s is not None and ident_str in s else None
+
+    def traffic_stats(self, update_mode: UpdateMode = UpdateMode.NORMAL) -> TrafficStats:
+        return self._per_snapshot('traffic_stats', self._build_traffic_stats, update_mode)
+
+    def coverage(self, update_mode: UpdateMode = UpdateMode.NORMAL) -> CoverageMap:
+        # Airport controllers need airports to be placed and enroute controllers need boundaries, anything that can't
+        # be placed is listed in unresolved_controllers
+        return self._per_snapshot('coverage', self._build_coverage, update_mode)
+
+    def covering_controllers(self, cid: int, update_mode: UpdateMode = UpdateMode.NORMAL) -> tuple[Controller, ...]:
+        return self.coverage(update_mode).covering(cid)
+
+    def track_model(self, update_mode: UpdateMode = UpdateMode.NORMAL) -> TrackModel:
+        return self._per_snapshot('track_model', self._build_track_model, update_mode)
+
+    def predicted_positions(self, at: Optional[datetime] = None, cids: Optional[int | list[int]] = None,
+                            max_extrapolation: timedelta = timedelta(seconds=60), update_mode: UpdateMode = UpdateMode.NORMAL) -> dict[int, tuple[float, float]]:
+        # Dead-reckoned (latitude, longitude) of each pilot at the given time (default now)
+        if at is None:
+            at = datetime.now(timezone.utc)
+        if cids is not None:
+            cids = VatsimLiveAPI.wrap_if_single(cids)
+        return self.track_model(update_mode).predict(at, cids, max_extrapolation)
+
+    def predicted_position(self, cid: int, at: Optional[datetime] = None, max_extrapolation: timedelta = timedelta(seconds=60),
+                           update_mode: UpdateMode = UpdateMode.NORMAL) -> None | tuple[float, float]:
+        if at is None:
+            at = datetime.now(timezone.utc)
+        return self.track_model(update_mode).predict_one(cid, at, max_extrapolation)
+
+    def proximity_pairs(self, horizontal_nm: float = 5, vertical_ft: float = 1000, update_mode: UpdateMode = UpdateMode.NORMAL) -> tuple[ProximityPair, ...]:
+        # Airborne pilots within horizontal_nm and vertical_ft of each other, closest first
+        def build():
+            return tuple(self._updated_proximity_engine(horizontal_nm, vertical_ft).pairs(horizontal_nm, vertical_ft))
+        return self._per_snapshot(('proximity_pairs', horizontal_nm, vertical_ft), build, update_mode)
+
+    def conflicts(self, horizontal_nm: float = 5, vertical_ft: float = 1000, lookahead: timedelta = timedelta(minutes=2),
+                  update_mode: UpdateMode = UpdateMode.NORMAL) -> tuple[Conflict, ...]:
+        # Airborne pilots projected to pass within horizontal_nm of each other in the lookahead, soonest first
+        def build():
+            from .proximity import conflict_cell_nm
+            cell_nm = conflict_cell_nm(self._conndata_cache.get_cached('pilots') or {}, horizontal_nm, lookahead)
+            return tuple(self._updated_proximity_engine(cell_nm, vertical_ft).conflicts(horizontal_nm, vertical_ft, lookahead))
+        return self._per_snapshot(('conflicts', horizontal_nm, vertical_ft, lookahead), build, update_mode)
+
+    def flight_plans(self, source: FlightplanSource = FlightplanSource.ALL, update_mode: UpdateMode = UpdateMode.NORMAL) -> FlightplanView:
+        def build():
+            pilots = self._conndata_cache.get_cached('pilots') if source != FlightplanSource.PREFILED else None
+            prefiles = self._conndata_cache.get_cached('prefiles') if source != FlightplanSource.ACTIVE else None
+            return FlightplanView(pilots, prefiles)
+        return self._per_snapshot(('flight_plans', source), build, update_mode)
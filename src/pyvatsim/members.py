@@ -0,0 +1,166 @@
+from __future__ import annotations # Required for type annotations to use forward reference
+import json
+import sqlite3
+import threading
+import time
+from collections.abc import Iterable
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    from .liveapi import VatsimEndpoints
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS members (
+    cid INTEGER PRIMARY KEY,
+    data TEXT, -- member json as returned by the user endpoint, NULL for cids that don't exist
+    fetched REAL NOT NULL,
+    used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS members_used ON members (used);
+"""
+
+SQL_BATCH = 500 # cids per IN (...) query, well under SQLite's variable limit
+
+
+def _parse_date(s):
+    if not s:
+        return None
+    try:
+        d = datetime.fromisoformat(s.rstrip('Z'))
+    except ValueError as e:
+        return None
+    return d if d.tzinfo is not None else d.replace(tzinfo=timezone.utc)
+
+
+@dataclass(frozen=True)
+class Member:
+    cid: int
+    rating: None | int
+    pilot_rating: None | int
+    military_rating: None | int
+    region: None | str
+    division: None | str
+    subdivision: None | str
+    registered: None | datetime
+    last_rating_change: None | datetime
+    suspended_until: None | datetime
+
+    @classmethod
+    def from_api_json(cls, json_dict: dict) -> Member:
+        return cls(
+            cid=int(json_dict['id']),
+            rating=json_dict.get('rating'),
+            pilot_rating=json_dict.get('pilotrating'),
+            military_rating=json_dict.get('militaryrating'),
+            region=json_dict.get('region_id'),
+            division=json_dict.get('division_id'),
+            subdivision=json_dict.get('subdivision_id'),
+            registered=_parse_date(json_dict.get('reg_date')),
+            last_rating_change=_parse_date(json_dict.get('lastratingchange')),
+            suspended_until=_parse_date(json_dict.get('susp_date'))
+        )
+
+
+class MemberCache:
+    # Member json by cid in SQLite, so lookups survive restarts. Entries expire after ttl (missing_ttl for cids the
+    # endpoint didn't know), and once there are more than max_entries the least recently used ones are dropped
+
+    def __init__(self, path: str = ':memory:', ttl: timedelta = timedelta(days=7), missing_ttl: timedelta = timedelta(days=1),
+                 max_entries: int = 100000) -> None:
+        self.path = path
+        self.ttl = ttl
+        self.missing_ttl = missing_ttl
+        self.max_entries = max_entries
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        if path != ':memory:':
+            self._conn.execute('PRAGMA journal_mode=WAL') # several processes can share one cache file
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def get_many(self, cids: list[int]) -> dict[int, None | dict]:
+        # Fresh entries only; cids that aren't in the result have to be fetched
+        now = time.time()
+        found = {}
+        with self._lock:
+            for i in range(0, len(cids), SQL_BATCH):
+                batch = cids[i:i + SQL_BATCH]
+                cursor = self._conn.execute('SELECT cid, data, fetched FROM members WHERE cid IN (%s)' % ', '.join('?' * len(batch)), batch)
+                for cid, data, fetched in cursor:
+                    ttl = self.ttl if data is not None else self.missing_ttl
+                    if now - fetched <= ttl.total_seconds():
+                        found[cid] = json.loads(data) if data is not None else None
+            if found:
+                with self._conn:
+                    self._conn.executemany('UPDATE members SET used = ? WHERE cid = ?', [(now, cid) for cid in found])
+        return found
+
+    def put_many(self, members: dict[int, None | dict]) -> None:
+        now = time.time()
+        rows = [(cid, json.dumps(data) if data is not None else None, now, now) for cid, data in members.items()]
+        with self._lock, self._conn:
+            self._conn.executemany('INSERT OR REPLACE INTO members (cid, data, fetched, used) VALUES (?, ?, ?, ?)', rows)
+            (count,) = self._conn.execute('SELECT COUNT(*) FROM members').fetchone()
+            if count > self.max_entries:
+                self._conn.execute('DELETE FROM members WHERE cid IN (SELECT cid FROM members ORDER BY used LIMIT ?)',
+                                   (count - self.max_entries,))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM members').fetchone()[0]
+
+
+class MemberLookup:
+    # Resolves many cids at once against the user endpoint. Cids are deduplicated and answered from the cache where
+    # possible; the rest are fetched in batches of batch_size with at most concurrency requests in flight, and each
+    # batch is written to the cache in one transaction
+
+    def __init__(self, endpoints: VatsimEndpoints, cache: Optional[MemberCache] = None, concurrency: int = 8,
+                 batch_size: int = 100) -> None:
+        self.endpoints = endpoints
+        self.cache = cache if cache is not None else MemberCache()
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+
+    def _fetch(self, cid):
+        import requests
+
+        try:
+            return self.endpoints.get('user', {'id': cid}).json()
+        except requests.HTTPError as e:
+            if e.response is not None and e.response.status_code == 404:
+                return None
+            raise
+
+    def members(self, cids: Iterable[int]) -> dict[int, None | Member]:
+        # None for cids the endpoint doesn't know. If some fetches fail, the ones that succeeded are cached before the
+        # error is raised, so a retry only fetches the rest
+        from concurrent.futures import ThreadPoolExecutor
+
+        wanted = list(dict.fromkeys(cids))
+        found = self.cache.get_many(wanted)
+        missing = [cid for cid in wanted if cid not in found]
+
+        error = None
+        if missing:
+            with ThreadPoolExecutor(max_workers=min(self.concurrency, len(missing))) as executor:
+                for i in range(0, len(missing), self.batch_size):
+                    batch = missing[i:i + self.batch_size]
+                    futures = {cid: executor.submit(self._fetch, cid) for cid in batch}
+                    fetched = {}
+                    for cid, f in futures.items():
+                        if f.exception() is None:
+                            fetched[cid] = f.result()
+                        elif error is None:
+                            error = f.exception()
+                    self.cache.put_many(fetched)
+                    found.update(fetched)
+        if error is not None:
+            raise error
+
+        return {cid: Member.from_api_json(found[cid]) if found[cid] is not None else None for cid in wanted}
@@ -0,0 +1,133 @@
+from __future__ import annotations # Required for type annotations to use forward reference
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from enum import Enum
+from typing import TYPE_CHECKING, Optional
+
+from .geo import distance_nm, distances_nm
+
+if TYPE_CHECKING:
+    from .liveapi import ActivePilot
+    from .utils import VatspyAirports
+
+
+# Constants
+GROUND_SPEED_THRESHOLD = 40 # kts, anything slower is treated as on the ground
+CRUISE_ALTITUDE_MARGIN = 1000 # ft below filed altitude that still counts as cruise
+VERTICAL_TREND_THRESHOLD = 300 # ft change between snapshots before we call it a climb or descent
+
+
+class FlightPhase(Enum):
+    GROUND = 0
+    CLIMB = 1
+    CRUISE = 2
+    DESCENT = 3
+
+
+@dataclass
+class FlightMetrics:
+    cid: int
+    callsign: str
+    altitude: int
+    time_online: timedelta
+    phase: FlightPhase
+    distance_flown: None | float # nm from the departure airport
+    distance_to_destination: None | float # nm to the arrival airport
+    total_distance: None | float # nm from departure to arrival airport
+    eta: None | datetime
+
+    @property
+    def progress(self) -> None | float:
+        if self.distance_flown is None or self.distance_to_destination is None:
+            return None
+        flown_and_left = self.distance_flown + self.distance_to_destination
+        return self.distance_flown / flown_and_left if flown_and_left > 0 else 0.0
+
+
+def _filed_altitude(flight_plan):
+    if flight_plan is None or not isinstance(flight_plan.altitude, int):
+        return None
+    return flight_plan.altitude
+
+
+def _phase(pilot, previous, flown, remaining):
+    if pilot.groundspeed < GROUND_SPEED_THRESHOLD:
+        return FlightPhase.GROUND
+
+    # With a previous snapshot we can see which way the aircraft is going
+    if previous is not None:
+        delta = pilot.altitude - previous.altitude
+        if delta > VERTICAL_TREND_THRESHOLD:
+            return FlightPhase.CLIMB
+        elif delta < -VERTICAL_TREND_THRESHOLD:
+            return FlightPhase.DESCENT
+        return FlightPhase.CRUISE
+
+    # Otherwise, compare against the filed altitude and guess climb vs descent from which end of the flight we're nearer
+    filed = _filed_altitude(pilot.flight_plan)
+    if filed is None or pilot.altitude >= filed - CRUISE_ALTITUDE_MARGIN:
+        return FlightPhase.CRUISE
+    if flown is not None and remaining is not None:
+        return FlightPhase.CLIMB if flown < remaining else FlightPhase.DESCENT
+    return FlightPhase.CRUISE
+
+
+def compute_flight_metrics(pilots: dict[int, ActivePilot], snapshot_time: datetime, airports: Optional[VatspyAirports] = None,
+                           previous: Optional[dict[int, FlightMetrics]] = None) -> dict[int, FlightMetrics]:
+    if pilots is None:
+        return {}
+    if previous is None:
+        previous = {}
+
+    # Gather coordinates for every pilot whose departure and/or arrival we can locate into parallel columns, so that all
+    # great-circle distances for the snapshot are computed in two batch calls
+    dep_rows, dep_cols = [], ([], [], [], [])
+    arr_rows, arr_cols = [], ([], [], [], [])
+    if airports is not None:
+        for cid, p in pilots.items():
+            if p.flight_plan is None:
+                continue
+            for icao, rows, cols in ((p.flight_plan.departure, dep_rows, dep_cols), (p.flight_plan.arrival, arr_rows, arr_cols)):
+                a = airports.get(icao)
+                if a is not None:
+                    rows.append(cid)
+                    cols[0].append(p.latitude)
+                    cols[1].append(p.longitude)
+                    cols[2].append(a.latitude)
+                    cols[3].append(a.longitude)
+
+    flown = dict(zip(dep_rows, distances_nm(*dep_cols)))
+    remaining = dict(zip(arr_rows, distances_nm(*arr_cols)))
+
+    # Lots of pilots fly the same city pair, so only work out each route length once
+    route_lengths = {}
+
+    metrics = {}
+    for cid, p in pilots.items():
+        d_flown = flown.get(cid)
+        d_remaining = remaining.get(cid)
+
+        total = None
+        if d_flown is not None and d_remaining is not None:
+            pair = (p.flight_plan.departure, p.flight_plan.arrival)
+            if pair not in route_lengths:
+                dep, arr = airports.get(pair[0]), airports.get(pair[1])
+                route_lengths[pair] = distance_nm(dep.latitude, dep.longitude, arr.latitude, arr.longitude)
+            total = route_lengths[pair]
+
+        eta = None
+        if d_remaining is not None and p.groundspeed >= GROUND_SPEED_THRESHOLD:
+            eta = p.last_updated + timedelta(hours=d_remaining / p.groundspeed)
+
+        metrics[cid] = FlightMetrics(
+            cid=cid,
+            callsign=p.callsign,
+            altitude=p.altitude,
+            time_online=snapshot_time - p.logon_time,
+            phase=_phase(p, previous.get(cid), d_flown, d_remaining),
+            distance_flown=d_flown,
+            distance_to_destination=d_remaining,
+            total_distance=total,
+            eta=eta
+        )
+    return metrics
@@ -0,0 +1,161 @@
+from __future__ import annotations # Required for type annotations to use forward reference
+from collections import defaultdict
+from collections.abc import Mapping
+from dataclasses import dataclass
+from datetime import timedelta
+from math import asin, cos, floor, radians, sin, sqrt
+from typing import TYPE_CHECKING
+
+from .geo import EARTH_RADIUS_NM
+from .metrics import GROUND_SPEED_THRESHOLD
+
+if TYPE_CHECKING:
+    from .liveapi import ActivePilot
+
+
+# Offsets to half of a cell's neighbours in x, y, z and altitude band: one of each pair of opposite offsets, so visiting
+# every cell and these neighbours sees each pair of neighbouring cells exactly once
+NEIGHBOURS = [d for d in ((dx, dy, dz, da) for dx in (-1, 0, 1) for dy in (-1, 0, 1) for dz in (-1, 0, 1) for da in (-1, 0, 1))
+              if d > (0, 0, 0, 0)]
+
+
+@dataclass(frozen=True)
+class ProximityPair:
+    cid_a: int # always the lower of the two cids
+    cid_b: int
+    distance: float # nm
+    vertical: int # ft
+
+
+@dataclass(frozen=True)
+class Conflict:
+    cid_a: int
+    cid_b: int
+    time_to_closest: timedelta # from the snapshot time, 0 if the two are already diverging
+    closest_distance: float # nm, assuming both hold their current heading and groundspeed
+    vertical: int # ft, current altitude difference (the feed has no vertical rate)
+
+
+class ProximityEngine:
+    # Spatial hash of pilot positions. Positions are placed on a sphere in 3d (nm), which keeps cells the same size
+    # everywhere and avoids special cases at the poles and the antimeridian, and bucketed into cubes of cell_nm and
+    # altitude bands of band_ft. Any two pilots within cell_nm and band_ft of each other are then in the same or
+    # neighbouring cells, so a search only looks at a handful of cells instead of at every other pilot
+
+    def __init__(self, cell_nm: float, band_ft: float = 1000, airborne_only: bool = True) -> None:
+        self.cell_nm = cell_nm
+        self.band_ft = band_ft
+        self.airborne_only = airborne_only
+        self._cells = defaultdict(set) # cell -> cids
+        self._where = {} # cid -> (cell, latitude, longitude, altitude, (x, y, z))
+        self._pilots = {} # cid -> pilot from the latest update
+
+    def _cell(self, xyz, altitude):
+        c = self.cell_nm
+        return floor(xyz[0] / c), floor(xyz[1] / c), floor(xyz[2] / c), floor(altitude / self.band_ft)
+
+    def update(self, pilots: Mapping[int, ActivePilot]) -> None:
+        # Only pilots that have moved are re-hashed, and only those that have changed cell are moved in the grid
+        current = {cid: p for cid, p in pilots.items() if not self.airborne_only or p.groundspeed >= GROUND_SPEED_THRESHOLD}
+        for cid in [cid for cid in self._where if cid not in current]:
+            self._leave(self._where.pop(cid)[0], cid)
+
+        for cid, p in current.items():
+            old = self._where.get(cid)
+            if old is not None and old[1] == p.latitude and old[2] == p.longitude and old[3] == p.altitude:
+                continue
+            if old is not None and old[1] == p.latitude and old[2] == p.longitude:
+                xyz = old[4]
+            else:
+                phi, lam = radians(p.latitude), radians(p.longitude)
+                xyz = (EARTH_RADIUS_NM * cos(phi) * cos(lam), EARTH_RADIUS_NM * cos(phi) * sin(lam), EARTH_RADIUS_NM * sin(phi))
+            cell = self._cell(xyz, p.altitude)
+            if old is None or old[0] != cell:
+                if old is not None:
+                    self._leave(old[0], cid)
+                self._cells[cell].add(cid)
+            self._where[cid] = (cell, p.latitude, p.longitude, p.altitude, xyz)
+        self._pilots = current
+
+    def _leave(self, cell, cid):
+        # Cells are dropped once empty, so the map only ever holds occupied ones
+        members = self._cells[cell]
+        members.discard(cid)
+        if not members:
+            del self._cells[cell]
+
+    def _candidates(self):
+        # Every pair of pilots in the same or neighbouring cells, once each, with their chord distance in nm. Work is
+        # done per cell, so the neighbour lookups are shared by everyone in it
+        cells, where = self._cells, self._where
+        for (cx, cy, cz, ca), members in cells.items():
+            positions = [(cid, where[cid][4]) for cid in members]
+            for i, (a, (x, y, z)) in enumerate(positions):
+                for b, (ox, oy, oz) in positions[i + 1:]:
+                    yield (a, b) if a < b else (b, a), sqrt((x - ox) ** 2 + (y - oy) ** 2 + (z - oz) ** 2)
+            for dx, dy, dz, da in NEIGHBOURS:
+                n = cells.get((cx + dx, cy + dy, cz + dz, ca + da))
+                if not n:
+                    continue
+                for b in n:
+                    ox, oy, oz = where[b][4]
+                    for a, (x, y, z) in positions:
+                        yield (a, b) if a < b else (b, a), sqrt((x - ox) ** 2 + (y - oy) ** 2 + (z - oz) ** 2)
+
+    def pairs(self, horizontal_nm: float, vertical_ft: float) -> list[ProximityPair]:
+        if horizontal_nm > self.cell_nm or vertical_ft > self.band_ft:
+            raise ValueError('search of %s nm / %s ft is larger than the engine cells (%s nm / %s ft)'
+                             % (horizontal_nm, vertical_ft, self.cell_nm, self.band_ft))
+        pilots = self._pilots
+        result = []
+        for (a, b), chord in self._candidates():
+            if chord > horizontal_nm:
+                continue # the chord is never longer than the great-circle distance, so this can't be a near miss
+            vertical = abs(pilots[a].altitude - pilots[b].altitude)
+            if vertical > vertical_ft:
+                continue
+            distance = 2 * EARTH_RADIUS_NM * asin(min(1.0, chord / (2 * EARTH_RADIUS_NM)))
+            if distance <= horizontal_nm:
+                result.append(ProximityPair(a, b, distance, vertical))
+        result.sort(key=lambda pair: pair.distance)
+        return result
+
+    def conflicts(self, horizontal_nm: float, vertical_ft: float, lookahead: timedelta) -> list[Conflict]:
+        # Project both aircraft along their current heading and groundspeed (flat earth around the pair, which is fine
+        # over the few tens of miles involved) and find their closest point of approach within the lookahead
+        if vertical_ft > self.band_ft:
+            raise ValueError('vertical_ft (%s) is larger than the engine altitude bands (%s)' % (vertical_ft, self.band_ft))
+        hours = lookahead.total_seconds() / 3600
+        pilots = self._pilots
+        result = []
+        for (a, b), chord in self._candidates():
+            pa, pb = pilots[a], pilots[b]
+            vertical = abs(pa.altitude - pb.altitude)
+            if vertical > vertical_ft or chord > horizontal_nm + (pa.groundspeed + pb.groundspeed) * hours:
+                continue
+
+            coslat = cos(radians((pa.latitude + pb.latitude) / 2))
+            rx = ((pb.longitude - pa.longitude + 540) % 360 - 180) * 60 * coslat
+            ry = (pb.latitude - pa.latitude) * 60
+            ha, hb = radians(pa.heading), radians(pb.heading)
+            vx = pb.groundspeed * sin(hb) - pa.groundspeed * sin(ha)
+            vy = pb.groundspeed * cos(hb) - pa.groundspeed * cos(ha)
+
+            speed2 = vx * vx + vy * vy
+            t = 0.0 if speed2 == 0 else min(hours, max(0.0, -(rx * vx + ry * vy) / speed2))
+            closest = sqrt((rx + vx * t) ** 2 + (ry + vy * t) ** 2)
+            if closest <= horizontal_nm:
+                result.append(Conflict(a, b, timedelta(hours=t), closest, vertical))
+        result.sort(key=lambda c: c.time_to_closest)
+        return result
+
+    def __len__(self) -> int:
+        return len(self._where)
+
+
+def conflict_cell_nm(pilots: Mapping[int, ActivePilot], horizontal_nm: float, lookahead: timedelta) -> float:
+    # Cell size that guarantees every pair that could close to horizontal_nm within the lookahead is a candidate.
+    # Speeds are rounded up to the next 100 kts so the size (and with it the engine) stays the same between snapshots
+    fastest = max((p.groundspeed for p in pilots.values()), default=0)
+    fastest = (fastest // 100 + 1) * 100
+    return horizontal_nm + 2 * fastest * lookahead.total_seconds() / 3600
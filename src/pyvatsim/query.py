@@ -0,0 +1,203 @@
+from __future__ import annotations # Required for type annotations to use forward reference
+import operator
+import re
+from collections.abc import Mapping
+from dataclasses import fields
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Any, Iterator, Optional
+
+from .liveapi import ActivePilot, ATIS, Controller, Flightplan, NameTable, PrefiledPilot, Server, UpdateMode
+
+if TYPE_CHECKING:
+    from .liveapi import VatsimLiveAPI
+
+
+# Maps the names accepted by VatsimLiveAPI.query() to the connection data cache key and the class stored under it
+SOURCES = {
+    'pilots'          : ('pilots',      ActivePilot),
+    'prefiles'        : ('prefiles',    PrefiledPilot),
+    'prefiled_pilots' : ('prefiles',    PrefiledPilot),
+    'controllers'     : ('controllers', Controller),
+    'atis'            : ('atis',        ATIS),
+    'atises'          : ('atis',        ATIS)
+}
+
+# Fields with few distinct values that are worth a hash index per snapshot. Equality and __in conditions on these are
+# answered from the index; everything else is a scan over the (already narrowed) candidates
+INDEXED_FIELDS = {
+    'pilots'      : {('callsign',), ('server',), ('flight_plan', 'departure'), ('flight_plan', 'arrival'),
+                     ('flight_plan', 'alternate'), ('flight_plan', 'aircraft_short'), ('flight_plan', 'flight_rules')},
+    'prefiles'    : {('callsign',), ('flight_plan', 'departure'), ('flight_plan', 'arrival'), ('flight_plan', 'alternate'),
+                     ('flight_plan', 'aircraft_short'), ('flight_plan', 'flight_rules')},
+    'controllers' : {('callsign',), ('facility',), ('rating',), ('server',)},
+    'atis'        : {('callsign',), ('facility',), ('server',), ('atis_code',)}
+}
+
+
+def _ordered(op):
+    # Ordering comparisons against missing or malformed values (e.g. no flight plan, an unparseable altitude) don't match
+    def compare(a, b):
+        try:
+            return a is not None and op(a, b)
+        except TypeError as e:
+            return False
+    return compare
+
+
+# Plans and per-snapshot results kept for repeated queries; both caches start over once they hold this many
+MAX_CACHED = 256
+
+LOOKUPS = {
+    'eq'         : operator.eq,
+    'ne'         : operator.ne,
+    'lt'         : _ordered(operator.lt),
+    'lte'        : _ordered(operator.le),
+    'gt'         : _ordered(operator.gt),
+    'gte'        : _ordered(operator.ge),
+    'in'         : lambda a, b: a in b,
+    'startswith' : lambda a, b: isinstance(a, str) and a.startswith(b),
+    'contains'   : lambda a, b: a is not None and b in a,
+    'regex'      : lambda a, b: isinstance(a, str) and b.search(a) is not None
+}
+
+
+def _scalar(value):
+    # Joined lookup objects compare by their natural key, so server='UK' and facility='TWR' work
+    if isinstance(value, Server):
+        return value.ident
+    if isinstance(value, NameTable):
+        return value.short
+    return value
+
+
+def _resolve_path(record_cls, path):
+    names = {f.name for f in fields(record_cls)}
+    if path[0] in names:
+        return path
+    # Flight plan fields can be used directly on anything that has a flight plan, e.g. arrival='EGLL'
+    if 'flight_plan' in names and path[0] in {f.name for f in fields(Flightplan)}:
+        return ('flight_plan',) + path
+    raise ValueError('%s has no field %s' % (record_cls.__name__, path[0]))
+
+
+def _getter(path):
+    def get(record):
+        v = record
+        for name in path:
+            if v is None:
+                return None
+            v = getattr(v, name)
+        return _scalar(v)
+    return get
+
+
+def _hashable(value):
+    if isinstance(value, (list, set, frozenset)):
+        return tuple(sorted(value, key=repr))
+    return value
+
+
+class QueryPlan:
+
+    def __init__(self, source: str, record_cls: type, conditions: tuple[tuple[str, Any], ...]) -> None:
+        self.source = source
+        self.index_lookups = [] # (path, values) answered from an index
+        self.predicates = [] # residual checks run over candidates
+
+        for arg, value in conditions:
+            parts = tuple(arg.split('__'))
+            lookup = 'eq'
+            if len(parts) > 1 and parts[-1] in LOOKUPS:
+                parts, lookup = parts[:-1], parts[-1]
+            path = _resolve_path(record_cls, parts)
+
+            if lookup == 'regex':
+                value = re.compile(value)
+            elif lookup == 'in':
+                value = frozenset(value)
+
+            if path in INDEXED_FIELDS.get(source, ()) and lookup in ('eq', 'in'):
+                self.index_lookups.append((path, (value,) if lookup == 'eq' else value))
+            else:
+                self.predicates.append((_getter(path), LOOKUPS[lookup], value))
+
+    def run(self, api: VatsimLiveAPI) -> Mapping:
+        records = api._conndata_cache.get_cached(self.source)
+        if records is None:
+            return MappingProxyType({})
+
+        # Narrow down with indexes first, so the residual predicates only see the candidates
+        candidates = None
+        for path, values in self.index_lookups:
+            index = api._per_snapshot(('query_index', self.source, path), lambda: self._build_index(records, path), UpdateMode.NOUPDATE)
+            keys = [k for v in values for k in index.get(v, ())]
+            if candidates is None:
+                candidates = keys
+            else:
+                keys = set(keys)
+                candidates = [k for k in candidates if k in keys]
+
+        if candidates is None:
+            items = records.items()
+        else:
+            items = ((k, records[k]) for k in candidates)
+
+        predicates = self.predicates
+        return MappingProxyType({k: v for k, v in items if all(op(get(v), value) for get, op, value in predicates)})
+
+    @staticmethod
+    def _build_index(records, path):
+        get = _getter(path)
+        index = {}
+        for k, v in records.items():
+            index.setdefault(get(v), []).append(k)
+        return index
+
+
+class Query:
+
+    def __init__(self, api: VatsimLiveAPI, source: str, conditions: tuple = (), update_mode: UpdateMode = UpdateMode.NORMAL) -> None:
+        if source not in SOURCES:
+            raise ValueError('Unknown query source %s, expected one of %s' % (source, ', '.join(SOURCES)))
+        self._api = api
+        self._source = source
+        self._conditions = conditions
+        self._update_mode = update_mode
+
+    def where(self, **conditions) -> Query:
+        return Query(self._api, self._source, self._conditions + tuple(sorted(conditions.items())), self._update_mode)
+
+    def _plan(self):
+        cache_key, record_cls = SOURCES[self._source]
+        key = (cache_key, tuple((k, _hashable(v)) for k, v in self._conditions))
+        plans = self._api._query_plans
+        if key not in plans:
+            if len(plans) >= MAX_CACHED:
+                plans.clear()
+            plans[key] = QueryPlan(cache_key, record_cls, self._conditions)
+        return key, plans[key]
+
+    def all(self) -> Mapping:
+        self._api._update_conndata_if_needed(update_mode=self._update_mode)
+        key, plan = self._plan()
+        # The snapshot doesn't change underneath us, so identical queries share one result until the next update
+        results = self._api._per_snapshot('query_results', dict, UpdateMode.NOUPDATE)
+        if key not in results:
+            if len(results) >= MAX_CACHED:
+                results.clear()
+            results[key] = plan.run(self._api)
+        return results[key]
+
+    def __iter__(self) -> Iterator:
+        return iter(self.all().values())
+
+    def count(self) -> int:
+        return len(self.all())
+
+    def first(self) -> Optional[Any]:
+        return next(iter(self), None)
+
+    def select(self, *field_names: str) -> list[dict[str, Any]]:
+        _, record_cls = SOURCES[self._source]
+        getters = [(name, _getter(_resolve_path(record_cls, tuple(name.split('__'))))) for name in field_names]
+        return [{name: get(v) for name, get in getters} for v in self]
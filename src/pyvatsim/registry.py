@@ -0,0 +1,113 @@
+from __future__ import annotations # Required for type annotations to use forward reference
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, Any, Callable
+
+if TYPE_CHECKING:
+    from .liveapi import VatsimEndpoints
+
+
+@dataclass(frozen=True)
+class SharedCacheStats:
+    fetches: int # downloads actually made
+    duplicate_fetches_avoided: int # downloads that were answered with one another instance had made (or was making)
+    parses_avoided: int # payloads that were parsed by another instance and reused as they were
+    # An instance getting back its own earlier download (e.g. when upstream hasn't changed) counts as neither
+
+
+class SharedEntry:
+    # One download of a source. The first instance that stores it parses it, everyone else reuses what it parsed
+
+    def __init__(self, cache: SharedCache, payload: Any, fetched: datetime, fetched_for: Any = None) -> None:
+        self.fetched = fetched
+        self.fetched_for = fetched_for # id of the instance that made the download
+        self._cache = cache
+        self._payload = payload
+        self._parsed = None
+        self._is_parsed = False
+        self._parsed_by = None
+        self._lock = threading.Lock()
+
+    def parsed(self, parse: Callable[[Any], Any], requester: Any = None) -> Any:
+        with self._lock:
+            if not self._is_parsed:
+                self._parsed = parse(self._payload)
+                self._is_parsed = True
+                self._parsed_by = requester
+                self._payload = None # only the parsed value is needed from here on
+            elif requester is None or requester != self._parsed_by:
+                self._cache._count('parses_avoided')
+            return self._parsed
+
+
+class SharedCache:
+    # The latest download of every source for one set of endpoints, shared by all the VatsimLiveAPI instances in the
+    # process that use those endpoints. Each instance asks with its own TTL, so one with a longer TTL happily reuses a
+    # download made for one with a shorter TTL, and only one download per source is ever in flight
+
+    def __init__(self, key: tuple) -> None:
+        self.key = key
+        self._entries = {} # source -> latest SharedEntry
+        self._source_locks = {}
+        self._lock = threading.Lock()
+        self._counts = Counter()
+
+    def _count(self, name):
+        with self._lock:
+            self._counts[name] += 1
+
+    def _fresh(self, source, oldest):
+        entry = self._entries.get(source)
+        return entry if entry is not None and entry.fetched >= oldest else None
+
+    def fetch(self, source: str, max_age: float, download: Callable[[], Any], requester: Any = None) -> SharedEntry:
+        # A download no older than max_age seconds, made now unless there already is one. Callers that arrive while a
+        # download is running wait for it, and take it if it finished recently enough for them (a max_age of 0 only
+        # takes downloads that finished after the call). requester identifies the caller, so reuse is only counted
+        # between different ones
+        oldest = datetime.now(timezone.utc) - timedelta(seconds=max_age)
+        with self._lock:
+            source_lock = self._source_locks.setdefault(source, threading.Lock())
+
+        entry = self._fresh(source, oldest)
+        if entry is None:
+            with source_lock:
+                entry = self._fresh(source, oldest)
+                if entry is None:
+                    payload = download()
+                    entry = self._entries[source] = SharedEntry(self, payload, datetime.now(timezone.utc), requester)
+                    self._count('fetches')
+                    return entry
+        if requester is None or requester != entry.fetched_for:
+            self._count('duplicate_fetches_avoided')
+        return entry
+
+    def stats(self) -> SharedCacheStats:
+        with self._lock:
+            return SharedCacheStats(self._counts['fetches'], self._counts['duplicate_fetches_avoided'], self._counts['parses_avoided'])
+
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def _endpoints_key(endpoints):
+    # Endpoints with the same status.json and the same hand-set URLs fetch the same data
+    overrides = tuple(sorted((source, tuple(endpoints.mirrors[source].urls)) for source in endpoints._overrides))
+    return endpoints.status_json_url, overrides
+
+
+def shared_cache(endpoints: VatsimEndpoints) -> SharedCache:
+    key = _endpoints_key(endpoints)
+    with _registry_lock:
+        cache = _registry.get(key)
+        if cache is None:
+            cache = _registry[key] = SharedCache(key)
+        return cache
+
+
+def clear_shared_caches() -> None:
+    with _registry_lock:
+        _registry.clear()
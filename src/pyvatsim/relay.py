@@ -0,0 +1,343 @@
+from __future__ import annotations # Required for type annotations to use forward reference
+import argparse
+import bisect
+import gzip
+import hashlib
+import json
+import logging
+import math
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, urlsplit
+
+from .liveapi import STATUS_JSON_URL, TTLCache, VatsimEndpoints
+
+logger = logging.getLogger(__name__)
+
+# Paths served by the relay, relative to its public URL
+STATUS_PATH = '/status.json'
+DATA_PATH = '/v3/vatsim-data.json'
+TRANSCEIVERS_PATH = '/v3/transceivers-data.json'
+SERVERS_PATH = '/v3/vatsim-servers.json'
+SWEATBOX_PATH = '/v3/sweatbox-servers.json'
+METAR_PATH = '/metar.php'
+PILOTS_PATH = '/v3/pilots'
+CONTROLLERS_PATH = '/v3/controllers'
+
+GRID_CELL_DEG = 1.0 # size of the lat/lon cells used to answer bbox filters
+FILTERED_CACHE_SIZE = 1024
+
+
+@dataclass(frozen=True)
+class RelayResponse:
+    body: bytes
+    gzip_body: bytes
+    etag: str
+    content_type: str
+
+    @classmethod
+    def build(cls, body: bytes, content_type: str = 'application/json') -> RelayResponse:
+        # Serialize, compress and hash once per upstream update, so serving a request is just a write
+        etag = '"%s"' % hashlib.sha1(body).hexdigest()
+        return cls(body, gzip.compress(body, compresslevel=6), etag, content_type)
+
+    @classmethod
+    def from_json(cls, obj) -> RelayResponse:
+        return cls.build(json.dumps(obj, separators=(',', ':')).encode())
+
+
+class RelayIndexes:
+
+    def __init__(self, feed: dict) -> None:
+        self.general = feed['general']
+        self.pilots = feed['pilots']
+        self.controllers = feed['controllers']
+
+        # Sorted callsigns answer prefix filters with two bisects
+        self.pilot_callsigns = sorted((p['callsign'], i) for i, p in enumerate(self.pilots))
+        self.controller_callsigns = sorted((c['callsign'], i) for i, c in enumerate(self.controllers))
+
+        self.airports = {}
+        self.grid = {}
+        for i, p in enumerate(self.pilots):
+            fp = p.get('flight_plan')
+            if fp is not None:
+                for icao in {fp['departure'], fp['arrival']}:
+                    self.airports.setdefault(icao, []).append(i)
+            self.grid.setdefault(self._cell(p['latitude'], p['longitude']), []).append(i)
+
+    @staticmethod
+    def _cell(lat, lon):
+        return math.floor(lat / GRID_CELL_DEG), math.floor(lon / GRID_CELL_DEG)
+
+    @staticmethod
+    def _prefix(sorted_callsigns, prefix):
+        lo = bisect.bisect_left(sorted_callsigns, (prefix,))
+        hi = bisect.bisect_left(sorted_callsigns, (prefix + '\uffff',))
+        return {i for _, i in sorted_callsigns[lo:hi]}
+
+    def _bbox(self, min_lat, min_lon, max_lat, max_lon):
+        lat_cells = range(math.floor(min_lat / GRID_CELL_DEG), math.floor(max_lat / GRID_CELL_DEG) + 1)
+        # A box whose west edge is east of its east edge crosses the antimeridian
+        if min_lon <= max_lon:
+            lon_ranges = [(min_lon, max_lon)]
+        else:
+            lon_ranges = [(min_lon, 180.0), (-180.0, max_lon)]
+
+        result = set()
+        for lo, hi in lon_ranges:
+            for x in lat_cells:
+                for y in range(math.floor(lo / GRID_CELL_DEG), math.floor(hi / GRID_CELL_DEG) + 1):
+                    for i in self.grid.get((x, y), ()):
+                        p = self.pilots[i]
+                        if min_lat <= p['latitude'] <= max_lat and lo <= p['longitude'] <= hi:
+                            result.add(i)
+        return result
+
+    def filter_pilots(self, callsign_prefix: Optional[str] = None, airport: Optional[str] = None,
+                      bbox: Optional[tuple[float, float, float, float]] = None) -> list[dict]:
+        matches = None
+        if callsign_prefix is not None:
+            matches = self._prefix(self.pilot_callsigns, callsign_prefix)
+        if airport is not None:
+            at_airport = set(self.airports.get(airport, ()))
+            matches = at_airport if matches is None else matches & at_airport
+        if bbox is not None:
+            in_box = self._bbox(*bbox)
+            matches = in_box if matches is None else matches & in_box
+        if matches is None:
+            return self.pilots
+        return [self.pilots[i] for i in sorted(matches)]
+
+    def filter_controllers(self, callsign_prefix: Optional[str] = None) -> list[dict]:
+        if callsign_prefix is None:
+            return self.controllers
+        return [self.controllers[i] for i in sorted(self._prefix(self.controller_callsigns, callsign_prefix))]
+
+
+class VatsimRelay:
+
+    def __init__(self, vatsim_endpoints: VatsimEndpoints, public_url: str, DATA_TTL: int = 15, METAR_TTL: int = 60,
+                 TRANSCEIVERS_TTL: int = 15, SERVERS_TTL: int = 300) -> None:
+        self.vatsim_endpoints = vatsim_endpoints
+
+        # source -> (path it's served on, TTL cache deciding when to poll it again)
+        self._sources = {
+            'data'             : (DATA_PATH,         TTLCache(DATA_TTL)),
+            'transceivers'     : (TRANSCEIVERS_PATH, TTLCache(TRANSCEIVERS_TTL)),
+            'metar'            : (METAR_PATH,        TTLCache(METAR_TTL)),
+            'servers'          : (SERVERS_PATH,      TTLCache(SERVERS_TTL)),
+            'servers_sweatbox' : (SWEATBOX_PATH,     TTLCache(SERVERS_TTL))
+        }
+        self._responses = {}
+        self.set_public_url(public_url)
+        self._indexes = None
+        self._metars = {}
+        self._filtered = {}
+        self._lock = threading.Lock()
+
+    def set_public_url(self, public_url: str) -> None:
+        self.public_url = public_url.rstrip('/')
+        self._responses[STATUS_PATH] = RelayResponse.from_json(self._status_document())
+
+    def _status_document(self):
+        # Point every relayed source back at ourselves; member lookups aren't relayed so pass those through
+        return {
+            'data': {
+                'v3'               : [self.public_url + DATA_PATH],
+                'transceivers'     : [self.public_url + TRANSCEIVERS_PATH],
+                'servers'          : [self.public_url + SERVERS_PATH],
+                'servers_sweatbox' : [self.public_url + SWEATBOX_PATH]
+            },
+            'user'  : list(self.vatsim_endpoints.mirrors_for('user').urls),
+            'metar' : [self.public_url + METAR_PATH]
+        }
+
+    def _fetch(self, source):
+        if source == 'metar':
+            return self.vatsim_endpoints.get('metar', {'id': 'all'}).content
+        return self.vatsim_endpoints.get(source).content
+
+    def poll(self, force: bool = False) -> list[str]:
+        # Returns the sources whose response changed. A source that fails to download keeps its last good response
+        # (and stays due, so the next poll retries it) without holding up the others
+        due = [name for name, (_, cache) in self._sources.items() if force or cache.is_stale()]
+        if len(due) == 0:
+            return []
+
+        with ThreadPoolExecutor(max_workers=len(due)) as executor:
+            futures = {name: executor.submit(self._fetch, name) for name in due}
+        bodies = {}
+        for name, f in futures.items():
+            if f.exception() is not None:
+                logger.warning('Polling %s failed: %s', name, f.exception())
+            else:
+                bodies[name] = f.result()
+
+        updated = []
+        for name, body in bodies.items():
+            path, cache = self._sources[name]
+            cache.cache(body)
+            previous = self._responses.get(path)
+            response = RelayResponse.build(body, 'text/plain' if name == 'metar' else 'application/json')
+            if previous is not None and previous.etag == response.etag:
+                continue
+
+            # Indexes are built from a fresh decode before the new response is swapped in, so a request never sees a
+            # data feed and indexes from different updates
+            if name == 'data':
+                indexes = RelayIndexes(json.loads(body))
+                with self._lock:
+                    self._indexes = indexes
+                    self._responses[path] = response
+                    self._filtered = {}
+            elif name == 'metar':
+                metars = {}
+                for line in body.decode().splitlines():
+                    if line.strip() != '':
+                        metars[line.split(' ', 1)[0]] = line
+                with self._lock:
+                    self._metars = metars
+                    self._responses[path] = response
+                    self._filtered = {}
+            else:
+                self._responses[path] = response
+            updated.append(name)
+        return updated
+
+    @staticmethod
+    def _query_key(query):
+        return tuple(sorted((k, tuple(v)) for k, v in query.items()))
+
+    def response(self, path: str, query: Optional[dict[str, list[str]]] = None) -> None | RelayResponse:
+        query = query if query is not None else {}
+        if path == METAR_PATH and query.get('id', ['all'])[0].lower() != 'all':
+            return self._filtered_response(path, query, self._metar_subset)
+        if path == PILOTS_PATH:
+            return self._filtered_response(path, query, self._pilot_subset)
+        if path == CONTROLLERS_PATH:
+            return self._filtered_response(path, query, self._controller_subset)
+        return self._responses.get(path)
+
+    def _filtered_response(self, path, query, build):
+        key = (path, self._query_key(query))
+        with self._lock:
+            filtered, indexes, metars = self._filtered, self._indexes, self._metars
+            response = filtered.get(key)
+        if response is None:
+            if path != METAR_PATH and indexes is None:
+                return None
+            response = build(query, indexes, metars)
+            # If a poll swapped in new data meanwhile this lands in the discarded dict, which is harmless
+            with self._lock:
+                if len(filtered) >= FILTERED_CACHE_SIZE:
+                    filtered.clear()
+                filtered[key] = response
+        return response
+
+    @staticmethod
+    def _metar_subset(query, indexes, metars):
+        fields = [f.strip().upper() for f in query['id'][0].split(',')]
+        return RelayResponse.build('\n'.join(metars[f] for f in fields if f in metars).encode(), 'text/plain')
+
+    @staticmethod
+    def _pilot_subset(query, indexes, metars):
+        bbox = None
+        if 'bbox' in query:
+            bbox = tuple(float(v) for v in query['bbox'][0].split(','))
+            if len(bbox) != 4 or not all(math.isfinite(v) for v in bbox):
+                raise ValueError('bbox must be min_lat,min_lon,max_lat,max_lon')
+        pilots = indexes.filter_pilots(query.get('callsign_prefix', [None])[0], query.get('airport', [None])[0], bbox)
+        return RelayResponse.from_json({'general': indexes.general, 'pilots': pilots})
+
+    @staticmethod
+    def _controller_subset(query, indexes, metars):
+        controllers = indexes.filter_controllers(query.get('callsign_prefix', [None])[0])
+        return RelayResponse.from_json({'general': indexes.general, 'controllers': controllers})
+
+    def run_poller(self, stop_event: threading.Event, interval: float = 1.0) -> None:
+        while not stop_event.is_set():
+            try:
+                self.poll()
+            except Exception as e:
+                logger.exception('Relay poll failed') # keep serving the last good responses, the next poll will retry
+            stop_event.wait(interval)
+
+    def make_server(self, host: str, port: int) -> ThreadingHTTPServer:
+        relay = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                url = urlsplit(self.path)
+                try:
+                    response = relay.response(url.path, parse_qs(url.query))
+                except ValueError as e:
+                    self.send_error(400, str(e))
+                    return
+                if response is None:
+                    self.send_error(404)
+                    return
+
+                if self.headers.get('If-None-Match') == response.etag:
+                    self.send_response(304)
+                    self.send_header('ETag', response.etag)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+
+                gzipped = 'gzip' in self.headers.get('Accept-Encoding', '')
+                body = response.gzip_body if gzipped else response.body
+                self.send_response(200)
+                self.send_header('Content-Type', response.content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.send_header('ETag', response.etag)
+                self.send_header('Vary', 'Accept-Encoding')
+                if gzipped:
+                    self.send_header('Content-Encoding', 'gzip')
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        return server
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description='Poll the Vatsim feeds once and serve them to local clients')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--public-url', help='URL clients use to reach the relay (default http://HOST:PORT)')
+    parser.add_argument('--status-url', default=STATUS_JSON_URL, help='upstream status.json')
+    parser.add_argument('--data-ttl', type=int, default=15)
+    parser.add_argument('--metar-ttl', type=int, default=60)
+    parser.add_argument('--transceivers-ttl', type=int, default=15)
+    parser.add_argument('--servers-ttl', type=int, default=300)
+    args = parser.parse_args(argv)
+
+    public_url = args.public_url if args.public_url is not None else 'http://%s:%d' % (args.host, args.port)
+    relay = VatsimRelay(VatsimEndpoints(args.status_url), public_url, args.data_ttl, args.metar_ttl, args.transceivers_ttl, args.servers_ttl)
+    relay.poll(force=True)
+
+    stop = threading.Event()
+    threading.Thread(target=relay.run_poller, args=(stop,), daemon=True).start()
+    server = relay.make_server(args.host, args.port)
+    print('Relaying Vatsim data on %s (status document at %s%s)' % (public_url, public_url, STATUS_PATH))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+import re
+from dataclasses import dataclass
+from enum import Enum
+from functools import lru_cache
+from typing import Optional
+
+
+class RouteTokenType(Enum):
+    WAYPOINT = 0
+    AIRWAY = 1
+    DIRECT = 2
+    SID = 3
+    STAR = 4
+    RUNWAY = 5
+    SPEED_LEVEL = 6
+    COORDINATE = 7
+
+
+@dataclass(frozen=True)
+class RouteToken:
+    type: RouteTokenType
+    text: str
+    speed: Optional[str] = None
+    level: Optional[str] = None
+
+
+# Patterns for ICAO item 15 route elements
+SPEED_LEVEL_RE = re.compile(r'^(?P<speed>[NK]\d{4}|M\d{3})(?P<level>[FA]\d{3}|[SM]\d{4}|VFR)$')
+AIRWAY_RE = re.compile(r'^U?[A-Z]{1,2}\d{1,4}[A-Z]?$') # A461, UN644, J26, but not a radial like BDR288
+PROCEDURE_RE = re.compile(r'^[A-Z]{3,6}\d{1,2}[A-Z]?$') # BEKOL3A, DANGI1C
+RUNWAY_RE = re.compile(r'^\d{2}[LCR]?$')
+COORDINATE_RE = re.compile(r'^\d{2}(\d{2})?[NS]\d{3}(\d{2})?[EW]$')
+
+
+def _classify(element, first, last):
+    if element == 'DCT':
+        return RouteToken(RouteTokenType.DIRECT, element)
+    m = SPEED_LEVEL_RE.match(element)
+    if m is not None:
+        return RouteToken(RouteTokenType.SPEED_LEVEL, element, m.group('speed'), m.group('level'))
+    if RUNWAY_RE.match(element):
+        return RouteToken(RouteTokenType.RUNWAY, element)
+    if COORDINATE_RE.match(element):
+        return RouteToken(RouteTokenType.COORDINATE, element)
+    # Procedures only make sense at either end of the route, in the middle the same shape is an airway or a fix
+    if first and PROCEDURE_RE.match(element):
+        return RouteToken(RouteTokenType.SID, element)
+    if last and PROCEDURE_RE.match(element):
+        return RouteToken(RouteTokenType.STAR, element)
+    if AIRWAY_RE.match(element):
+        return RouteToken(RouteTokenType.AIRWAY, element)
+    return RouteToken(RouteTokenType.WAYPOINT, element)
+
+
+def _tokenize(route):
+    elements = route.upper().split()
+    # Leading speed/level groups don't stop the next element from being the SID
+    first_index = 0
+    while first_index < len(elements) and SPEED_LEVEL_RE.match(elements[first_index]):
+        first_index += 1
+
+    tokens = []
+    for i, element in enumerate(elements):
+        # 'LINSO/N0500F340' is a fix with a speed/level change, 'BEKOL3A/07R' a procedure with its runway
+        for j, part in enumerate(element.split('/')):
+            if part == '':
+                continue
+            tokens.append(_classify(part, i == first_index and j == 0, i == len(elements) - 1 and j == 0))
+    return tuple(tokens)
+
+
+@lru_cache(maxsize=16384)
+def _tokenize_cached(route, revision_id):
+    return _tokenize(route)
+
+
+def tokenize_route(route: str, revision_id: Optional[int] = None) -> tuple[RouteToken, ...]:
+    # Results are memoized by (route, revision_id), so a flight plan that hasn't been amended is only tokenized once
+    if route is None:
+        return ()
+    return _tokenize_cached(route, revision_id)
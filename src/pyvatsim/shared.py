@@ -0,0 +1,203 @@
+from __future__ import annotations # Required for type annotations to use forward reference
+import mmap
+import os
+import pickle
+import struct
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Mapping
+from typing import Optional
+
+from .liveapi import CONNDATA_TABLES, UpdateMode, VatsimLiveAPI
+from .utils import VatspyAirports, VatspyBoundaries
+
+
+# Snapshot file layout (all offsets are relative to the end of the header):
+#
+#   MAGIC | header length (uint64 LE) | header | record blobs and per-table indexes
+#
+# The header is a pickled dict holding the snapshot's server timestamp and, for each table, the (offset, length) of that
+# table's index. An index is a pickled dict of record key -> (offset, length) of the record's own pickle. Readers only
+# decode the header on attach; indexes are decoded the first time a table is used and records when they're looked up.
+#
+# The file is only ever written by our own publisher and is unpickled, so it must live somewhere only trusted processes
+# can write to.
+MAGIC = b'PYVSNAP1'
+HEADER = struct.Struct('<Q')
+DECODED_CACHE_SIZE = 1024 # records per table kept decoded, so repeated lookups don't unpickle again
+
+
+class SnapshotTable(Mapping):
+
+    def __init__(self, view: memoryview, base: int, index_location: tuple[int, int]) -> None:
+        self._view = view
+        self._base = base
+        self._index_location = index_location
+        self._index = None
+        self._decoded = OrderedDict() # least recently used first
+
+    def _load_index(self):
+        if self._index is None:
+            offset, length = self._index_location
+            self._index = pickle.loads(self._view[self._base + offset:self._base + offset + length])
+        return self._index
+
+    def __getitem__(self, key):
+        decoded = self._decoded
+        if key in decoded:
+            decoded.move_to_end(key)
+            return decoded[key]
+        offset, length = self._load_index()[key]
+        record = decoded[key] = pickle.loads(self._view[self._base + offset:self._base + offset + length])
+        if len(decoded) > DECODED_CACHE_SIZE:
+            decoded.popitem(last=False)
+        return record
+
+    def __contains__(self, key) -> bool:
+        return key in self._load_index()
+
+    def __iter__(self):
+        return iter(self._load_index())
+
+    def __len__(self) -> int:
+        return len(self._load_index())
+
+
+class SnapshotPublisher:
+
+    def __init__(self, api: VatsimLiveAPI, path: str) -> None:
+        self.api = api
+        self.path = path
+        self.generation = 0
+        self._published = None
+
+    def _tables(self):
+        api = self.api
+        tables = {name: api._conndata_cache.get_cached(name) for name in CONNDATA_TABLES}
+        tables['metars'] = api._metar_cache.get_cached()
+        tables['network_servers'] = api._servers_cache.get_cached('servers')
+        tables['sweatbox_servers'] = api._servers_cache.get_cached('sweatbox')
+        return {k: v for k, v in tables.items() if v is not None}
+
+    def publish(self, update_mode: UpdateMode = UpdateMode.NORMAL) -> bool:
+        self.api.refresh(update_mode)
+
+        # Every cache replaces its dicts wholesale on update, so if the same objects are cached nothing has changed. We
+        # hold on to what we published, so identity comparison is safe
+        tables = self._tables()
+        if self._published is not None and tables.keys() == self._published.keys() \
+                and all(v is self._published[k] for k, v in tables.items()):
+            return False
+
+        self.generation += 1
+        body = bytearray()
+        locations = {}
+        for name, records in tables.items():
+            index = {}
+            for key, record in records.items():
+                blob = pickle.dumps(record, protocol=pickle.HIGHEST_PROTOCOL)
+                index[key] = (len(body), len(blob))
+                body += blob
+            blob = pickle.dumps(index, protocol=pickle.HIGHEST_PROTOCOL)
+            locations[name] = (len(body), len(blob))
+            body += blob
+
+        header = pickle.dumps({
+            'generation'          : self.generation,
+            'server_last_updated' : self.api._server_last_updated,
+            'tables'              : locations
+        }, protocol=pickle.HIGHEST_PROTOCOL)
+
+        # Write next to the target and rename over it, so readers either see the old file or the complete new one.
+        # Readers that still have the old file mapped keep reading it until they next check for updates
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.pyvatsim-snapshot-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(MAGIC)
+                f.write(HEADER.pack(len(header)))
+                f.write(header)
+                f.write(body)
+            os.replace(tmp_path, self.path)
+        except:
+            os.unlink(tmp_path)
+            raise
+
+        self._published = tables
+        return True
+
+    def run(self, interval: float = 5, stop_event: Optional[threading.Event] = None) -> None:
+        # Blocking loop for the designated fetcher process. The API's own TTLs decide what is actually downloaded
+        if stop_event is None:
+            stop_event = threading.Event()
+        while not stop_event.is_set():
+            self.publish()
+            stop_event.wait(interval)
+
+
+class SharedSnapshotAPI(VatsimLiveAPI):
+
+    def __init__(self, path: str, check_interval: float = 1.0, airports: Optional[VatspyAirports] = None,
+                 heatmap_cell_deg: Optional[float] = None, boundaries: Optional[VatspyBoundaries] = None,
+                 member_cache_path: Optional[str] = None) -> None:
+        # Readers never download feeds, so there are no endpoints or downloads to share and the TTLs are irrelevant
+        self.vatsim_endpoints = None
+        self._init_options(airports, heatmap_cell_deg, boundaries, None, member_cache_path, False)
+        self._init_caches(0, 0, 0)
+        self.path = path
+        self.check_interval = check_interval
+        self.generation = None
+        self._attached = None
+        self._last_check = None
+
+    def _attach_if_changed(self, force=False):
+        now = time.monotonic()
+        if not force and self._last_check is not None and now - self._last_check < self.check_interval:
+            return
+        self._last_check = now
+
+        st = os.stat(self.path)
+        identity = (st.st_ino, st.st_mtime_ns, st.st_size)
+        if identity == self._attached:
+            return
+
+        # The mapping is owned by the tables made from it, not by us: a generation stays mapped for as long as anyone
+        # holds one of its tables, and is unmapped when the last of them is garbage collected
+        with open(self.path, 'rb') as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(mm)
+        del mm
+        if bytes(view[:len(MAGIC)]) != MAGIC:
+            raise ValueError('%s is not a pyvatsim snapshot' % self.path)
+        (header_length,) = HEADER.unpack_from(view, len(MAGIC))
+        start = len(MAGIC) + HEADER.size
+        header = pickle.loads(view[start:start + header_length])
+        base = start + header_length
+
+        tables = {name: SnapshotTable(view, base, location) for name, location in header['tables'].items()}
+        self._begin_snapshot(header['server_last_updated'])
+        self._conndata_cache.cache(header)
+        for name in CONNDATA_TABLES:
+            self._conndata_cache.cache(tables.get(name), name)
+        self._metar_cache.cache(tables.get('metars'))
+        self._servers_cache.cache(tables.get('network_servers'), 'servers')
+        self._servers_cache.cache(tables.get('sweatbox_servers'), 'sweatbox')
+
+        self.generation = header['generation']
+        self._attached = identity
+        self._notify_snapshot_sinks()
+
+    def _update_conndata_if_needed(self, key='_ALL', update_mode=UpdateMode.NORMAL):
+        if update_mode != UpdateMode.NOUPDATE:
+            self._attach_if_changed(force=update_mode == UpdateMode.FORCE)
+
+    def _update_metars_if_needed(self, key='_ALL', update_mode=UpdateMode.NORMAL):
+        self._update_conndata_if_needed(key, update_mode)
+
+    def _update_servers_if_needed(self, key, update_mode=UpdateMode.NORMAL):
+        self._update_conndata_if_needed(key, update_mode)
+
+    def refresh(self, update_mode: UpdateMode = UpdateMode.NORMAL) -> None:
+        self._update_conndata_if_needed(update_mode=update_mode)
@@ -0,0 +1,144 @@
+from __future__ import annotations # Required for type annotations to use forward reference
+from collections import Counter
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass
+from math import floor
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    from .liveapi import ActivePilot, Controller, PrefiledPilot
+    from .utils import VatspyAirports
+
+
+class DensityGrid:
+    # Pilot counts on a regular lat/lon grid. Cells are identified by their south-west corner
+
+    def __init__(self, cell_deg: float) -> None:
+        self.cell_deg = cell_deg
+        self._counts = Counter()
+
+    def _cell(self, latitude, longitude):
+        return floor(latitude / self.cell_deg), floor(longitude / self.cell_deg)
+
+    def add(self, latitude: float, longitude: float) -> None:
+        self._counts[self._cell(latitude, longitude)] += 1
+
+    def count_at(self, latitude: float, longitude: float) -> int:
+        return self._counts.get(self._cell(latitude, longitude), 0)
+
+    def cells(self) -> Iterable[tuple[tuple[float, float], int]]:
+        for (row, col), count in self._counts.items():
+            yield (row * self.cell_deg, col * self.cell_deg), count
+
+    def hottest(self, n: int = 10) -> list[tuple[tuple[float, float], int]]:
+        return [((row * self.cell_deg, col * self.cell_deg), count) for (row, col), count in self._counts.most_common(n)]
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+
+def _ranked(counter):
+    # Most common first, so iterating a table (or slicing it with top()) gives the ranking
+    return MappingProxyType(dict(counter.most_common()))
+
+
+@dataclass(frozen=True)
+class TrafficStats:
+    departures: Mapping[str, int] # airport -> active pilots that filed it as departure
+    arrivals: Mapping[str, int]
+    prefiled_departures: Mapping[str, int]
+    prefiled_arrivals: Mapping[str, int]
+    fir_departures: Mapping[str, int] # only filled in when the API has airport data
+    fir_arrivals: Mapping[str, int]
+    aircraft_types: Mapping[str, int] # aircraft_short -> active pilots
+    pilots_per_server: Mapping[str, int]
+    controllers_per_facility: Mapping[str, int] # facility short name -> controllers
+    controllers_per_server: Mapping[str, int]
+    heatmap: None | DensityGrid
+
+    def top(self, table: str, n: int = 10) -> list[tuple[str, int]]:
+        return list(getattr(self, table).items())[:n]
+
+
+class TrafficStatsBuilder:
+    # Accumulates counts one record at a time, so the tables can be filled in while the feed is being parsed
+
+    def __init__(self, airports: Optional[VatspyAirports] = None, heatmap_cell_deg: Optional[float] = None) -> None:
+        self.airports = airports
+        self.departures = Counter()
+        self.arrivals = Counter()
+        self.prefiled_departures = Counter()
+        self.prefiled_arrivals = Counter()
+        self.fir_departures = Counter()
+        self.fir_arrivals = Counter()
+        self.aircraft_types = Counter()
+        self.pilots_per_server = Counter()
+        self.controllers_per_facility = Counter()
+        self.controllers_per_server = Counter()
+        self.heatmap = DensityGrid(heatmap_cell_deg) if heatmap_cell_deg is not None else None
+
+        # Which adder handles each table of the feed
+        self.adders = {
+            'pilots'      : self.add_pilot,
+            'prefiles'    : self.add_prefile,
+            'controllers' : self.add_controller
+        }
+
+    def _add_fir(self, counter, icao):
+        airport = self.airports.get(icao) if self.airports is not None else None
+        if airport is not None and airport.fir:
+            counter[airport.fir] += 1
+
+    def add_pilot(self, pilot: ActivePilot) -> None:
+        if pilot.server is not None:
+            self.pilots_per_server[pilot.server.ident] += 1
+        if self.heatmap is not None:
+            self.heatmap.add(pilot.latitude, pilot.longitude)
+
+        fp = pilot.flight_plan
+        if fp is None:
+            return
+        self.departures[fp.departure] += 1
+        self.arrivals[fp.arrival] += 1
+        self.aircraft_types[fp.aircraft_short] += 1
+        self._add_fir(self.fir_departures, fp.departure)
+        self._add_fir(self.fir_arrivals, fp.arrival)
+
+    def add_prefile(self, prefile: PrefiledPilot) -> None:
+        fp = prefile.flight_plan
+        if fp is not None:
+            self.prefiled_departures[fp.departure] += 1
+            self.prefiled_arrivals[fp.arrival] += 1
+
+    def add_controller(self, controller: Controller) -> None:
+        if controller.facility is not None:
+            self.controllers_per_facility[controller.facility.short] += 1
+        if controller.server is not None:
+            self.controllers_per_server[controller.server.ident] += 1
+
+    def build(self) -> TrafficStats:
+        return TrafficStats(
+            departures=_ranked(self.departures),
+            arrivals=_ranked(self.arrivals),
+            prefiled_departures=_ranked(self.prefiled_departures),
+            prefiled_arrivals=_ranked(self.prefiled_arrivals),
+            fir_departures=_ranked(self.fir_departures),
+            fir_arrivals=_ranked(self.fir_arrivals),
+            aircraft_types=_ranked(self.aircraft_types),
+            pilots_per_server=_ranked(self.pilots_per_server),
+            controllers_per_facility=_ranked(self.controllers_per_facility),
+            controllers_per_server=_ranked(self.controllers_per_server),
+            heatmap=self.heatmap
+        )
+
+
+def compute_traffic_stats(pilots: Optional[Mapping[int, ActivePilot]], prefiles: Optional[Mapping[int, PrefiledPilot]],
+                          controllers: Optional[Mapping[int, Controller]], airports: Optional[VatspyAirports] = None,
+                          heatmap_cell_deg: Optional[float] = None) -> TrafficStats:
+    # For snapshots that weren't parsed by this process (e.g. shared snapshot readers)
+    builder = TrafficStatsBuilder(airports, heatmap_cell_deg)
+    for records, add in ((pilots, builder.add_pilot), (prefiles, builder.add_prefile), (controllers, builder.add_controller)):
+        for r in (records or {}).values():
+            add(r)
+    return builder.build()
@@ -1,13 +1,158 @@
-import requests
+from __future__ import annotations # Required for type annotations to use forward reference
+import json
+from dataclasses import dataclass
+from typing import Optional
 
 VATSPY_BOUNDARIES_URL = 'https://raw.githubusercontent.com/vatsimnetwork/vatspy-data-project/master/Boundaries.geojson'
 
 class VatspyBoundaries():
     
-    def __init__(self, geojson_url: str = VATSPY_BOUNDARIES_URL):
+    def __init__(self, geojson_url: str = VATSPY_BOUNDARIES_URL, geojson_path: Optional[str] = None):
         self._geojson_url = geojson_url
+        self._boundaries = None
+        if geojson_path is not None:
+            with open(geojson_path, encoding='utf-8') as f:
+                self.geojson = f.read()
+            return
+
+        import requests
+
         try:
             r = requests.get(geojson_url)
             self.geojson = r.text
         except:
             raise
+
+    @property
+    def boundaries(self) -> dict[str, Boundary]:
+        # Parsed on first use, as the file is large and not every user needs the polygons
+        if self._boundaries is None:
+            self._boundaries = {}
+            for feature in json.loads(self.geojson)['features']:
+                b = Boundary.from_geojson_feature(feature)
+                self._boundaries[b.id] = b
+        return self._boundaries
+
+    def get(self, boundary_id: str) -> None | Boundary:
+        return self.boundaries.get(boundary_id)
+
+
+def _point_in_ring(lon, lat, ring):
+    # Ray casting; ring is a list of (lon, lat)
+    inside = False
+    x1, y1 = ring[-1]
+    for x2, y2 in ring:
+        if (y1 > lat) != (y2 > lat) and lon < (x2 - x1) * (lat - y1) / (y2 - y1) + x1:
+            inside = not inside
+        x1, y1 = x2, y2
+    return inside
+
+
+@dataclass
+class Boundary:
+    id: str
+    oceanic: bool
+    polygons: list[list[list[tuple[float, float]]]] # polygons, each an outer ring followed by any holes, as (lon, lat)
+    bbox: tuple[float, float, float, float] # min lon, min lat, max lon, max lat
+    crosses_antimeridian: bool # if so, negative longitudes in polygons and bbox have been shifted by +360
+
+    @classmethod
+    def from_geojson_feature(cls, feature: dict) -> Boundary:
+        geometry = feature['geometry']
+        polygons = geometry['coordinates'] if geometry['type'] == 'MultiPolygon' else [geometry['coordinates']]
+        polygons = [[[(float(p[0]), float(p[1])) for p in ring] for ring in polygon] for polygon in polygons]
+
+        lons = [lon for polygon in polygons for lon, _ in polygon[0]]
+        crosses = max(lons) - min(lons) > 180
+        if crosses:
+            polygons = [[[(lon + 360 if lon < 0 else lon, lat) for lon, lat in ring] for ring in polygon] for polygon in polygons]
+        points = [p for polygon in polygons for p in polygon[0]]
+        bbox = (min(p[0] for p in points), min(p[1] for p in points), max(p[0] for p in points), max(p[1] for p in points))
+        return cls(feature['properties']['id'], str(feature['properties'].get('oceanic', '0')) == '1', polygons, bbox, crosses)
+
+    def contains(self, latitude: float, longitude: float) -> bool:
+        if self.crosses_antimeridian and longitude < 0:
+            longitude += 360
+        min_lon, min_lat, max_lon, max_lat = self.bbox
+        if not (min_lon <= longitude <= max_lon and min_lat <= latitude <= max_lat):
+            return False
+        for outer, *holes in self.polygons:
+            if _point_in_ring(longitude, latitude, outer) and not any(_point_in_ring(longitude, latitude, h) for h in holes):
+                return True
+        return False
+
+
+@dataclass
+class Airport:
+    icao: str
+    name: str
+    latitude: float
+    longitude: float
+    iata: str
+    fir: str
+    is_pseudo: bool
+
+
+@dataclass
+class Fir:
+    icao: str
+    name: str
+    callsign_prefix: str
+    boundary: str
+
+
+class VatspyAirports():
+
+    # Reads the [Airports] and [FIRs] sections of a local VATSpy.dat file, where each row looks like
+    #   ICAO|Name|Latitude|Longitude|IATA/LID|FIR|IsPseudo
+    #   ICAO|Name|CallsignPrefix|FIRBoundary
+    def __init__(self, dat_path: str):
+        self._dat_path = dat_path
+        self.airports = {}
+        self.firs = {} # callsign prefix (or ICAO when the row has none) -> Fir
+        with open(dat_path, encoding='utf-8') as f:
+            self._parse(f)
+
+    def _parse(self, lines):
+        section = None
+        for line in lines:
+            line = line.strip()
+            if line == '' or line.startswith(';'):
+                continue
+            if line.startswith('['):
+                section = line
+                continue
+            if section == '[FIRs]':
+                self._parse_fir(line)
+                continue
+            if section != '[Airports]':
+                continue
+
+            cols = line.split('|')
+            try:
+                a = Airport(cols[0], cols[1], float(cols[2]), float(cols[3]), cols[4], cols[5], cols[6] == '1')
+            except (IndexError, ValueError) as e:
+                continue # malformed row, skip it
+
+            # The same ICAO can be listed more than once (pseudo airports share codes), prefer the real airport
+            if a.icao not in self.airports or self.airports[a.icao].is_pseudo:
+                self.airports[a.icao] = a
+
+    def _parse_fir(self, line):
+        cols = line.split('|')
+        if len(cols) < 4:
+            return # malformed row, skip it
+        fir = Fir(cols[0], cols[1], cols[2], cols[3] or cols[0])
+        self.firs.setdefault(fir.callsign_prefix or fir.icao, fir)
+
+    def get(self, icao: str) -> None | Airport:
+        return self.airports.get(icao)
+
+    def fir(self, callsign_prefix: str) -> None | Fir:
+        return self.firs.get(callsign_prefix)
+
+    def __contains__(self, icao: str) -> bool:
+        return icao in self.airports
+
+    def __len__(self) -> int:
+        return len(self.airports)
@@ -0,0 +1,148 @@
+from __future__ import annotations # Required for type annotations to use forward reference
+import re
+from collections import deque
+from collections.abc import Mapping
+from dataclasses import dataclass
+from datetime import datetime
+from enum import Enum
+from math import cos, radians, sin
+from types import MappingProxyType
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .liveapi import Metar
+
+
+# Constants
+METERS_PER_SM = 1609.344
+HPA_PER_INHG = 33.8639
+KT_PER_MPS = 1.943844
+KT_PER_KMH = 1 / 1.852
+
+WIND = re.compile(r'(?P<direction>\d{3}|VRB)(?P<speed>\d{2,3})(?:G(?P<gust>\d{2,3}))?(?P<unit>KT|MPS|KMH)$')
+VISIBILITY_SM = re.compile(r'(?P<less>[MP])?(?:(?P<whole>\d+)|(?P<num>\d)/(?P<den>\d{1,2}))SM$')
+VISIBILITY_M = re.compile(r'(?P<meters>\d{4})(?:NDV)?$')
+CLOUDS = re.compile(r'(?P<cover>FEW|SCT|BKN|OVC|VV)(?P<height>\d{3})')
+QNH = re.compile(r'(?P<unit>[QA])(?P<value>\d{4})$')
+END_OF_REPORT = ('RMK', 'TEMPO', 'BECMG', 'NOSIG') # trends and remarks would otherwise overwrite the observed values
+
+
+class FlightCategory(Enum):
+    VFR = 0
+    MVFR = 1
+    IFR = 2
+    LIFR = 3
+
+
+def flight_category(visibility_sm: None | float, ceiling_ft: None | int) -> None | FlightCategory:
+    # FAA categories, from whichever of visibility and ceiling is worse. Missing values count as unrestricted, but a
+    # report with neither has no category
+    if visibility_sm is None and ceiling_ft is None:
+        return None
+    vis = visibility_sm if visibility_sm is not None else float('inf')
+    ceiling = ceiling_ft if ceiling_ft is not None else float('inf')
+    if ceiling < 500 or vis < 1:
+        return FlightCategory.LIFR
+    if ceiling < 1000 or vis < 3:
+        return FlightCategory.IFR
+    if ceiling <= 3000 or vis <= 5:
+        return FlightCategory.MVFR
+    return FlightCategory.VFR
+
+
+def runway_heading(runway: str | int) -> int:
+    # '27L' -> 270, or a heading passed through as is
+    if isinstance(runway, int):
+        return runway
+    return int(runway.rstrip('LRCT')) * 10
+
+
+@dataclass(frozen=True)
+class Weather:
+    field: str
+    time: None | datetime
+    raw_text: str
+    wind_direction: None | int # degrees true, None for variable or missing wind
+    wind_speed: None | int # kts
+    wind_gust: None | int
+    visibility_sm: None | float
+    ceiling_ft: None | int # lowest broken or overcast layer (or vertical visibility), None if there isn't one
+    qnh_hpa: None | float
+    flight_category: None | FlightCategory
+
+    @property
+    def qnh_inhg(self) -> None | float:
+        return self.qnh_hpa / HPA_PER_INHG if self.qnh_hpa is not None else None
+
+    def wind_components(self, runway: str | int) -> None | tuple[float, float]:
+        # (headwind, crosswind) in kts for a runway like '27L' or a heading. Tailwinds are negative headwinds, and
+        # crosswinds from the right are positive
+        if self.wind_direction is None or self.wind_speed is None:
+            return None
+        angle = radians(self.wind_direction - runway_heading(runway))
+        return self.wind_speed * cos(angle), self.wind_speed * sin(angle)
+
+    @classmethod
+    def from_metar(cls, metar: Metar) -> Weather:
+        wind_direction = wind_speed = wind_gust = visibility = ceiling = qnh = None
+        tokens = (metar.condition or '').split()
+        for i, token in enumerate(tokens):
+            if token in END_OF_REPORT:
+                break
+            if wind_speed is None and (m := WIND.match(token)):
+                factor = KT_PER_MPS if m['unit'] == 'MPS' else KT_PER_KMH if m['unit'] == 'KMH' else 1
+                wind_direction = int(m['direction']) if m['direction'] != 'VRB' else None
+                wind_speed = round(int(m['speed']) * factor)
+                wind_gust = round(int(m['gust']) * factor) if m['gust'] else None
+            elif token == 'CAVOK':
+                visibility = 10.0
+            elif visibility is None and (m := VISIBILITY_SM.match(token)):
+                visibility = float(m['whole']) if m['whole'] else int(m['num']) / int(m['den'])
+                if m['num'] and i > 0 and tokens[i - 1].isdigit():
+                    visibility += int(tokens[i - 1]) # '1 1/2SM'
+            elif visibility is None and (m := VISIBILITY_M.match(token)):
+                visibility = int(m['meters']) / METERS_PER_SM
+            elif m := CLOUDS.match(token):
+                if m['cover'] in ('BKN', 'OVC', 'VV'):
+                    height = int(m['height']) * 100
+                    ceiling = height if ceiling is None else min(ceiling, height)
+            elif qnh is None and (m := QNH.match(token)):
+                qnh = float(m['value']) if m['unit'] == 'Q' else int(m['value']) / 100 * HPA_PER_INHG
+        return cls(metar.field, metar.time, metar.raw_text, wind_direction, wind_speed, wind_gust, visibility, ceiling, qnh,
+                   flight_category(visibility, ceiling))
+
+
+class MetarStore:
+    # The last `depth` decoded reports per station. Each update only decodes the reports whose raw text differs from
+    # the station's latest, so a refresh where little has changed costs little
+
+    def __init__(self, depth: int = 12) -> None:
+        self.depth = depth
+        self._history = {} # field -> deque of Weather, oldest first
+        self._latest = {} # field -> latest Weather
+
+    def update(self, metars: Mapping[str, Metar]) -> list[str]:
+        # Returns the stations that got a new report
+        latest = self._latest
+        new = [m for field, m in metars.items() if field not in latest or latest[field].raw_text != m.raw_text]
+        decoded = [Weather.from_metar(m) for m in new]
+        if decoded:
+            latest = dict(latest) # a new dict per update, so what `latest` handed out earlier never changes
+        for w in decoded:
+            history = self._history.get(w.field)
+            if history is None:
+                history = self._history[w.field] = deque(maxlen=self.depth)
+            history.append(w)
+            latest[w.field] = w
+        self._latest = latest
+        return [w.field for w in decoded]
+
+    @property
+    def latest(self) -> Mapping[str, Weather]:
+        return MappingProxyType(self._latest)
+
+    def history(self, field: str) -> tuple[Weather, ...]:
+        return tuple(self._history.get(field, ()))
+
+    def __len__(self) -> int:
+        return len(self._latest)
@@ -3,9 +3,13 @@ import pytest
 """
 TODO: Fix the structure as this shouldnt really be needed to allow for tests to run.
 """
+import copy
+import json
 import os
 import sys
 
+import requests
+
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 
@@ -30,6 +34,7 @@ def vatsim_data_pilots_blob() -> list[dict[str, any]]:
             "callsign": "BAW32",
             "server": "UK",
             "pilot_rating": 0,
+            "military_rating": 0,
             "latitude": 24.02507,
             "longitude": 82.52637,
             "altitude": 29977,
@@ -65,6 +70,7 @@ def vatsim_data_pilots_blob() -> list[dict[str, any]]:
             "callsign": "KLM64B",
             "server": "CANADA",
             "pilot_rating": 0,
+            "military_rating": 0,
             "latitude": 17.92323,
             "longitude": 92.49153,
             "altitude": 34933,
@@ -412,6 +418,22 @@ def vatsim_data_pilot_ratings_blob() -> list[dict[str, any]]:
     ]
 
 
+@pytest.fixture
+def vatsim_data_military_ratings_blob() -> list[dict[str, any]]:
+    return [
+        {
+            "id": 0,
+            "short_name": "M0",
+            "long_name": "No Military Rating"
+        },
+        {
+            "id": 1,
+            "short_name": "M1",
+            "long_name": "Military Pilot License"
+        }
+    ]
+
+
 @pytest.fixture
 def vatsim_data_response(
         vatsim_data_general_blob: dict[str, any],
@@ -423,6 +445,7 @@ def vatsim_data_response(
         vatsim_data_facilities_blob: list[dict[str, any]],
         vatsim_data_ratings_blob: list[dict[str, any]],
         vatsim_data_pilot_ratings_blob: list[dict[str, any]],
+        vatsim_data_military_ratings_blob: list[dict[str, any]],
 ) -> dict[str, any]:
     """
     This is a stripped down example of the response from
@@ -438,4 +461,128 @@ def vatsim_data_response(
         "facilities": vatsim_data_facilities_blob,
         "ratings": vatsim_data_ratings_blob,
         "pilot_ratings": vatsim_data_pilot_ratings_blob,
+        "military_ratings": vatsim_data_military_ratings_blob,
+    }
+
+
+@pytest.fixture
+def vatsim_status_response() -> dict[str, any]:
+    return {
+        "data": {
+            "v3": ["https://data.test/v3/vatsim-data.json"],
+            "transceivers": ["https://data.test/v3/transceivers-data.json"],
+            "servers": ["https://data.test/v3/vatsim-servers.json"],
+            "servers_sweatbox": ["https://data.test/v3/sweatbox-servers.json"],
+            "servers_all": ["https://data.test/v3/all-servers.json"]
+        },
+        "user": ["https://stats.test/search_id.php"],
+        "metar": ["https://metar.test/metar.php"]
     }
+
+
+@pytest.fixture
+def vatsim_metar_response() -> str:
+    return "\n".join([
+        "EGLL 111550Z AUTO 24012KT 9999 FEW035 14/04 Q1014",
+        "KSFO 111556Z 29015KT 10SM FEW012 14/09 A3002",
+    ])
+
+
+class FakeResponse:
+    def __init__(self, payload, status_code=200, headers=None):
+        self._payload = payload
+        self.status_code = status_code
+        self.headers = headers if headers is not None else {}
+
+    def json(self):
+        return json.loads(self.text)
+
+    @property
+    def text(self):
+        return self._payload if isinstance(self._payload, str) else json.dumps(self._payload)
+
+    @property
+    def content(self):
+        return self.text.encode()
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(self.status_code, response=self)
+
+
+@pytest.fixture
+def fake_vatsim(monkeypatch, vatsim_status_response, vatsim_data_response, vatsim_metar_response, vatsim_data_server_blob):
+    """
+    Replaces requests.get with a router that serves the fixtures above. The returned dict maps URL (without query
+    string) to payload and can be edited by tests; every requested URL is appended to the 'calls' list.
+    """
+    routes = {
+        "https://status.test/status.json": vatsim_status_response,
+        "https://data.test/v3/vatsim-data.json": vatsim_data_response,
+        "https://data.test/v3/vatsim-servers.json": copy.deepcopy(vatsim_data_server_blob),
+        "https://data.test/v3/sweatbox-servers.json": [
+            {
+                "ident": "SWEATBOX-1",
+                "hostname_or_ip": "sweatbox1.vatsim.net",
+                "location": "Toronto, Canada",
+                "name": "SWEATBOX-1",
+                "clients_connection_allowed": 1,
+                "client_connections_allowed": True,
+                "is_sweatbox": True
+            }
+        ],
+        "https://metar.test/metar.php": vatsim_metar_response,
+        "https://data.test/v3/transceivers-data.json": [
+            {
+                "callsign": "BAW32",
+                "transceivers": [
+                    {"id": 0, "frequency": 132800000, "latDeg": 24.02, "lonDeg": 82.52, "heightMslM": 9137.0, "heightAglM": 9100.0}
+                ]
+            }
+        ],
+        "calls": [],
+    }
+
+    real_get = requests.get
+
+    def fake_get(url, *args, **kwargs):
+        # Let tests talk to local servers (e.g. the relay) for real
+        if url.startswith("http://127.0.0.1"):
+            return real_get(url, *args, **kwargs)
+        routes["calls"].append(url)
+        payload = routes[url.split("?")[0]]
+        if callable(payload):
+            return payload(url) # for routes that answer per query
+        # Hand out copies, so a test editing the routes doesn't change a response that was already handed out
+        return FakeResponse(copy.deepcopy(payload))
+
+    monkeypatch.setattr(requests, "get", fake_get)
+    return routes
+
+
+@pytest.fixture
+def vatspy_dat(tmp_path) -> str:
+    """
+    A small VATSpy.dat with the airports used by the feed fixtures above
+    """
+    path = tmp_path / "VATSpy.dat"
+    path.write_text("\n".join([
+        ";VATSpy data file",
+        "[Countries]",
+        "United Kingdom|EG|",
+        "[Airports]",
+        "EGLL|London Heathrow|51.4775|-0.461389|LHR|EGTT|0",
+        "EGLL|Heathrow Pseudo|51.0|-0.4|LHR|EGTT|1",
+        "EGSS|London Stansted|51.885|0.235|STN|EGTT|0",
+        "VHHH|Hong Kong Intl|22.308919|113.914603|HKG|VHHK|0",
+        "OPKC|Karachi Jinnah Intl|24.906547|67.160797|KHI|OPKR|0",
+        "VYYY|Yangon Intl|16.907305|96.133222|RGN|VYYF|0",
+        "KACK|Nantucket Meml|41.253053|-70.060181|ACK|KZBW|0",
+        "KHPN|Westchester Co|41.066959|-73.707575|HPN|KZNY|0",
+        "EDDK|Cologne Bonn|50.865917|7.142744|CGN|EDGG|0",
+        "LGAV|Athens Eleftherios Venizelos|37.936358|23.944467|ATH|LGGG|0",
+        "BAD|Malformed Row",
+        "[FIRs]",
+        "EGTT|London|EGTT|EGTT",
+    ]))
+    return str(path)
@@ -0,0 +1,73 @@
+import json
+
+import pytest
+
+from src.pyvatsim import VatsimEndpoints, VatsimLiveAPI, VatspyAirports, VatspyBoundaries
+
+
+def feature(boundary_id, ring):
+    return {
+        "type": "Feature",
+        "properties": {"id": boundary_id, "oceanic": "0"},
+        "geometry": {"type": "MultiPolygon", "coordinates": [[ring]]}
+    }
+
+
+@pytest.fixture
+def boundaries_path(tmp_path) -> str:
+    path = tmp_path / "Boundaries.geojson"
+    path.write_text(json.dumps({"type": "FeatureCollection", "features": [
+        feature("EGTT", [[-6, 49], [2, 49], [2, 55], [-6, 55], [-6, 49]]),
+        feature("NZZO", [[170, -30], [-170, -30], [-170, -10], [170, -10], [170, -30]]),
+    ]}))
+    return str(path)
+
+
+@pytest.fixture
+def api(fake_vatsim, vatspy_dat, boundaries_path) -> VatsimLiveAPI:
+    return VatsimLiveAPI(VatsimEndpoints("https://status.test/status.json"), airports=VatspyAirports(vatspy_dat),
+                         boundaries=VatspyBoundaries(geojson_path=boundaries_path))
+
+
+class TestBoundaries:
+    def test_contains(self, boundaries_path):
+        boundaries = VatspyBoundaries(geojson_path=boundaries_path)
+
+        assert boundaries.get("EGTT").contains(51.5, -0.5)
+        assert not boundaries.get("EGTT").contains(48.0, -0.5)
+        assert boundaries.get("NZZO").contains(-20, 179.5)
+        assert boundaries.get("NZZO").contains(-20, -175)
+        assert not boundaries.get("NZZO").contains(-20, 160)
+
+
+class TestCoverage:
+    def test_assigns_covering_controllers(self, api: VatsimLiveAPI, fake_vatsim):
+        data = fake_vatsim["https://data.test/v3/vatsim-data.json"]
+        data["pilots"][0].update(latitude=50.9, longitude=7.0) # near EDDK
+        data["pilots"][1].update(latitude=51.5, longitude=-0.5) # in London FIR
+        data["controllers"].append(dict(data["controllers"][0], cid=7777777, callsign="EGTT_CTR", facility=6, visual_range=300))
+        data["controllers"].append(dict(data["controllers"][0], cid=8888888, callsign="EDDK_APP", facility=5, visual_range=80))
+
+        coverage = api.coverage()
+        assert [c.callsign for c in coverage.covering(5555555)] == ["EDDK_TWR", "EDDK_APP"]
+        assert [c.callsign for c in api.covering_controllers(4556677)] == ["EGTT_CTR"]
+        assert coverage.uncovered == ()
+        assert coverage.covered_by(7777777) == [4556677]
+
+    def test_uncovered_and_unresolved(self, api: VatsimLiveAPI, fake_vatsim):
+        data = fake_vatsim["https://data.test/v3/vatsim-data.json"]
+        data["controllers"].append(dict(data["controllers"][0], cid=7777777, callsign="ZZZZ_CTR", facility=6))
+
+        coverage = api.coverage()
+        assert set(coverage.uncovered) == {5555555, 4556677}
+        assert [c.callsign for c in coverage.unresolved_controllers] == ["ZZZZ_CTR"]
+        assert api.coverage() is coverage
+
+    def test_without_boundaries_only_airport_controllers(self, fake_vatsim, vatspy_dat):
+        api = VatsimLiveAPI(VatsimEndpoints("https://status.test/status.json"), airports=VatspyAirports(vatspy_dat))
+        data = fake_vatsim["https://data.test/v3/vatsim-data.json"]
+        data["pilots"][0].update(latitude=37.9, longitude=23.9) # near LGAV
+        data["controllers"].append(dict(data["controllers"][0], cid=7777777, callsign="EGTT_CTR", facility=6))
+
+        assert [c.callsign for c in api.covering_controllers(5555555)] == ["LGAV_TWR"]
+        assert [c.callsign for c in api.coverage().unresolved_controllers] == ["EGTT_CTR"]
@@ -0,0 +1,56 @@
+import json
+from dataclasses import replace
+
+import pytest
+
+from src.pyvatsim import VatsimEndpoints, VatsimLiveAPI
+from src.pyvatsim import decoders
+from src.pyvatsim.decoders import TypedFeed, available_backends, feed_decoder, json_decoder
+
+
+class TestDecoders:
+    @pytest.mark.parametrize("backend", available_backends())
+    def test_backends_agree(self, backend, fake_vatsim):
+        body = json.dumps(fake_vatsim["https://data.test/v3/vatsim-data.json"]).encode()
+        assert json_decoder(backend)(body) == json.loads(body)
+
+    def test_fastest_installed_is_default(self):
+        assert available_backends()[-1] == "json" # always there, as the fallback
+        assert json_decoder()(b'{"pilots": [1]}') == {"pilots": [1]}
+
+    def test_unknown_backend(self):
+        with pytest.raises(ValueError):
+            json_decoder("yaml")
+
+    @pytest.mark.parametrize("backend", available_backends())
+    def test_api_parses_with_backend(self, backend, fake_vatsim):
+        api = VatsimLiveAPI(VatsimEndpoints("https://status.test/status.json"), json_backend=backend)
+
+        assert api.pilot(callsign="BAW32").flight_plan.arrival == "EGLL"
+        assert set(api.network_servers()) == {"USA-EAST", "CANADA"}
+
+    def test_default_resolved_once(self, monkeypatch, fake_vatsim):
+        def fail():
+            raise AssertionError("backends probed again")
+
+        monkeypatch.setattr(decoders, "available_backends", fail)
+        VatsimLiveAPI(VatsimEndpoints("https://status.test/status.json"))
+
+    def test_typed_feed_matches_dict_feed(self, fake_vatsim):
+        pytest.importorskip("msgspec")
+        body = json.dumps(fake_vatsim["https://data.test/v3/vatsim-data.json"]).encode()
+        assert isinstance(feed_decoder("msgspec")(body), TypedFeed)
+        assert not isinstance(feed_decoder("json")(body), TypedFeed)
+
+        typed = VatsimLiveAPI(VatsimEndpoints("https://status.test/status.json"), json_backend="msgspec")
+        plain = VatsimLiveAPI(VatsimEndpoints("https://status.test/status.json"), json_backend="json")
+        typed.refresh()
+        plain.refresh()
+        for table in ("pilots", "prefiles", "controllers", "atis"):
+            a, b = typed._conndata_cache.get_cached(table), plain._conndata_cache.get_cached(table)
+            assert a.keys() == b.keys()
+            for k in a:
+                # msgspec rounds the feed's 7-digit fractions to the nearest microsecond, the stdlib parser truncates
+                times = {f: getattr(b[k], f) for f in ("logon_time", "last_updated") if hasattr(b[k], f)}
+                assert all(abs(getattr(a[k], f) - t).total_seconds() <= 1e-6 for f, t in times.items())
+                assert replace(a[k], **times) == b[k]
@@ -0,0 +1,224 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from src.pyvatsim import VatsimEndpoints
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.hits += 1
+        time.sleep(self.server.delay)
+        body = self.server.body() if callable(self.server.body) else self.server.body
+        self.send_response(self.server.status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if self.server.etag is not None:
+            self.send_header("ETag", self.server.etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        pass # clients that time out hang up on slow handlers, which is expected here
+
+
+@pytest.fixture
+def stand_in():
+    servers = []
+
+    def start(body=b"{}", delay=0.0, status=200, etag=None):
+        server = StandInServer(("127.0.0.1", 0), StandInHandler)
+        server.body, server.delay, server.status, server.etag, server.hits = body, delay, status, etag, 0
+        server.url = "http://127.0.0.1:%d/" % server.server_address[1]
+        threading.Thread(target=server.serve_forever, args=(0.01,), daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for s in servers:
+        s.shutdown()
+        s.server_close()
+
+
+def status_server(stand_in, data_urls):
+    doc = {
+        "data": {
+            "v3": data_urls,
+            "transceivers": data_urls,
+            "servers": data_urls,
+            "servers_sweatbox": data_urls,
+        },
+        "user": data_urls,
+        "metar": data_urls,
+    }
+    status = stand_in()
+    status.body = lambda: json.dumps(doc).encode()
+    return status, doc
+
+
+class TestEndpointMirrors:
+    def test_keeps_every_mirror(self, stand_in):
+        a, b = stand_in(), stand_in()
+        status, _ = status_server(stand_in, [a.url, b.url])
+        endpoints = VatsimEndpoints(status.url)
+
+        assert endpoints.mirrors_for("data").urls == [a.url, b.url]
+
+    def test_fails_over_to_healthy_mirror(self, stand_in):
+        broken, healthy = stand_in(status=500), stand_in(body=b'{"ok": true}')
+        status, _ = status_server(stand_in, [broken.url, healthy.url])
+        endpoints = VatsimEndpoints(status.url)
+
+        assert endpoints.get("data").json() == {"ok": True}
+        assert not endpoints.mirrors["data"].is_healthy(broken.url)
+        assert endpoints.data_json_url == healthy.url
+
+    def test_client_error_not_retried_or_marked_down(self, stand_in):
+        missing, other = stand_in(status=404), stand_in(status=404)
+        status, _ = status_server(stand_in, [missing.url, other.url])
+        endpoints = VatsimEndpoints(status.url)
+
+        with pytest.raises(requests.HTTPError):
+            endpoints.get("user", {"id": 1})
+        assert missing.hits + other.hits == 1
+        assert endpoints.mirrors["user"].is_healthy(missing.url) and endpoints.mirrors["user"].is_healthy(other.url)
+
+    def test_rate_limited_mirror_failed_over(self, stand_in):
+        limited, healthy = stand_in(status=429), stand_in(body=b'{"ok": true}')
+        status, _ = status_server(stand_in, [limited.url, healthy.url])
+        endpoints = VatsimEndpoints(status.url)
+
+        assert endpoints.get("data").json() == {"ok": True}
+        assert not endpoints.mirrors["data"].is_healthy(limited.url)
+        assert endpoints.get("data").json() == {"ok": True}
+        assert limited.hits == 1
+
+    def test_no_mirrors(self, stand_in):
+        status, _ = status_server(stand_in, [])
+        endpoints = VatsimEndpoints(status.url)
+
+        with pytest.raises(ValueError):
+            endpoints.get("data")
+
+    def test_etag_cache_bounded(self, stand_in):
+        mirror = stand_in(etag='"v1"')
+        status, _ = status_server(stand_in, [mirror.url])
+        endpoints = VatsimEndpoints(status.url)
+        endpoints.ETAG_CACHE_SIZE = 2
+
+        for cid in range(5):
+            endpoints.get("user", {"id": cid})
+
+        assert list(endpoints._etag_cache) == [mirror.url + "?id=3", mirror.url + "?id=4"]
+
+    def test_fails_over_on_timeout(self, stand_in):
+        hung, healthy = stand_in(delay=1.0), stand_in(body=b'{"ok": true}')
+        status, _ = status_server(stand_in, [hung.url, healthy.url])
+        endpoints = VatsimEndpoints(status.url, timeout=0.2)
+
+        assert endpoints.get("data").json() == {"ok": True}
+
+    def test_routes_to_fastest_mirror(self, stand_in):
+        slow, fast = stand_in(delay=0.1), stand_in()
+        status, _ = status_server(stand_in, [slow.url, fast.url])
+        endpoints = VatsimEndpoints(status.url)
+
+        # The first two fetches measure each mirror once, after that the fast one should be preferred
+        for _ in range(5):
+            endpoints.get("data")
+
+        assert endpoints.data_json_url == fast.url
+        assert slow.hits == 1
+
+    def test_hedged_request_beats_slow_mirror(self, stand_in):
+        slow, fast = stand_in(delay=1.0, body=b'"slow"'), stand_in(body=b'"fast"')
+        status, _ = status_server(stand_in, [slow.url, fast.url])
+        endpoints = VatsimEndpoints(status.url, hedge_after=0.05)
+
+        start = time.perf_counter()
+        assert endpoints.get("data").json() == "fast"
+        assert time.perf_counter() - start < 0.5
+
+    def test_rereads_status_after_ttl(self, stand_in):
+        a, b = stand_in(), stand_in()
+        status, doc = status_server(stand_in, [a.url])
+        endpoints = VatsimEndpoints(status.url, STATUS_TTL=0)
+        assert endpoints.data_json_url == a.url
+
+        doc["data"]["v3"] = [b.url]
+        time.sleep(0.01)
+        endpoints.get("data")
+
+        assert endpoints.mirrors["data"].urls == [b.url]
+        assert b.hits == 1
+
+
+class TestLazyStatus:
+    def test_construction_does_not_fetch_status(self, stand_in):
+        a = stand_in()
+        status, _ = status_server(stand_in, [a.url])
+        endpoints = VatsimEndpoints(status.url)
+        assert status.hits == 0
+
+        endpoints.get("data")
+        endpoints.get("metar")
+        assert status.hits == 1
+
+    def test_status_cached_on_disk(self, stand_in, tmp_path):
+        a = stand_in()
+        status, _ = status_server(stand_in, [a.url])
+        path = str(tmp_path / "status.json")
+
+        assert VatsimEndpoints(status.url, status_cache_path=path).data_json_url == a.url
+        assert VatsimEndpoints(status.url, status_cache_path=path).data_json_url == a.url
+        assert status.hits == 1
+
+        # A copy older than STATUS_TTL is refreshed, and one for a different status URL is ignored
+        assert VatsimEndpoints(status.url, STATUS_TTL=0, status_cache_path=path).data_json_url == a.url
+        assert status.hits == 2
+        other, _ = status_server(stand_in, [a.url])
+        VatsimEndpoints(other.url, status_cache_path=path).get("data")
+        assert other.hits == 1
+
+    def test_stale_disk_copy_used_when_status_unreachable(self, stand_in, tmp_path):
+        a = stand_in(body=b'{"ok": true}')
+        status, _ = status_server(stand_in, [a.url])
+        path = str(tmp_path / "status.json")
+        VatsimEndpoints(status.url, status_cache_path=path).get("data")
+
+        status.status = 500
+        status.body = b"not json"
+        endpoints = VatsimEndpoints(status.url, STATUS_TTL=0, status_cache_path=path)
+        assert endpoints.get("data").json() == {"ok": True}
+
+    def test_url_set_by_hand_survives_status_reload(self, stand_in):
+        a, b = stand_in(), stand_in(body=b'"mine"')
+        status, _ = status_server(stand_in, [a.url])
+        endpoints = VatsimEndpoints(status.url)
+        endpoints.data_json_url = b.url
+
+        assert endpoints.get("data").json() == "mine"
+        assert status.hits == 0
+        assert endpoints.metar_php_url == a.url
+        assert endpoints.data_json_url == b.url
+
+    def test_import_does_not_load_requests(self):
+        import os
+        import subprocess
+        import sys
+        root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+        script = "import sys; import src.pyvatsim; src.pyvatsim.VatsimLiveAPI(); print('requests' in sys.modules)"
+
+        out = subprocess.run([sys.executable, "-c", script], cwd=root, capture_output=True, text=True, check=True)
+        assert out.stdout.strip() == "False"
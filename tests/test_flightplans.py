@@ -0,0 +1,116 @@
+import pytest
+
+from src.pyvatsim import VatsimEndpoints, VatsimLiveAPI, UpdateMode, FlightplanSource, RouteTokenType, tokenize_route
+from src.pyvatsim import routes
+
+
+@pytest.fixture
+def api(fake_vatsim) -> VatsimLiveAPI:
+    return VatsimLiveAPI(VatsimEndpoints("https://status.test/status.json"))
+
+
+class TestFlightplanView:
+    def test_all_active_and_prefiled(self, api: VatsimLiveAPI):
+        assert set(api.flight_plans()) == {"BAW32", "KLM64B", "CNS949", "N8184Q"}
+        assert set(api.flight_plans(FlightplanSource.ACTIVE)) == {"BAW32", "KLM64B"}
+        assert set(api.flight_plans(FlightplanSource.PREFILED)) == {"CNS949", "N8184Q"}
+
+    def test_lookups_and_indexes(self, api: VatsimLiveAPI):
+        plans = api.flight_plans()
+
+        assert plans.by_cid(1111111).departure == "KACK"
+        assert plans.cid("BAW32") == 5555555
+        assert plans.is_prefiled("CNS949") and not plans.is_prefiled("BAW32")
+        assert list(plans.arrivals("EGLL")) == ["BAW32"]
+        assert list(plans.departures("KMBS")) == ["N8184Q"]
+        assert list(plans.alternates("VYNT")) == ["KLM64B"]
+        assert plans.arrivals("ZZZZ") == {}
+
+    def test_active_plan_wins_over_prefile(self, api: VatsimLiveAPI, fake_vatsim):
+        data = fake_vatsim["https://data.test/v3/vatsim-data.json"]
+        data["prefiles"][0]["callsign"] = "BAW32"
+
+        plans = api.flight_plans()
+        assert plans["BAW32"].arrival == "EGLL"
+        assert not plans.is_prefiled("BAW32")
+        assert plans.arrivals("KHPN") == {}
+
+    def test_view_reused_within_snapshot(self, api: VatsimLiveAPI):
+        assert api.flight_plans() is api.flight_plans()
+
+
+class TestRouteTokenizer:
+    def test_classifies_route_elements(self):
+        tokens = tokenize_route("BEKOL3A/07R BEKOL A461 IDUMA DCT LINSO/N0500F340 UN644 5030N01000W BDR288 OKIKO1A")
+        types = [t.type for t in tokens]
+
+        assert types == [
+            RouteTokenType.SID, RouteTokenType.RUNWAY, RouteTokenType.WAYPOINT, RouteTokenType.AIRWAY,
+            RouteTokenType.WAYPOINT, RouteTokenType.DIRECT, RouteTokenType.WAYPOINT, RouteTokenType.SPEED_LEVEL,
+            RouteTokenType.AIRWAY, RouteTokenType.COORDINATE, RouteTokenType.WAYPOINT, RouteTokenType.STAR,
+        ]
+        assert tokens[7].speed == "N0500"
+        assert tokens[7].level == "F340"
+
+    def test_leading_speed_level_does_not_hide_sid(self):
+        tokens = tokenize_route("N0453F370 DANGI1C DANGI")
+        assert tokens[1].type == RouteTokenType.SID
+
+    def test_memoized_by_route_and_revision(self, api: VatsimLiveAPI):
+        routes._tokenize_cached.cache_clear()
+        fp = api.flight_plans()["BAW32"]
+
+        assert fp.route_tokens is fp.route_tokens
+        assert routes._tokenize_cached.cache_info().misses == 1
+
+
+class TestFlightplanParseCache:
+    @staticmethod
+    def next_snapshot(fake_vatsim, stamp):
+        data = fake_vatsim["https://data.test/v3/vatsim-data.json"]
+        data["general"]["update_timestamp"] = "2023-04-11T16:%s.1234567Z" % stamp
+        return data
+
+    def test_unchanged_revision_reused(self, api: VatsimLiveAPI, fake_vatsim):
+        before = api.pilot(5555555).flight_plan
+
+        data = self.next_snapshot(fake_vatsim, "14:00")
+        data["pilots"][0]["altitude"] = 31000
+        api.refresh(update_mode=UpdateMode.FORCE)
+        assert api.pilot(5555555).altitude == 31000
+        assert api.pilot(5555555).flight_plan is before
+
+        data = self.next_snapshot(fake_vatsim, "14:15")
+        data["pilots"][0]["flight_plan"]["revision_id"] = 7
+        data["pilots"][0]["flight_plan"]["arrival"] = "EGKK"
+        api.refresh(update_mode=UpdateMode.FORCE)
+        assert api.pilot(5555555).flight_plan is not before
+        assert api.pilot(5555555).flight_plan.arrival == "EGKK"
+
+    def test_reused_plans_are_immutable(self, api: VatsimLiveAPI):
+        from dataclasses import FrozenInstanceError
+
+        with pytest.raises(FrozenInstanceError):
+            api.pilot(5555555).flight_plan.arrival = "XXXX"
+
+    def test_prefile_becoming_active_reuses_plan(self, api: VatsimLiveAPI, fake_vatsim):
+        prefiled = api.prefiled_pilot(cid=1111111).flight_plan
+
+        data = self.next_snapshot(fake_vatsim, "14:00")
+        prefile = data["prefiles"].pop(0)
+        pilot = dict(data["pilots"][0], cid=prefile["cid"], callsign=prefile["callsign"], flight_plan=prefile["flight_plan"])
+        data["pilots"].append(pilot)
+        api.refresh(update_mode=UpdateMode.FORCE)
+
+        assert api.pilot(1111111).flight_plan is prefiled
+
+    def test_disconnected_clients_evicted(self, api: VatsimLiveAPI, fake_vatsim):
+        api.pilots()
+        assert (4556677, "KLM64B", 3) in api._flight_plans
+
+        data = self.next_snapshot(fake_vatsim, "14:00")
+        del data["pilots"][1]
+        api.refresh(update_mode=UpdateMode.FORCE)
+
+        assert (4556677, "KLM64B", 3) not in api._flight_plans
+        assert len(api._flight_plans) == 3
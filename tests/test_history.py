@@ -0,0 +1,95 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from src.pyvatsim import VatsimEndpoints, VatsimLiveAPI, UpdateMode, HistoryStore
+
+
+@pytest.fixture
+def api(fake_vatsim) -> VatsimLiveAPI:
+    return VatsimLiveAPI(VatsimEndpoints("https://status.test/status.json"))
+
+
+@pytest.fixture
+def store(api: VatsimLiveAPI, tmp_path):
+    s = HistoryStore(str(tmp_path / "history.sqlite"))
+    api.add_snapshot_sink(s.write)
+    yield s
+    s.close()
+
+
+def next_snapshot(api, fake_vatsim, stamp):
+    data = fake_vatsim["https://data.test/v3/vatsim-data.json"]
+    data["general"]["update_timestamp"] = "2023-04-11T16:%s.0000000Z" % stamp
+    return data
+
+
+class TestHistoryStore:
+    def test_only_new_snapshots_and_changed_rows_written(self, api: VatsimLiveAPI, store: HistoryStore, fake_vatsim):
+        api.pilots()
+        api.pilots(update_mode=UpdateMode.FORCE) # same update_timestamp, nothing to write
+        assert len(list(store.snapshot_times())) == 1
+        assert len(list(store.pilot_records())) == 2
+
+        data = next_snapshot(api, fake_vatsim, "14:00")
+        data["pilots"][0]["altitude"] = 31000
+        api.pilots(update_mode=UpdateMode.FORCE)
+
+        records = list(store.pilot_records())
+        assert len(records) == 3
+        assert records[-1].cid == 5555555 and records[-1].altitude == 31000
+        assert records[-1].time == datetime(2023, 4, 11, 16, 14, tzinfo=timezone.utc)
+
+    def test_disconnects_recorded(self, api: VatsimLiveAPI, store: HistoryStore, fake_vatsim):
+        api.pilots()
+        del next_snapshot(api, fake_vatsim, "14:00")["pilots"][1]
+        api.pilots(update_mode=UpdateMode.FORCE)
+
+        last = list(store.pilot_records(callsign="KLM64B"))[-1]
+        assert not last.connected
+        assert last.latitude is None
+
+    def test_range_queries(self, api: VatsimLiveAPI, store: HistoryStore, fake_vatsim):
+        api.pilots()
+        for stamp, altitude in (("14:00", 30000), ("14:15", 31000), ("14:30", 32000)):
+            next_snapshot(api, fake_vatsim, stamp)["pilots"][0]["altitude"] = altitude
+            api.pilots(update_mode=UpdateMode.FORCE)
+
+        start = datetime(2023, 4, 11, 16, 14, tzinfo=timezone.utc)
+        end = datetime(2023, 4, 11, 16, 14, 30, tzinfo=timezone.utc)
+        assert [r.altitude for r in store.pilot_records(start, end, cid=5555555, batch_size=1)] == [30000, 31000]
+        assert [r.callsign for r in store.pilot_records(end=start)] == ["BAW32", "KLM64B"]
+        assert len(list(store.snapshot_times(start=start))) == 3
+
+    def test_restart_continues_from_stored_state(self, api: VatsimLiveAPI, store: HistoryStore, fake_vatsim, tmp_path):
+        api.pilots()
+        store.close()
+
+        reopened = HistoryStore(store.path)
+        next_snapshot(api, fake_vatsim, "14:00")
+        api._snapshot_sinks = [reopened.write]
+        api.pilots(update_mode=UpdateMode.FORCE)
+
+        assert len(list(reopened.snapshot_times())) == 2
+        assert len(list(reopened.pilot_records())) == 2
+        reopened.close()
+
+    def test_failing_sink_does_not_break_getter_or_other_sinks(self, api: VatsimLiveAPI, store: HistoryStore, caplog):
+        def broken(api):
+            raise RuntimeError("sink failed")
+
+        api._snapshot_sinks.insert(0, broken)
+
+        assert len(api.pilots()) == 2
+        assert len(list(store.snapshot_times())) == 1
+        assert "sink failed" in caplog.text
+
+    def test_write_while_reading(self, api: VatsimLiveAPI, store: HistoryStore, fake_vatsim):
+        api.pilots()
+        records = store.pilot_records(batch_size=1)
+        first = next(records)
+
+        next_snapshot(api, fake_vatsim, "14:00")["pilots"][0]["altitude"] = 30000
+        api.pilots(update_mode=UpdateMode.FORCE)
+
+        assert [first.callsign] + [r.callsign for r in records] == ["BAW32", "KLM64B", "BAW32"]
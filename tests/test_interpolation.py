@@ -0,0 +1,48 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from src.pyvatsim import VatsimEndpoints, VatsimLiveAPI, UpdateMode
+from src.pyvatsim.geo import destination
+
+
+@pytest.fixture
+def api(fake_vatsim) -> VatsimLiveAPI:
+    return VatsimLiveAPI(VatsimEndpoints("https://status.test/status.json"))
+
+
+LAST_UPDATED = datetime(2023, 4, 11, 16, 13, 42, 513479, tzinfo=timezone.utc)
+
+
+class TestDeadReckoning:
+    def test_extrapolates_along_heading(self, api: VatsimLiveAPI):
+        at = LAST_UPDATED + timedelta(seconds=30)
+        expected = destination(24.02507, 82.52637, 286, 476 * 30 / 3600)
+
+        positions = api.predicted_positions(at)
+        assert set(positions) == {5555555, 4556677}
+        assert positions[5555555] == pytest.approx(expected)
+        assert api.predicted_position(5555555, at) == pytest.approx(expected)
+        assert api.predicted_positions(at, cids=4556677).keys() == {4556677}
+
+    def test_extrapolation_is_capped(self, api: VatsimLiveAPI):
+        capped = api.predicted_positions(LAST_UPDATED + timedelta(minutes=10), max_extrapolation=timedelta(seconds=60))
+        at_limit = api.predicted_positions(LAST_UPDATED + timedelta(seconds=60))
+        assert capped[5555555] == pytest.approx(at_limit[5555555])
+
+    def test_blends_toward_observed_track(self, api: VatsimLiveAPI, fake_vatsim):
+        data = fake_vatsim["https://data.test/v3/vatsim-data.json"]
+        data["pilots"][0].update(latitude=24.0, longitude=82.5, heading=90, groundspeed=480)
+        api.track_model()
+
+        # 45 s later the pilot has actually gone 6 nm due north, despite reporting a heading of 090
+        data["general"]["update_timestamp"] = "2023-04-11T16:14:28.1234567Z"
+        data["pilots"][0].update(latitude=24.1, last_updated="2023-04-11T16:14:27.5134797Z")
+        api.refresh(update_mode=UpdateMode.FORCE)
+
+        model = api.track_model()
+        row = model.cids.index(5555555)
+        assert model.courses[row] == pytest.approx(45, abs=0.5)
+        assert model.speeds[row] * 3600 == pytest.approx(480, abs=1)
+        # Without a usable previous position the reported values are used as they are
+        assert model.courses[model.cids.index(4556677)] == 94
@@ -0,0 +1,136 @@
+import copy
+import json
+import threading
+import time
+
+import pytest
+
+from src.pyvatsim import VatsimEndpoints, VatsimLiveAPI, UpdateMode, ActivePilot, Server
+from src.pyvatsim.liveapi import InternTable
+
+
+@pytest.fixture
+def api(fake_vatsim) -> VatsimLiveAPI:
+    return VatsimLiveAPI(VatsimEndpoints("https://status.test/status.json"))
+
+
+class TestRefresh:
+    def test_refresh_populates_every_source(self, api: VatsimLiveAPI):
+        api.refresh()
+
+        assert isinstance(api.pilot(callsign="BAW32", update_mode=UpdateMode.NOUPDATE), ActivePilot)
+        assert set(api.metars(update_mode=UpdateMode.NOUPDATE).keys()) == {"EGLL", "KSFO"}
+        assert set(api.network_servers(update_mode=UpdateMode.NOUPDATE).keys()) == {"USA-EAST", "CANADA"}
+        assert isinstance(api.sweatbox_server("SWEATBOX-1", update_mode=UpdateMode.NOUPDATE), Server)
+
+    def test_refresh_only_fetches_stale_sources(self, api: VatsimLiveAPI, fake_vatsim):
+        api.refresh()
+        calls = len(fake_vatsim["calls"])
+
+        api.refresh()
+        assert len(fake_vatsim["calls"]) == calls
+
+        api.refresh(update_mode=UpdateMode.FORCE)
+        assert len(fake_vatsim["calls"]) == calls + 4
+
+    def test_refresh_downloads_concurrently(self, api: VatsimLiveAPI, fake_vatsim, monkeypatch):
+        import requests
+        fake_get = requests.get
+        in_flight = []
+        peak = []
+        lock = threading.Lock()
+
+        def slow_get(url, *args, **kwargs):
+            with lock:
+                in_flight.append(url)
+                peak.append(len(in_flight))
+            time.sleep(0.05)
+            with lock:
+                in_flight.remove(url)
+            return fake_get(url, *args, **kwargs)
+
+        monkeypatch.setattr(requests, "get", slow_get)
+        api.refresh()
+
+        assert max(peak) == 4
+
+    def test_failed_download_leaves_previous_snapshot(self, api: VatsimLiveAPI, fake_vatsim):
+        api.refresh()
+        before = api.pilots(update_mode=UpdateMode.NOUPDATE)
+
+        del fake_vatsim["https://metar.test/metar.php"]
+        with pytest.raises(KeyError):
+            api.refresh(update_mode=UpdateMode.FORCE)
+
+        assert api.pilots(update_mode=UpdateMode.NOUPDATE) is before
+
+
+class TestViews:
+    def test_raw_feed_not_mutated_by_parsing(self, api: VatsimLiveAPI):
+        raw = api._decode(api.vatsim_endpoints.get("data").content) # plain dicts, whichever backend is installed
+        before = copy.deepcopy(raw)
+        api._cache_conn_data(raw)
+
+        assert raw == before
+        assert isinstance(raw["pilots"][0]["server"], str)
+        assert isinstance(raw["pilots"][0]["flight_plan"], dict)
+        assert "short" not in raw["pilot_ratings"][0]
+
+    def test_getters_return_read_only_views(self, api: VatsimLiveAPI):
+        pilots = api.pilots()
+        with pytest.raises(TypeError):
+            pilots[1] = None
+        with pytest.raises(TypeError):
+            api.controllers(callsigns="LGAV")["x"] = None
+        with pytest.raises(TypeError):
+            api.metars()["EGLL"] = None
+
+        assert api.pilots() is pilots
+
+    def test_iterators_are_lazy(self, api: VatsimLiveAPI, fake_vatsim):
+        calls = len(fake_vatsim["calls"])
+        it = api.iter_pilots(callsigns="^BAW")
+        assert len(fake_vatsim["calls"]) == calls
+
+        assert [p.cid for p in it] == [5555555]
+        assert [p.callsign for p in api.iter_pilots(cids=[4556677, 1])] == ["KLM64B"]
+        assert next(api.iter_controllers()).callsign == api.controllers()[next(iter(api.controllers()))].callsign
+        assert len(list(api.iter_prefiled_pilots())) == 2
+
+
+class TestInterning:
+    @staticmethod
+    def fresh_feed(fake_vatsim, stamp):
+        # A json round trip, so every value is a new string object like in a real download
+        data = json.loads(json.dumps(fake_vatsim["https://data.test/v3/vatsim-data.json"]))
+        data["general"]["update_timestamp"] = "2023-04-11T16:%s.1234567Z" % stamp
+        return data
+
+    def test_repeated_values_share_one_object(self, api: VatsimLiveAPI, fake_vatsim):
+        api._cache_conn_data(self.fresh_feed(fake_vatsim, "14:00"))
+        plans = [p.flight_plan for p in api.pilots().values()] + [p.flight_plan for p in api.prefiled_pilots().values()]
+        assert len({id(fp.flight_rules) for fp in plans}) == 1
+
+        before = api.pilot(5555555).flight_plan
+        data = self.fresh_feed(fake_vatsim, "14:15")
+        data["pilots"][0]["flight_plan"]["revision_id"] = 7
+        api._cache_conn_data(data)
+
+        after = api.pilot(5555555).flight_plan
+        assert after is not before
+        assert after.aircraft_short is before.aircraft_short
+        assert after.departure is before.departure
+
+    def test_table_is_bounded(self):
+        table = InternTable(max_size=2)
+        values = ["%s%d" % ("EG", i) for i in range(5)]
+        assert [table(v) for v in values] == values
+        assert len(table) == 2
+        assert table(None) is None
+
+        first = table("EG0")
+        table.rotate()
+        assert table("".join(["EG", "0"])) is first
+        table.rotate()
+        table.rotate()
+        assert "EG0" not in table._previous and len(table) == 0
@@ -0,0 +1,104 @@
+import threading
+import time
+from datetime import timedelta
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+import requests
+
+from src.pyvatsim import VatsimEndpoints, VatsimLiveAPI, Member, MemberCache, MemberLookup
+from src.pyvatsim import members as members_module
+from conftest import FakeResponse
+
+USER_URL = "https://stats.test/search_id.php"
+
+
+def member_json(cid):
+    return {"id": cid, "rating": 3, "pilotrating": 1, "militaryrating": 0, "susp_date": None,
+            "reg_date": "2014-01-13T21:12:29", "region_id": "EMEA", "division_id": "GBR", "subdivision_id": None,
+            "lastratingchange": "2019-06-01T10:00:00"}
+
+
+@pytest.fixture
+def user_endpoint(fake_vatsim):
+    # Serves 1000000-1999999, 404 for anything else, and 500 for 666. Keeps track of how many requests are in flight
+    state = {"fetched": [], "in_flight": 0, "max_in_flight": 0, "delay": 0}
+    lock = threading.Lock()
+
+    def answer(url):
+        cid = int(parse_qs(urlsplit(url).query)["id"][0])
+        with lock:
+            state["fetched"].append(cid)
+            state["in_flight"] += 1
+            state["max_in_flight"] = max(state["max_in_flight"], state["in_flight"])
+        time.sleep(state["delay"])
+        with lock:
+            state["in_flight"] -= 1
+        if cid == 666:
+            return FakeResponse("", status_code=500)
+        if not 1000000 <= cid < 2000000:
+            return FakeResponse("", status_code=404)
+        return FakeResponse(member_json(cid))
+
+    fake_vatsim[USER_URL] = answer
+    return state
+
+
+@pytest.fixture
+def api(fake_vatsim, tmp_path) -> VatsimLiveAPI:
+    return VatsimLiveAPI(VatsimEndpoints("https://status.test/status.json"), member_cache_path=str(tmp_path / "members.sqlite"))
+
+
+class TestMemberLookup:
+    def test_deduplicated_and_cached(self, api: VatsimLiveAPI, user_endpoint):
+        result = api.members([1234567, 1234567, 1000001, 42])
+
+        assert sorted(user_endpoint["fetched"]) == [42, 1000001, 1234567]
+        assert list(result) == [1234567, 1000001, 42]
+        assert result[42] is None
+        m = result[1234567]
+        assert isinstance(m, Member) and m.division == "GBR" and m.registered.year == 2014
+
+        assert api.member(1234567) == m
+        assert api.members([1000001, 42])[1000001].cid == 1000001
+        assert len(user_endpoint["fetched"]) == 3
+
+    def test_cache_persists_across_processes(self, api: VatsimLiveAPI, user_endpoint, tmp_path):
+        api.members([1000001, 1000002])
+        again = VatsimLiveAPI(VatsimEndpoints("https://status.test/status.json"), member_cache_path=str(tmp_path / "members.sqlite"))
+
+        assert again.member(1000002).cid == 1000002
+        assert len(user_endpoint["fetched"]) == 2
+
+    def test_concurrency_limit(self, api: VatsimLiveAPI, user_endpoint):
+        user_endpoint["delay"] = 0.02
+        lookup = MemberLookup(api.vatsim_endpoints, concurrency=3, batch_size=4)
+        assert len(lookup.members(range(1000000, 1000010))) == 10
+        assert 1 < user_endpoint["max_in_flight"] <= 3
+
+    def test_failures_raised_after_caching_the_rest(self, api: VatsimLiveAPI, user_endpoint):
+        with pytest.raises(requests.HTTPError):
+            api.members([1000001, 666, 1000002])
+
+        user_endpoint["fetched"].clear()
+        with pytest.raises(requests.HTTPError):
+            api.members([1000001, 666, 1000002])
+        assert user_endpoint["fetched"] == [666]
+
+
+class TestMemberCache:
+    def test_expiry_and_lru_eviction(self, monkeypatch):
+        now = [1000.0]
+        monkeypatch.setattr(members_module.time, "time", lambda: now[0])
+        cache = MemberCache(ttl=timedelta(seconds=100), missing_ttl=timedelta(seconds=10), max_entries=2)
+
+        cache.put_many({1: {"id": 1}, 2: None})
+        now[0] += 20
+        assert cache.get_many([1, 2]) == {1: {"id": 1}} # the missing entry has expired
+
+        cache.put_many({3: {"id": 3}}) # 2 was used least recently
+        assert len(cache) == 2
+        assert set(cache.get_many([1, 2, 3])) == {1, 3}
+
+        now[0] += 100
+        assert cache.get_many([1, 3]) == {3: {"id": 3}}
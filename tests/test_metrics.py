@@ -0,0 +1,82 @@
+from datetime import timedelta
+
+import pytest
+
+from src.pyvatsim import VatsimEndpoints, VatsimLiveAPI, VatspyAirports, FlightPhase, UpdateMode
+from src.pyvatsim.geo import distance_nm, distances_nm, destination, bearing_deg
+
+
+@pytest.fixture
+def api(fake_vatsim, vatspy_dat) -> VatsimLiveAPI:
+    return VatsimLiveAPI(VatsimEndpoints("https://status.test/status.json"), airports=VatspyAirports(vatspy_dat))
+
+
+class TestGeo:
+    def test_distance_matches_known_value(self):
+        # EGLL to KJFK is roughly 2990 nm
+        assert distance_nm(51.4775, -0.461389, 40.639751, -73.778925) == pytest.approx(2990, rel=0.01)
+
+    def test_batch_distances_match_single(self):
+        lats1, lons1, lats2, lons2 = [51.5, 10.0], [-0.4, 20.0], [40.6, -10.0], [-73.7, 30.0]
+        batch = distances_nm(lats1, lons1, lats2, lons2)
+        assert batch == pytest.approx([distance_nm(*row) for row in zip(lats1, lons1, lats2, lons2)])
+
+    def test_destination_round_trips(self):
+        lat, lon = destination(51.0, 0.0, 90.0, 60.0)
+        assert distance_nm(51.0, 0.0, lat, lon) == pytest.approx(60.0)
+        assert bearing_deg(51.0, 0.0, lat, lon) == pytest.approx(90.0, abs=0.5)
+
+
+class TestVatspyAirports:
+    def test_prefers_real_airport_and_skips_malformed_rows(self, vatspy_dat):
+        airports = VatspyAirports(vatspy_dat)
+
+        assert airports.get("EGLL").name == "London Heathrow"
+        assert "BAD" not in airports
+        assert "EGTT" not in airports
+
+
+class TestFlightMetrics:
+    def test_metrics_computed_once_per_snapshot(self, api: VatsimLiveAPI):
+        first = api.flight_metrics()
+        assert api.flight_metrics() is first
+
+        api.pilots(update_mode=UpdateMode.FORCE)
+        # The fixture's update_timestamp doesn't change, so it's still the same snapshot
+        assert api.flight_metrics() is first
+
+    def test_distances_and_eta(self, api: VatsimLiveAPI):
+        m = api.flight_metric(5555555)
+        pilot = api.pilot(5555555)
+
+        assert m.distance_to_destination == pytest.approx(distance_nm(pilot.latitude, pilot.longitude, 51.4775, -0.461389))
+        assert m.distance_flown == pytest.approx(distance_nm(pilot.latitude, pilot.longitude, 22.308919, 113.914603))
+        assert m.eta == pilot.last_updated + timedelta(hours=m.distance_to_destination / pilot.groundspeed)
+        assert 0 < m.progress < 1
+
+    def test_time_online_and_phase(self, api: VatsimLiveAPI):
+        m = api.flight_metric(4556677)
+        pilot = api.pilot(4556677)
+
+        assert m.time_online == api._server_last_updated - pilot.logon_time
+        assert m.phase == FlightPhase.CRUISE
+
+    def test_phase_uses_previous_snapshot(self, api: VatsimLiveAPI, fake_vatsim):
+        api.flight_metrics()
+        data = fake_vatsim["https://data.test/v3/vatsim-data.json"]
+        data["general"]["update_timestamp"] = "2023-04-11T16:13:58.1234567Z"
+        data["pilots"][0]["altitude"] -= 2000
+        data["pilots"][1]["groundspeed"] = 0
+
+        api.pilots(update_mode=UpdateMode.FORCE)
+
+        assert api.flight_metric(5555555).phase == FlightPhase.DESCENT
+        assert api.flight_metric(4556677).phase == FlightPhase.GROUND
+
+    def test_without_airports_distances_are_none(self, fake_vatsim):
+        api = VatsimLiveAPI(VatsimEndpoints("https://status.test/status.json"))
+        m = api.flight_metric(5555555)
+
+        assert m.distance_to_destination is None
+        assert m.eta is None
+        assert m.progress is None
@@ -0,0 +1,103 @@
+import random
+from datetime import timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from src.pyvatsim import VatsimEndpoints, VatsimLiveAPI, UpdateMode, ProximityEngine
+from src.pyvatsim.geo import distance_nm
+
+
+@pytest.fixture
+def api(fake_vatsim) -> VatsimLiveAPI:
+    return VatsimLiveAPI(VatsimEndpoints("https://status.test/status.json"))
+
+
+def random_pilots(n, seed=1):
+    rnd = random.Random(seed)
+    return {
+        cid: SimpleNamespace(cid=cid, latitude=rnd.uniform(50, 52), longitude=rnd.uniform(179, 181) % 360 - 180,
+                             altitude=rnd.choice([30000, 30500, 32000]), groundspeed=450, heading=rnd.randint(0, 359))
+        for cid in range(n)
+    }
+
+
+class TestProximityEngine:
+    def test_matches_brute_force(self):
+        pilots = random_pilots(400)
+        engine = ProximityEngine(10, 1000)
+        engine.update(pilots)
+
+        expected = {
+            (a, b) for a in pilots for b in pilots
+            if a < b and abs(pilots[a].altitude - pilots[b].altitude) <= 1000
+            and distance_nm(pilots[a].latitude, pilots[a].longitude, pilots[b].latitude, pilots[b].longitude) <= 10
+        }
+        assert expected # the pilots straddle the antimeridian, so this also checks the wrap-around
+        assert {(p.cid_a, p.cid_b) for p in engine.pairs(10, 1000)} == expected
+
+    def test_incremental_update(self):
+        pilots = random_pilots(50)
+        engine = ProximityEngine(10)
+        engine.update(pilots)
+
+        del pilots[0]
+        pilots[1] = SimpleNamespace(**dict(vars(pilots[2]), cid=1, latitude=pilots[2].latitude + 0.01))
+        pilots[3] = SimpleNamespace(**dict(vars(pilots[3]), groundspeed=0)) # on the ground, so ignored
+        engine.update(pilots)
+
+        assert len(engine) == 48
+        assert any({p.cid_a, p.cid_b} == {1, 2} for p in engine.pairs(10, 1000))
+        assert all(3 not in (p.cid_a, p.cid_b) for p in engine.pairs(10, 1000))
+
+    def test_empty_cells_dropped(self):
+        pilots = random_pilots(50)
+        engine = ProximityEngine(10)
+        engine.update(pilots)
+        engine.update({cid: SimpleNamespace(**dict(vars(p), latitude=p.latitude - 20)) for cid, p in pilots.items()})
+
+        assert all(engine._cells.values())
+        engine.update({})
+        assert len(engine._cells) == 0
+
+    def test_radius_larger_than_cell_rejected(self):
+        with pytest.raises(ValueError):
+            ProximityEngine(5).pairs(10, 1000)
+        with pytest.raises(ValueError):
+            ProximityEngine(10, 500).pairs(10, 1000)
+
+
+class TestLiveProximity:
+    def test_close_pair(self, api: VatsimLiveAPI, fake_vatsim):
+        data = fake_vatsim["https://data.test/v3/vatsim-data.json"]
+        data["pilots"][1].update(latitude=24.05, longitude=82.55, altitude=30500)
+
+        (pair,) = api.proximity_pairs(5, 1000)
+        assert {pair.cid_a, pair.cid_b} == {5555555, 4556677}
+        assert pair.distance == pytest.approx(2.0, abs=0.2)
+        assert pair.vertical == 523
+        assert api.proximity_pairs(5, 500) == ()
+        assert api.proximity_pairs(5, 1000) is api.proximity_pairs(5, 1000)
+
+    def test_head_on_conflict(self, api: VatsimLiveAPI, fake_vatsim):
+        data = fake_vatsim["https://data.test/v3/vatsim-data.json"]
+        data["pilots"][0].update(heading=270, altitude=30000)
+        data["pilots"][1].update(latitude=24.02507, longitude=82.52637 - 0.3653, heading=90, altitude=30000)
+
+        assert api.proximity_pairs(5, 1000) == ()
+        (conflict,) = api.conflicts(5, 1000, timedelta(minutes=2))
+        assert conflict.time_to_closest.total_seconds() == pytest.approx(75, abs=2)
+        assert conflict.closest_distance < 0.5
+        assert api.conflicts(5, 1000, timedelta(seconds=30)) == ()
+
+    def test_engine_reused_across_snapshots(self, api: VatsimLiveAPI, fake_vatsim):
+        api.proximity_pairs(5, 1000)
+        engine = api._proximity_engines[(5, 1000)][0]
+
+        data = fake_vatsim["https://data.test/v3/vatsim-data.json"]
+        data["general"]["update_timestamp"] = "2023-04-11T16:13:58.1234567Z"
+        data["pilots"][1].update(latitude=24.05, longitude=82.55, altitude=30500)
+        api.refresh(update_mode=UpdateMode.FORCE)
+
+        assert len(api.proximity_pairs(5, 1000)) == 1
+        assert api._proximity_engines[(5, 1000)][0] is engine
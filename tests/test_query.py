@@ -0,0 +1,63 @@
+import pytest
+
+from src.pyvatsim import VatsimEndpoints, VatsimLiveAPI, UpdateMode
+
+
+@pytest.fixture
+def api(fake_vatsim) -> VatsimLiveAPI:
+    return VatsimLiveAPI(VatsimEndpoints("https://status.test/status.json"))
+
+
+class TestQuery:
+    def test_flight_plan_fields_and_lookups(self, api: VatsimLiveAPI):
+        result = api.query("pilots").where(arrival="EGLL", altitude__gt=20000).all()
+        assert list(result.keys()) == [5555555]
+
+        assert api.query("pilots").where(arrival="EGLL", altitude__lt=10000).count() == 0
+        assert api.query("pilots").where(aircraft_short__in=["A320", "B738"]).first().callsign == "KLM64B"
+
+    def test_joined_objects_compare_by_key(self, api: VatsimLiveAPI):
+        assert api.query("pilots").where(server="CANADA").first().cid == 4556677
+        assert api.query("controllers").where(facility="TWR", callsign__startswith="LGAV").count() == 1
+        assert api.query("controllers").where(facility__id=4).count() == 2
+
+    def test_regex_and_select(self, api: VatsimLiveAPI):
+        rows = api.query("prefiles").where(callsign__regex=r"^N\d").select("callsign", "departure")
+        assert rows == [{"callsign": "N8184Q", "departure": "KMBS"}]
+
+    def test_where_chains_and_is_immutable(self, api: VatsimLiveAPI):
+        base = api.query("pilots").where(flight_rules="I")
+        narrowed = base.where(departure="VHHH")
+
+        assert base.count() == 2
+        assert narrowed.count() == 1
+
+    def test_plans_and_results_cached_per_snapshot(self, api: VatsimLiveAPI, fake_vatsim):
+        first = api.query("pilots").where(arrival="EGLL").all()
+        plans = dict(api._query_plans)
+
+        assert api.query("pilots").where(arrival="EGLL").all() is first
+        assert api._query_plans == plans
+
+        data = fake_vatsim["https://data.test/v3/vatsim-data.json"]
+        data["general"]["update_timestamp"] = "2023-04-11T16:13:58.1234567Z"
+        data["pilots"][1]["flight_plan"]["arrival"] = "EGLL"
+        data["pilots"][1]["flight_plan"]["revision_id"] += 1
+        api.pilots(update_mode=UpdateMode.FORCE)
+
+        assert set(api.query("pilots").where(arrival="EGLL").all().keys()) == {5555555, 4556677}
+
+    def test_cached_results_bounded(self, api: VatsimLiveAPI):
+        from src.pyvatsim.query import MAX_CACHED
+
+        for altitude in range(MAX_CACHED + 10):
+            api.query("pilots").where(altitude__gt=altitude).count()
+
+        assert len(api._per_snapshot("query_results", dict, UpdateMode.NOUPDATE)) <= MAX_CACHED
+        assert len(api._query_plans) <= MAX_CACHED
+
+    def test_unknown_field_or_source_raises(self, api: VatsimLiveAPI):
+        with pytest.raises(ValueError):
+            api.query("pilots").where(wingspan=10).all()
+        with pytest.raises(ValueError):
+            api.query("airports")
@@ -0,0 +1,110 @@
+import copy
+import threading
+import time
+
+import pytest
+
+from src.pyvatsim import VatsimEndpoints, VatsimLiveAPI, UpdateMode
+from src.pyvatsim.registry import clear_shared_caches
+from conftest import FakeResponse
+
+DATA_URL = "https://data.test/v3/vatsim-data.json"
+
+
+@pytest.fixture(autouse=True)
+def empty_registry():
+    clear_shared_caches()
+    yield
+    clear_shared_caches()
+
+
+def shared_api(**kwargs) -> VatsimLiveAPI:
+    return VatsimLiveAPI(VatsimEndpoints("https://status.test/status.json"), share_caches=True, **kwargs)
+
+
+def data_downloads(fake_vatsim):
+    return fake_vatsim["calls"].count(DATA_URL)
+
+
+class TestSharedCaches:
+    def test_instances_share_one_download_and_parse(self, fake_vatsim):
+        a, b = shared_api(), shared_api()
+        pilots = a.pilots()
+
+        assert b.pilots() is pilots
+        assert b.traffic_stats().departures == a.traffic_stats().departures
+        assert data_downloads(fake_vatsim) == 1
+        stats = b.shared_cache_stats()
+        assert (stats.fetches, stats.duplicate_fetches_avoided, stats.parses_avoided) == (1, 1, 1)
+
+    def test_each_instance_keeps_its_ttl(self, fake_vatsim):
+        a, b = shared_api(DATA_TTL=60), shared_api(DATA_TTL=60)
+        a.pilots()
+        data = fake_vatsim[DATA_URL]
+        data["general"]["update_timestamp"] = "2023-04-11T16:14:00.0000000Z"
+        data["pilots"][0]["altitude"] = 31000
+
+        assert b.pilot(5555555, update_mode=UpdateMode.FORCE).altitude == 31000
+        assert data_downloads(fake_vatsim) == 2
+        assert a.pilot(5555555).altitude != 31000 # a's own copy is still within its TTL
+
+        c = shared_api(DATA_TTL=60)
+        assert c.pilot(5555555).altitude == 31000
+        assert c.metar("EGLL") is a.metar("EGLL")
+        assert data_downloads(fake_vatsim) == 2
+
+    def test_one_download_in_flight(self, fake_vatsim):
+        payload = copy.deepcopy(fake_vatsim[DATA_URL])
+        fake_vatsim[DATA_URL] = lambda url: time.sleep(0.1) or FakeResponse(payload)
+        apis = [shared_api() for _ in range(4)]
+        for api in apis:
+            api.vatsim_endpoints.url("data") # load status.json up front, so only the data download is concurrent
+
+        threads = [threading.Thread(target=api.pilots) for api in apis]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert data_downloads(fake_vatsim) == 1
+        assert apis[0].shared_cache_stats().duplicate_fetches_avoided == 3
+        assert len({id(api.pilots(update_mode=UpdateMode.NOUPDATE)) for api in apis}) == 1
+
+    def test_opt_in_and_keyed_by_endpoints(self, fake_vatsim):
+        plain = [VatsimLiveAPI(VatsimEndpoints("https://status.test/status.json")) for _ in range(2)]
+        for api in plain:
+            api.pilots()
+        assert data_downloads(fake_vatsim) == 2
+        assert plain[0].shared_cache_stats() is None
+
+        shared_api().pilots()
+        other = shared_api()
+        other.vatsim_endpoints.data_json_url = DATA_URL # a hand-set URL makes it a different set of endpoints
+        other.pilots()
+        assert data_downloads(fake_vatsim) == 4
+
+    def test_sink_can_read_from_another_sharing_instance(self, fake_vatsim):
+        a, b = shared_api(), shared_api()
+        seen = []
+        a.add_snapshot_sink(lambda api: seen.append(len(b.pilots())))
+        b.add_snapshot_sink(lambda api: seen.append(len(api.pilots(update_mode=UpdateMode.NOUPDATE))))
+
+        t = threading.Thread(target=a.pilots, daemon=True)
+        t.start()
+        t.join(5)
+
+        assert not t.is_alive()
+        assert seen == [2, 2] # b's sink ran once, while a's sink read through b
+        assert data_downloads(fake_vatsim) == 1
+
+    def test_own_downloads_not_counted_as_avoided(self, fake_vatsim):
+        api = shared_api(DATA_TTL=0.2)
+        api.pilots()
+        time.sleep(0.25)
+        # Upstream hasn't changed, so our TTL isn't reset and both calls go back to the shared cache. The first downloads
+        # again, the second gets that download back
+        api.pilots()
+        api.pilots()
+
+        stats = api.shared_cache_stats()
+        assert (stats.fetches, stats.duplicate_fetches_avoided, stats.parses_avoided) == (2, 0, 0)
@@ -0,0 +1,122 @@
+import gzip
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from src.pyvatsim import VatsimEndpoints, VatsimLiveAPI, UpdateMode
+from src.pyvatsim.relay import VatsimRelay, main
+from conftest import FakeResponse
+
+
+@pytest.fixture
+def relay(fake_vatsim) -> VatsimRelay:
+    r = VatsimRelay(VatsimEndpoints("https://status.test/status.json"), "http://127.0.0.1:0")
+    r.poll(force=True)
+    return r
+
+
+@pytest.fixture
+def relay_url(relay: VatsimRelay):
+    server = relay.make_server("127.0.0.1", 0)
+    relay.set_public_url("http://127.0.0.1:%d" % server.server_address[1])
+    threading.Thread(target=server.serve_forever, args=(0.01,), daemon=True).start()
+    yield relay.public_url
+    server.shutdown()
+    server.server_close()
+
+
+def get(url, headers=None):
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, headers=headers or {})) as r:
+            return r.status, dict(r.headers), r.read()
+    except urllib.error.HTTPError as e:
+        return e.code, dict(e.headers), b""
+
+
+class TestRelay:
+    def test_filtered_pilots(self, relay: VatsimRelay):
+        def callsigns(**query):
+            body = relay.response("/v3/pilots", {k: [v] for k, v in query.items()}).body
+            return [p["callsign"] for p in json.loads(body)["pilots"]]
+
+        assert callsigns(callsign_prefix="BAW") == ["BAW32"]
+        assert callsigns(airport="VYYY") == ["KLM64B"]
+        assert callsigns(bbox="20,80,30,90") == ["BAW32"]
+        assert callsigns(bbox="20,80,30,90", airport="VYYY") == []
+        assert sorted(callsigns()) == ["BAW32", "KLM64B"]
+
+    def test_non_finite_bbox_rejected(self, relay: VatsimRelay):
+        for bbox in ("-inf,0,10,10", "0,nan,10,10"):
+            with pytest.raises(ValueError):
+                relay.response("/v3/pilots", {"bbox": [bbox]})
+
+    def test_filtered_metars_and_controllers(self, relay: VatsimRelay):
+        assert relay.response("/metar.php", {"id": ["egll"]}).body.startswith(b"EGLL 111550Z")
+        assert relay.response("/metar.php", {"id": ["all"]}).body.count(b"\n") == 1
+        controllers = json.loads(relay.response("/v3/controllers", {"callsign_prefix": ["EDDK"]}).body)["controllers"]
+        assert [c["callsign"] for c in controllers] == ["EDDK_TWR"]
+
+    def test_filtered_responses_cached_until_update(self, relay: VatsimRelay, fake_vatsim):
+        first = relay.response("/v3/pilots", {"airport": ["EGLL"]})
+        assert relay.response("/v3/pilots", {"airport": ["EGLL"]}) is first
+
+        fake_vatsim["https://data.test/v3/vatsim-data.json"]["general"]["update_timestamp"] = "2023-04-11T16:13:58.1234567Z"
+        assert relay.poll(force=True) == ["data"]
+        assert relay.response("/v3/pilots", {"airport": ["EGLL"]}) is not first
+
+    def test_failed_source_does_not_block_others(self, relay: VatsimRelay, fake_vatsim):
+        metars = relay.response("/metar.php")
+        fake_vatsim["https://metar.test/metar.php"] = lambda url: FakeResponse("", status_code=503)
+        fake_vatsim["https://data.test/v3/vatsim-data.json"]["general"]["update_timestamp"] = "2023-04-11T16:13:58.1234567Z"
+
+        assert relay.poll(force=True) == ["data"]
+        assert relay.response("/metar.php") is metars
+
+    def test_etag_and_gzip(self, relay_url):
+        status, headers, body = get(relay_url + "/v3/vatsim-data.json", {"Accept-Encoding": "gzip"})
+        assert status == 200
+        assert headers["Content-Encoding"] == "gzip"
+        assert json.loads(gzip.decompress(body))["general"]["version"] == 3
+
+        status, _, body = get(relay_url + "/v3/vatsim-data.json", {"If-None-Match": headers["ETag"]})
+        assert status == 304
+        assert body == b""
+
+        assert get(relay_url + "/v3/pilots?bbox=1,2")[0] == 400
+        assert get(relay_url + "/nothing-here")[0] == 404
+
+    def test_library_can_use_relay_as_status_source(self, relay_url, fake_vatsim):
+        api = VatsimLiveAPI(VatsimEndpoints(relay_url + "/status.json"))
+        upstream_calls = len(fake_vatsim["calls"])
+
+        assert api.pilot(callsign="BAW32").flight_plan.arrival == "EGLL"
+        assert api.metar("KSFO") is not None
+        assert api.sweatbox_servers() is not None
+        assert len(fake_vatsim["calls"]) == upstream_calls
+
+        # The second fetch of the same URL is a conditional request, answered with a 304 from the relay
+        api.pilots(update_mode=UpdateMode.FORCE)
+        assert api.pilot(cid=4556677).callsign == "KLM64B"
+        assert relay_url + "/v3/vatsim-data.json" in api.vatsim_endpoints._etag_cache
+
+    def test_main_parses_arguments(self, monkeypatch):
+        seen = {}
+
+        class Stop(Exception):
+            pass
+
+        def fake_init(self, endpoints, public_url, *ttls):
+            seen["public_url"] = public_url
+            seen["ttls"] = ttls
+            raise Stop()
+
+        monkeypatch.setattr(VatsimRelay, "__init__", fake_init)
+        monkeypatch.setattr(VatsimEndpoints, "__init__", lambda self, url: None)
+        with pytest.raises(Stop):
+            main(["--port", "9000", "--data-ttl", "5"])
+
+        assert seen["public_url"] == "http://127.0.0.1:9000"
+        assert seen["ttls"] == (5, 60, 15, 300)
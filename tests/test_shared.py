@@ -0,0 +1,114 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from src.pyvatsim import VatsimEndpoints, VatsimLiveAPI, UpdateMode, SnapshotPublisher, SharedSnapshotAPI, ActivePilot
+
+
+@pytest.fixture
+def api(fake_vatsim) -> VatsimLiveAPI:
+    return VatsimLiveAPI(VatsimEndpoints("https://status.test/status.json"))
+
+
+@pytest.fixture
+def snapshot_path(tmp_path) -> str:
+    return str(tmp_path / "vatsim.snapshot")
+
+
+class TestSharedSnapshot:
+    def test_reader_has_same_getter_api(self, api: VatsimLiveAPI, snapshot_path):
+        assert SnapshotPublisher(api, snapshot_path).publish()
+        reader = SharedSnapshotAPI(snapshot_path)
+
+        assert reader.pilot(5555555) == api.pilot(5555555)
+        assert isinstance(reader.pilot(callsign="KLM64B"), ActivePilot)
+        assert set(reader.pilots().keys()) == {5555555, 4556677}
+        assert reader.controllers(callsigns="LGAV").keys() == api.controllers(callsigns="LGAV").keys()
+        assert reader.metar("EGLL").raw_text == api.metar("EGLL").raw_text
+        assert "SWEATBOX-1" in reader.sweatbox_servers()
+        assert reader.query("pilots").where(arrival="EGLL").count() == 1
+        assert reader.shared_cache_stats() is None
+
+    def test_records_decoded_lazily(self, api: VatsimLiveAPI, snapshot_path):
+        SnapshotPublisher(api, snapshot_path).publish()
+        reader = SharedSnapshotAPI(snapshot_path)
+
+        reader.pilot(5555555)
+        pilots = reader._conndata_cache.get_cached("pilots")
+        assert list(pilots._decoded.keys()) == [5555555]
+        assert reader._conndata_cache.get_cached("prefiles")._index is None
+
+    def test_publish_skips_unchanged_snapshot(self, api: VatsimLiveAPI, snapshot_path):
+        publisher = SnapshotPublisher(api, snapshot_path)
+        assert publisher.publish()
+        assert not publisher.publish()
+
+    def test_reader_picks_up_new_snapshot(self, api: VatsimLiveAPI, snapshot_path, fake_vatsim):
+        publisher = SnapshotPublisher(api, snapshot_path)
+        publisher.publish()
+        reader = SharedSnapshotAPI(snapshot_path, check_interval=0)
+        assert reader.pilot(5555555).altitude == 29977
+
+        data = fake_vatsim["https://data.test/v3/vatsim-data.json"]
+        data["general"]["update_timestamp"] = "2023-04-11T16:13:58.1234567Z"
+        data["pilots"][0]["altitude"] = 31000
+        assert publisher.publish(UpdateMode.FORCE)
+
+        assert reader.pilot(5555555).altitude == 31000
+        assert reader.generation == 2
+
+    def test_held_mapping_survives_new_generation(self, api: VatsimLiveAPI, snapshot_path, fake_vatsim):
+        import gc
+        import weakref
+
+        publisher = SnapshotPublisher(api, snapshot_path)
+        publisher.publish()
+        reader = SharedSnapshotAPI(snapshot_path, check_interval=0)
+        held = reader.pilots()
+        old_mmap = weakref.ref(reader._conndata_cache.get_cached("pilots")._view.obj)
+
+        data = fake_vatsim["https://data.test/v3/vatsim-data.json"]
+        data["general"]["update_timestamp"] = "2023-04-11T16:13:58.1234567Z"
+        data["pilots"][0]["altitude"] = 31000
+        publisher.publish(UpdateMode.FORCE)
+        assert reader.pilot(5555555).altitude == 31000
+
+        assert [p.altitude for p in held.values()][0] == 29977
+        assert old_mmap() is not None
+
+        del held
+        gc.collect()
+        assert old_mmap() is None
+
+    def test_decoded_records_bounded(self, api: VatsimLiveAPI, snapshot_path, monkeypatch):
+        from src.pyvatsim import shared
+
+        monkeypatch.setattr(shared, "DECODED_CACHE_SIZE", 1)
+        SnapshotPublisher(api, snapshot_path).publish()
+        reader = SharedSnapshotAPI(snapshot_path)
+
+        reader.pilot(5555555)
+        reader.pilot(4556677)
+        assert list(reader._conndata_cache.get_cached("pilots")._decoded.keys()) == [4556677]
+
+    def test_reader_member_lookups_use_member_cache(self, api: VatsimLiveAPI, snapshot_path, tmp_path):
+        from src.pyvatsim import MemberCache
+
+        cache_path = str(tmp_path / "members.sqlite")
+        cache = MemberCache(cache_path)
+        cache.put_many({1234567: {"id": 1234567, "division_id": "GBR"}})
+        cache.close()
+        SnapshotPublisher(api, snapshot_path).publish()
+        reader = SharedSnapshotAPI(snapshot_path, member_cache_path=cache_path)
+
+        assert reader.member(1234567).division == "GBR"
+
+    def test_reader_in_another_process(self, api: VatsimLiveAPI, snapshot_path):
+        SnapshotPublisher(api, snapshot_path).publish()
+        root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+        script = "from src.pyvatsim import SharedSnapshotAPI; print(SharedSnapshotAPI(%r).pilot(4556677).callsign)" % snapshot_path
+
+        out = subprocess.run([sys.executable, "-c", script], cwd=root, capture_output=True, text=True, check=True)
+        assert out.stdout.strip() == "KLM64B"
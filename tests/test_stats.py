@@ -0,0 +1,52 @@
+import pytest
+
+from src.pyvatsim import VatsimEndpoints, VatsimLiveAPI, VatspyAirports, UpdateMode, SnapshotPublisher, SharedSnapshotAPI
+
+
+@pytest.fixture
+def api(fake_vatsim, vatspy_dat) -> VatsimLiveAPI:
+    return VatsimLiveAPI(VatsimEndpoints("https://status.test/status.json"), airports=VatspyAirports(vatspy_dat), heatmap_cell_deg=5)
+
+
+class TestTrafficStats:
+    def test_tables(self, api: VatsimLiveAPI):
+        stats = api.traffic_stats()
+
+        assert dict(stats.departures) == {"VHHH": 1, "OPKC": 1}
+        assert dict(stats.arrivals) == {"EGLL": 1, "VYYY": 1}
+        assert dict(stats.prefiled_departures) == {"KACK": 1, "KMBS": 1}
+        assert dict(stats.fir_arrivals) == {"EGTT": 1, "VYYF": 1}
+        assert dict(stats.aircraft_types) == {"B77W": 1, "A320": 1}
+        assert dict(stats.pilots_per_server) == {"CANADA": 1}
+        assert dict(stats.controllers_per_facility) == {"TWR": 2}
+
+    def test_top_n_and_heatmap(self, api: VatsimLiveAPI, fake_vatsim):
+        data = fake_vatsim["https://data.test/v3/vatsim-data.json"]
+        data["pilots"][1]["flight_plan"]["arrival"] = "EGLL"
+        stats = api.traffic_stats()
+
+        assert stats.top("arrivals", 1) == [("EGLL", 2)]
+        assert stats.heatmap.count_at(24.02507, 82.52637) == 1
+        assert stats.heatmap.count_at(21.0, 84.0) == 1 # same 5 degree cell as BAW32
+        assert stats.heatmap.hottest(1)[0][1] == 1
+        assert len(stats.heatmap) == 2
+
+    def test_computed_once_per_snapshot(self, api: VatsimLiveAPI, fake_vatsim):
+        stats = api.traffic_stats()
+        assert api.traffic_stats() is stats
+
+        data = fake_vatsim["https://data.test/v3/vatsim-data.json"]
+        data["general"]["update_timestamp"] = "2023-04-11T16:13:58.1234567Z"
+        del data["pilots"][0]
+        api.refresh(update_mode=UpdateMode.FORCE)
+
+        assert api.traffic_stats() is not stats
+        assert "EGLL" not in api.traffic_stats().arrivals
+
+    def test_shared_snapshot_reader(self, api: VatsimLiveAPI, tmp_path):
+        path = str(tmp_path / "vatsim.snapshot")
+        SnapshotPublisher(api, path).publish()
+        reader = SharedSnapshotAPI(path)
+
+        assert reader.traffic_stats().arrivals == api.traffic_stats().arrivals
+        assert reader.traffic_stats().heatmap is None
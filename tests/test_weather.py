@@ -0,0 +1,72 @@
+import pytest
+
+from src.pyvatsim import VatsimEndpoints, VatsimLiveAPI, UpdateMode, Metar, FlightCategory, Weather, MetarStore
+
+
+@pytest.fixture
+def api(fake_vatsim) -> VatsimLiveAPI:
+    return VatsimLiveAPI(VatsimEndpoints("https://status.test/status.json"))
+
+
+def decode(raw_text):
+    return Weather.from_metar(Metar.from_raw_text(raw_text))
+
+
+class TestDecoding:
+    def test_icao_report(self):
+        w = decode("EGLL 111550Z AUTO 24012G25KT 9999 FEW035 BKN012 14/04 Q1014 TEMPO 4000 OVC004")
+
+        assert (w.wind_direction, w.wind_speed, w.wind_gust) == (240, 12, 25)
+        assert w.visibility_sm == pytest.approx(6.21, abs=0.01)
+        assert w.ceiling_ft == 1200 # the TEMPO trend isn't part of the observation
+        assert w.qnh_hpa == 1014
+        assert w.flight_category == FlightCategory.MVFR
+
+    def test_us_report(self):
+        w = decode("KSFO 111556Z VRB03KT 1 1/2SM BR OVC004 14/09 A3002 RMK AO2 SLP165")
+
+        assert w.wind_direction is None and w.wind_speed == 3
+        assert w.visibility_sm == 1.5
+        assert w.qnh_inhg == pytest.approx(30.02)
+        assert w.flight_category == FlightCategory.LIFR
+        assert decode("KSFO 111556Z 29015KT 10SM FEW012 14/09 A3002").flight_category == FlightCategory.VFR
+        assert decode("UUEE 111600Z 18005MPS CAVOK 10/02 Q1020").wind_speed == 10
+
+    def test_wind_components(self):
+        w = decode("EGLL 111550Z 24020KT 9999 FEW035 14/04 Q1014")
+        head, cross = w.wind_components("27L")
+
+        assert head == pytest.approx(17.32, abs=0.01)
+        assert cross == pytest.approx(-10.0)
+        assert w.wind_components(90)[0] < 0 # tailwind
+        assert decode("EGLL 111550Z VRB02KT CAVOK 14/04 Q1014").wind_components("27L") is None
+
+
+class TestMetarStore:
+    def test_only_changed_reports_decoded(self, api: VatsimLiveAPI, fake_vatsim, monkeypatch):
+        everything = api.weather()
+        egll = api.weather("EGLL")["EGLL"]
+        assert egll.flight_category == FlightCategory.VFR
+
+        decoded = []
+        real = Weather.from_metar
+        monkeypatch.setattr(Weather, "from_metar", classmethod(lambda cls, m: decoded.append(m.field) or real(m)))
+        metars = api.metars()
+        fake_vatsim["https://metar.test/metar.php"] = fake_vatsim["https://metar.test/metar.php"].replace(
+            "EGLL 111550Z AUTO 24012KT 9999 FEW035 14/04 Q1014", "EGLL 111620Z AUTO 25014KT 3000 BKN008 13/05 Q1013")
+        api.metars(update_mode=UpdateMode.FORCE)
+
+        assert decoded == ["EGLL"]
+        assert api.metar("KSFO") is metars["KSFO"] # unchanged text isn't parsed again either
+        assert [w.ceiling_ft for w in api.metar_history("EGLL")] == [None, 800]
+        assert api.weather("EGLL")["EGLL"].flight_category == FlightCategory.IFR
+        assert everything["EGLL"] is egll # what was handed out before the refresh doesn't change under the caller
+
+    def test_history_depth(self):
+        store = MetarStore(depth=2)
+        for minute in range(10, 50, 10):
+            store.update({"EGLL": Metar.from_raw_text("EGLL 1116%02dZ 24012KT 9999 Q1014" % minute)})
+        store.update({"EGLL": Metar.from_raw_text("EGLL 111640Z 24012KT 9999 Q1014")})
+
+        assert [w.time.minute for w in store.history("EGLL")] == [30, 40]
+        assert store.history("KSFO") == ()